@@ -0,0 +1,200 @@
+import asyncio
+
+from sanic.views import HTTPMethodView
+from sanic.response import json
+from sanic_ext import openapi
+from tortoise.transactions import in_transaction
+from schemas.post import PostCreate
+from schemas.tag import TagCreate
+from schemas.user import UserCreate
+from models.post import Post
+from models.tag import Tag
+from models.user import User
+from middleware import admission
+from middleware.jwt_middleware import jwt_required
+from utils import passwords, response_cache, tag_index
+from utils.passwords import PasswordHasherBusy, hash_password
+from utils.bulk import (
+    BulkBodyError, BulkResult, validate, iter_chunks, bulk_settings, inserted_ids
+)
+
+BULK_RESPONSE = {"created": int, "failed": int, "ids": [int], "errors": [{"index": int, "error": str}]}
+
+
+def _post_tags_insert_sql():
+    """帖子与标签多对多关联的中间表插入语句（中间表名在 Tortoise 初始化后才确定）"""
+    field = Post._meta.fields_map['tags']
+    return f'INSERT INTO "{field.through}" ("{field.backward_key}", "{field.forward_key}") VALUES (?, ?)'
+
+
+async def _run_bulk(request, create_chunk):
+    """分块读取条目并逐块调用 create_chunk(chunk, result)，每块一个事务"""
+    max_items, chunk_size = bulk_settings(request.app.config)
+    result = BulkResult()
+    try:
+        async for chunk in iter_chunks(request, max_items, chunk_size, result):
+            await create_chunk(chunk, result)
+    except BulkBodyError as e:
+        return json({"error": str(e)}, status=400)
+    return json(result.to_dict())
+
+
+def _validate_unique(chunk, schema, key, seen, result, message):
+    """校验条目并剔除本次请求内重复的唯一键，返回 [(序号, 模型)]"""
+    valid = []
+    for index, item in chunk:
+        data, error = validate(schema, item)
+        if error:
+            result.fail(index, error)
+        elif getattr(data, key) in seen:
+            result.fail(index, message)
+        else:
+            seen.add(getattr(data, key))
+            valid.append((index, data))
+    return valid
+
+
+async def _hash_passwords(plain):
+    """按哈希线程数分批计算，避免一次性占满哈希队列"""
+    step = max(1, passwords.hasher.workers)
+    hashed = []
+    for start in range(0, len(plain), step):
+        hashed.extend(await asyncio.gather(*(hash_password(p) for p in plain[start:start + step])))
+    return hashed
+
+
+class TagBulkView(HTTPMethodView):
+    @openapi.summary("批量创建标签")
+    @openapi.description("请求体为标签数组、{\"items\": [...]} 或 NDJSON（application/x-ndjson）")
+    @openapi.body([{"name": str}])
+    @openapi.response(200, BULK_RESPONSE)
+    @jwt_required(load_user=False)
+    @admission.limit("bulk")
+    async def post(self, request):
+        seen = set()
+
+        async def create_chunk(chunk, result):
+            valid = _validate_unique(chunk, TagCreate, 'name', seen, result, "标签已存在")
+            if not valid:
+                return
+            try:
+                async with in_transaction("default") as conn:
+                    existing = set(await Tag.filter(
+                        name__in=[data.name for _, data in valid]
+                    ).using_db(conn).values_list('name', flat=True))
+                    rows = [(index, data) for index, data in valid if data.name not in existing]
+                    ids = []
+                    if rows:
+                        await Tag.bulk_create([Tag(name=data.name) for _, data in rows], using_db=conn)
+                        ids = await inserted_ids(conn, len(rows))
+            except Exception as e:
+                result.fail_all([index for index, _ in valid], f"创建标签失败: {str(e)}")
+                return
+
+            result.fail_all([index for index, data in valid if data.name in existing], "标签已存在")
+            result.ids.extend(ids)
+            await response_cache.invalidate_tags(ids)
+
+        return await _run_bulk(request, create_chunk)
+
+
+class UserBulkView(HTTPMethodView):
+    @openapi.summary("批量创建用户")
+    @openapi.description("请求体为用户数组、{\"items\": [...]} 或 NDJSON（application/x-ndjson）")
+    @openapi.body([{"username": str, "password": str, "email": str}])
+    @openapi.response(200, BULK_RESPONSE)
+    @jwt_required(load_user=False)
+    @admission.limit("bulk")
+    async def post(self, request):
+        seen = set()
+
+        async def create_chunk(chunk, result):
+            valid = _validate_unique(chunk, UserCreate, 'username', seen, result, "用户名已存在")
+            if not valid:
+                return
+
+            # 先排除已存在的用户名，避免为注定失败的条目计算哈希
+            existing = set(await User.filter(
+                username__in=[data.username for _, data in valid]
+            ).values_list('username', flat=True))
+            result.fail_all([index for index, data in valid if data.username in existing], "用户名已存在")
+            rows = [(index, data) for index, data in valid if data.username not in existing]
+            if not rows:
+                return
+
+            # 哈希在事务之外进行，不在计算 bcrypt 时持有写锁
+            try:
+                hashed = await _hash_passwords([data.password for _, data in rows])
+            except PasswordHasherBusy as e:
+                result.fail_all([index for index, _ in rows], str(e))
+                return
+
+            # bulk_create 不经过 User.save，直接写入已哈希的密码
+            try:
+                async with in_transaction("default") as conn:
+                    await User.bulk_create([
+                        User(username=data.username, email=data.email, password=password)
+                        for (_, data), password in zip(rows, hashed)
+                    ], using_db=conn)
+                    ids = await inserted_ids(conn, len(rows))
+            except Exception as e:
+                result.fail_all([index for index, _ in rows], f"创建用户失败: {str(e)}")
+                return
+
+            result.ids.extend(ids)
+
+        return await _run_bulk(request, create_chunk)
+
+
+class PostBulkView(HTTPMethodView):
+    @openapi.summary("批量创建帖子")
+    @openapi.description("请求体为帖子数组、{\"items\": [...]} 或 NDJSON（application/x-ndjson），作者为当前用户")
+    @openapi.body([{"title": str, "content": str, "tag_ids": [int]}])
+    @openapi.response(200, BULK_RESPONSE)
+    @jwt_required(load_user=False)
+    @admission.limit("bulk")
+    async def post(self, request):
+        user_id = request.ctx.user_id
+
+        async def create_chunk(chunk, result):
+            valid = []
+            for index, item in chunk:
+                # 与单条创建接口一致使用 tag_ids 字段
+                if isinstance(item, dict) and 'tag_ids' in item:
+                    item = {**item, 'tags': item['tag_ids']}
+                data, error = validate(PostCreate, item)
+                if error:
+                    result.fail(index, error)
+                else:
+                    valid.append((index, data))
+            if not valid:
+                return
+
+            wanted = {tag_id for _, data in valid for tag_id in data.tags or ()}
+            try:
+                async with in_transaction("default") as conn:
+                    # 与单条接口一致，忽略不存在的标签
+                    known = set(await Tag.filter(id__in=wanted).using_db(conn).values_list('id', flat=True)) if wanted else set()
+                    await Post.bulk_create([
+                        Post(title=data.title, content=data.content, user_id=user_id)
+                        for _, data in valid
+                    ], using_db=conn)
+                    ids = await inserted_ids(conn, len(valid))
+                    links = [
+                        [post_id, tag_id]
+                        for post_id, (_, data) in zip(ids, valid)
+                        for tag_id in dict.fromkeys(data.tags or ())
+                        if tag_id in known
+                    ]
+                    if links:
+                        await conn.execute_many(_post_tags_insert_sql(), links)
+            except Exception as e:
+                result.fail_all([index for index, _ in valid], f"创建帖子失败: {str(e)}")
+                return
+
+            result.ids.extend(ids)
+            await response_cache.invalidate_tags({tag_id for _, tag_id in links})
+            for post_id, tag_id in links:
+                tag_index.index.add(post_id, (tag_id,))
+
+        return await _run_bulk(request, create_chunk)
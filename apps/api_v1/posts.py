@@ -1,33 +1,121 @@
+from types import SimpleNamespace
 from sanic.views import HTTPMethodView
 from sanic.response import json
 from sanic_ext import openapi
-from schemas.post import PostCreate, PostResponse, PostUpdate
+from schemas.post import PostCreate, PostResponse, PostUpdate, PostSearchItem
 from models.post import Post
 from models.tag import Tag
 from middleware.jwt_middleware import jwt_required
 from tortoise.exceptions import DoesNotExist
+from tortoise.transactions import in_transaction
+from utils.pagination import paginate, parse_limit, encode_cursor, decode_cursor, PaginationError
+from utils.serializers import compile_serializer, json_response
+from utils.streaming import stream_format, stream_query
+from utils.search import search_posts, SearchError
+from utils.projection import projection, FieldsError
+from utils import response_cache, tag_index
+from utils.conditional import (
+    make_etag, table_fingerprint, has_validators, is_not_modified, not_modified, validator_headers
+)
+
+serialize_post = compile_serializer(PostResponse)
+
+async def _fetch_tags(tag_ids, conn):
+    """在事务连接上按 id 取标签"""
+    if not tag_ids:
+        return []
+    return await Tag.filter(id__in=tag_ids).order_by('id').using_db(conn)
+
+def _post_view(post, user, tags):
+    """组装序列化所需的帖子视图（作者与标签已在手中）"""
+    return SimpleNamespace(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        created_at=post.created_at,
+        updated_at=post.updated_at,
+        user=user,
+        tags=tags
+    )
+
+def _parse_tag_query(request):
+    """解析 ?tags=1,2&match=all|any"""
+    try:
+        tag_ids = list(dict.fromkeys(int(part) for part in request.args.get('tags').split(',') if part.strip()))
+    except ValueError:
+        raise PaginationError("tags 必须是逗号分隔的标签 id")
+    if not tag_ids:
+        raise PaginationError("tags 不能为空")
+    match = request.args.get('match', 'all')
+    if match not in ('all', 'any'):
+        raise PaginationError("match 只能是 all 或 any")
+    return tag_ids, match == 'all'
+
+async def _search_by_tags(request, selection):
+    """
+    按标签筛选帖子：在倒排索引上求交集/并集，按 id 降序分页，只回表加载当前页
+    """
+    try:
+        tag_ids, match_all = _parse_tag_query(request)
+        limit = parse_limit(request)
+        cursor = request.args.get('cursor')
+        before_id = decode_cursor(cursor, ('id',))[0] if cursor else None
+    except PaginationError as e:
+        return json({"error": str(e)}, status=400)
+    
+    await tag_index.index.ready()
+    page_ids, has_more = tag_index.page(tag_index.index.match(tag_ids, match_all), before_id, limit)
+    
+    posts = await selection.fetch(Post.filter(id__in=page_ids).order_by('-id')) if page_ids else []
+    # 按实际标签复核，索引滞后（其他 worker 的写入尚未同步）时不返回不匹配的帖子
+    wanted = set(tag_ids)
+    posts = [
+        post for post in posts
+        if (wanted <= {tag['id'] for tag in post['tags']} if match_all else wanted & {tag['id'] for tag in post['tags']})
+    ]
+    
+    return json_response({
+        "posts": [selection.serialize(post) for post in posts],
+        "next_cursor": encode_cursor([page_ids[-1]]) if has_more else None
+    })
 
 class PostView(HTTPMethodView):
     @openapi.summary("获取帖子列表")
+    @openapi.description(
+        "?tags=1,2&match=all|any 按标签筛选（all 为同时包含全部标签，any 为包含任一标签），结果按 id 降序分页。"
+        "?fields=id,title,user.username 只返回（并只查询）选中的字段"
+    )
+    @openapi.parameter("fields", str, "query")
     async def get(self, request):
-        posts = await Post.all().prefetch_related('user', 'tags')
+        try:
+            if request.args.get('tags') is not None:
+                # 复核标签需要每个帖子的标签 id
+                return await _search_by_tags(request, projection(request, Post, PostResponse, required=('tags',)))
+            selection = projection(request, Post, PostResponse, required=('created_at',))
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
         
-        return json({
-            "posts": [{
-                "id": post.id,
-                "title": post.title,
-                "content": post.content,
-                "created_at": str(post.created_at),
-                "user": {
-                    "id": post.user.id,
-                    "username": post.user.username
-                },
-                "tags": [{
-                    "id": tag.id,
-                    "name": tag.name
-                } for tag in post.tags]
-            } for post in posts]
-        })
+        # 流式导出（NDJSON 或分块 JSON），按批次读取全部帖子
+        fmt = stream_format(request)
+        if fmt:
+            return stream_query(request, Post.all(), selection.serialize, "posts", fmt, fetch=selection.fetch)
+        
+        # 列表指纹未变化时直接返回 304，不查询和序列化帖子
+        # 删除只改变行数、不改变最大 updated_at，列表不返回 Last-Modified，只按 ETag 校验
+        count, last_modified = await table_fingerprint(Post.all())
+        etag = make_etag("posts", count, last_modified, request.query_string)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        
+        try:
+            posts, next_cursor = await paginate(Post.all(), request, fetch=selection.fetch)
+        except PaginationError as e:
+            return json({"error": str(e)}, status=400)
+        
+        return json_response({
+            "posts": [selection.serialize(post) for post in posts],
+            "next_cursor": next_cursor
+        }, headers=validator_headers(etag))
         
     @openapi.summary("创建新帖子")
     @jwt_required
@@ -44,60 +132,76 @@ class PostView(HTTPMethodView):
             if not data.get('title') or not data.get('content'):
                 return json({"error": "标题和内容不能为空"}, status=400)
             
-            # 创建帖子
-            post = await Post.create(
-                title=data['title'],
-                content=data['content'],
-                user_id=request.ctx.user.id  # 从JWT中获取的用户
-            )
-            
-            # 添加标签
-            if data.get('tag_ids'):
-                tags = await Tag.filter(id__in=data['tag_ids'])
-                await post.tags.add(*tags)
+            # 标签查询、帖子插入与关联写入在同一事务中完成
+            async with in_transaction("default") as conn:
+                tags = await _fetch_tags(data.get('tag_ids'), conn)
+                post = await Post.create(
+                    title=data['title'],
+                    content=data['content'],
+                    user_id=request.ctx.user.id,  # 从JWT中获取的用户
+                    using_db=conn
+                )
+                if tags:
+                    await post.tags.add(*tags, using_db=conn)
             
-            # 重新获取帖子（包含关联数据）
-            post = await Post.get(id=post.id).prefetch_related('user', 'tags')
+            await response_cache.invalidate_post(post.id, [tag.id for tag in tags])
+            tag_index.index.add(post.id, [tag.id for tag in tags])
             
-            return json({
-                "id": post.id,
-                "title": post.title,
-                "content": post.content,
-                "created_at": str(post.created_at),
-                "user": {
-                    "id": post.user.id,
-                    "username": post.user.username
-                },
-                "tags": [{
-                    "id": tag.id,
-                    "name": tag.name
-                } for tag in post.tags]
-            }, status=201)
+            # 用已持有的作者与标签构造响应，无需重新查询
+            post = _post_view(post, request.ctx.user, tags)
+            return json_response(serialize_post(post), status=201)
             
         except Exception as e:
             return json({"error": f"创建帖子失败: {str(e)}"}, status=500)
 
+class PostSearchView(HTTPMethodView):
+    @openapi.summary("全文检索帖子")
+    @openapi.description(
+        "在标题和内容中检索 q（空格分隔的多个词须同时命中，每个词至少 3 个字符），以 cursor 分页。"
+        "sort=rank（默认）按相关度排序，sort=recent 按发布先后排序，适合命中很多的宽泛查询"
+    )
+    @openapi.parameter("q", str, "query", required=True)
+    @openapi.parameter("sort", str, "query")
+    @openapi.parameter("fields", str, "query")
+    async def get(self, request):
+        try:
+            selection = projection(request, None, PostSearchItem)
+            results, next_cursor = await search_posts(
+                request.args.get('q'), parse_limit(request), request.args.get('cursor'),
+                request.args.get('sort', 'rank'), fields=selection.fields
+            )
+        except (SearchError, PaginationError, FieldsError) as e:
+            return json({"error": str(e)}, status=400)
+        
+        return json_response({
+            "posts": [selection.serialize(item) for item in results],
+            "next_cursor": next_cursor
+        })
+
 class PostDetailView(HTTPMethodView):
     @openapi.summary("获取帖子详情")
+    @openapi.parameter("fields", str, "query")
     async def get(self, request, post_id):
-        post = await Post.get_or_none(id=post_id).prefetch_related('user', 'tags')
-        if not post:
+        try:
+            selection = projection(request, Post, PostResponse, required=('updated_at',))
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
+        
+        # 携带缓存校验头时先只查询 updated_at，未修改则无需加载关联数据
+        if has_validators(request):
+            updated_at = await Post.filter(id=post_id).first().values_list('updated_at', flat=True)
+            if updated_at is not None:
+                etag = make_etag("post", post_id, updated_at, selection.key)
+                if is_not_modified(request, etag, updated_at):
+                    return not_modified(etag, updated_at)
+        
+        posts = await selection.fetch(Post.filter(id=post_id))
+        if not posts:
             return json({"error": "帖子不存在"}, status=404)
+        post = posts[0]
             
-        return json({
-            "id": post.id,
-            "title": post.title,
-            "content": post.content,
-            "created_at": str(post.created_at),
-            "user": {
-                "id": post.user.id,
-                "username": post.user.username
-            },
-            "tags": [{
-                "id": tag.id,
-                "name": tag.name
-            } for tag in post.tags]
-        })
+        etag = make_etag("post", post["id"], post["updated_at"], selection.key)
+        return json_response(selection.serialize(post), headers=validator_headers(etag, post["updated_at"]))
         
     @openapi.summary("更新帖子")
     @jwt_required
@@ -114,47 +218,57 @@ class PostDetailView(HTTPMethodView):
         if not data.get('title') or not data.get('content'):
             return json({"error": "标题和内容不能为空"}, status=400)
             
-        # 更新帖子
-        post.title = data.get('title')
-        post.content = data.get('content')
-        await post.save()
-        
-        # 更新标签
-        if data.get('tag_ids'):
-            # 清除现有标签关联
-            await post.tags.clear()
-            # 添加新标签
-            tags = await Tag.filter(id__in=data['tag_ids'])
-            await post.tags.add(*tags)
+        async with in_transaction("default") as conn:
+            # 更新帖子（只 UPDATE 有变化的列，标题和内容都未变化时不写库）
+            post.title = data.get('title')
+            post.content = data.get('content')
+            changed = bool(post.changed_fields())
+            await post.save(using_db=conn)
+            
+            # 更新前的标签（其详情页列出了该帖子，需要失效）
+            old_tags = await post.tags.all().using_db(conn)
+            tags = old_tags
+            
+            # 更新标签：只增删有变化的关联行
+            if data.get('tag_ids'):
+                tags = await _fetch_tags(data['tag_ids'], conn)
+                old_ids = {tag.id for tag in old_tags}
+                new_ids = {tag.id for tag in tags}
+                removed = [tag for tag in old_tags if tag.id not in new_ids]
+                added = [tag for tag in tags if tag.id not in old_ids]
+                if removed:
+                    await post.tags.remove(*removed, using_db=conn)
+                if added:
+                    await post.tags.add(*added, using_db=conn)
+                if (removed or added) and not changed:
+                    # 只改了标签时也更新 updated_at，ETag 和 Last-Modified 随之变化
+                    await post.save(using_db=conn, update_fields=['updated_at'])
+                    changed = True
         
-        # 获取更新后的帖子
-        post = await Post.get(id=post.id).prefetch_related('user', 'tags')
+        if changed:
+            await response_cache.invalidate_post(
+                post.id, {tag.id for tag in old_tags} | {tag.id for tag in tags}
+            )
+            tag_index.index.remove(post.id, [tag.id for tag in old_tags])
+            tag_index.index.add(post.id, [tag.id for tag in tags])
         
-        return json({
-            "id": post.id,
-            "title": post.title,
-            "content": post.content,
-            "updated_at": str(post.updated_at),
-            "user": {
-                "id": post.user.id,
-                "username": post.user.username
-            },
-            "tags": [{
-                "id": tag.id,
-                "name": tag.name
-            } for tag in post.tags]
-        })
+        # 权限检查已保证当前用户即作者
+        post = _post_view(post, request.ctx.user, tags)
+        return json_response(serialize_post(post))
         
     @openapi.summary("删除帖子")
-    @jwt_required
+    @jwt_required(load_user=False)
     async def delete(self, request, post_id):
         post = await Post.get_or_none(id=post_id)
         if not post:
             return json({"error": "帖子不存在"}, status=404)
             
         # 检查权限（只有作者可以删除）
-        if post.user_id != request.ctx.user.id:
+        if post.user_id != request.ctx.user_id:
             return json({"error": "没有权限删除此帖子"}, status=403)
             
+        tag_ids = await post.tags.all().values_list('id', flat=True)
         await post.delete()
+        await response_cache.invalidate_post(post_id, tag_ids)
+        tag_index.index.remove(post_id, tag_ids)
         return json({"message": "帖子已成功删除"}) 
\ No newline at end of file
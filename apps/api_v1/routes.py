@@ -4,8 +4,10 @@ from sanic_ext import openapi
 
 # 导入各个视图类
 from apps.api_v1.users import UserView, UserDetailView
-from apps.api_v1.posts import PostView, PostDetailView
+from apps.api_v1.posts import PostView, PostDetailView, PostSearchView
 from apps.api_v1.tags import TagView, TagDetailView
+from apps.api_v1.bulk import PostBulkView, TagBulkView, UserBulkView
+from utils import response_cache
 
 # 创建单一蓝图
 bp = Blueprint("api_v1", url_prefix="/api/v1")
@@ -14,10 +16,29 @@ bp = Blueprint("api_v1", url_prefix="/api/v1")
 bp.add_route(UserView.as_view(), "/users")
 bp.add_route(UserDetailView.as_view(), "/users/<user_id:int>")
 bp.add_route(PostView.as_view(), "/posts")
+bp.add_route(PostSearchView.as_view(), "/posts/search")
 bp.add_route(PostDetailView.as_view(), "/posts/<post_id:int>")
 bp.add_route(TagView.as_view(), "/tags")
 bp.add_route(TagDetailView.as_view(), "/tags/<tag_id:int>")
 
+# 批量导入：流式读取请求体，NDJSON 条目逐块处理
+bp.add_route(UserBulkView.as_view(), "/users/bulk", stream=True)
+bp.add_route(PostBulkView.as_view(), "/posts/bulk", stream=True)
+bp.add_route(TagBulkView.as_view(), "/tags/bulk", stream=True)
+
+# 启用响应缓存的视图（仅缓存 GET），写操作在视图中触发对应的失效事件
+CACHED_VIEWS = (PostDetailView, TagDetailView, TagView)
+
+@bp.middleware('request')
+async def response_cache_lookup(request):
+    view_class = getattr(request.route.handler, 'view_class', None)
+    if request.method == 'GET' and view_class in CACHED_VIEWS:
+        return await response_cache.serve_cached(request)
+
+@bp.middleware('response')
+async def response_cache_store(request, response):
+    await response_cache.store_response(request, response)
+
 # API版本信息路由
 @bp.get("/")
 @openapi.summary("API 版本信息")
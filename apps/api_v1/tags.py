@@ -1,26 +1,86 @@
 from sanic.views import HTTPMethodView
 from sanic.response import json
 from sanic_ext import openapi
-from schemas.tag import TagCreate, TagResponse
+from schemas.tag import TagCreate, TagResponse, TagDetailResponse
 from models.tag import Tag
+from models.post import Post
 from middleware.jwt_middleware import jwt_required
 from tortoise.exceptions import DoesNotExist, IntegrityError
+from utils.projection import projection, FieldsError
+from utils.pagination import paginate, parse_limit, encode_cursor, decode_cursor, PaginationError
+from utils.serializers import compile_serializer, json_response
+from utils import response_cache, tag_index
+from utils.db import read_connection
+from utils.conditional import make_etag, is_not_modified, not_modified, validator_headers
+
+serialize_tag = compile_serializer(TagResponse)
+
+
+# 标签的帖子数：走 posts_tags 的 (tag_id, posts_id) 覆盖索引，不读取 posts
+# （Post.filter(tags__id=...) 经 LEFT JOIN 生成的查询会扫描整张 posts 表）
+TAG_POST_COUNT_SQL = 'SELECT COUNT(*) AS "count" FROM "posts_tags" WHERE "tag_id" = ?'
+
+
+def tag_posts_sql(tag_id, limit, before=None):
+    """标签下一页帖子的 SQL 和参数：id 小于 before（为 None 时为首页），按 id 降序取 limit + 1 行"""
+    sql = (
+        'SELECT "posts"."id" AS "id", "posts"."title" AS "title" '
+        'FROM "posts_tags" JOIN "posts" ON "posts"."id" = "posts_tags"."posts_id" '
+        'WHERE "posts_tags"."tag_id" = ?'
+    )
+    params = [tag_id]
+    if before is not None:
+        sql += ' AND "posts_tags"."posts_id" < ?'
+        params.append(before)
+    sql += ' ORDER BY "posts_tags"."posts_id" DESC LIMIT ?'
+    params.append(limit + 1)
+    return sql, params
+
+
+async def _tag_posts_page(tag_id, request):
+    """
+    标签下的帖子（按 id 降序的键集分页），只读取 id 和标题
+
+    从 posts_tags 的 (tag_id, posts_id) 索引出发按帖子 id 倒序取 limit + 1 行再回表，
+    开销只与页大小有关；若从 posts 主键倒序扫描，冷门标签需要扫过大半张表。
+    返回 (当前页的帖子字典列表, 下一页游标或 None)
+    """
+    limit = parse_limit(request)
+    cursor = request.args.get('cursor')
+    before = decode_cursor(cursor, ('id',))[0] if cursor else None
+
+    posts = await read_connection(Post).execute_query_dict(*tag_posts_sql(tag_id, limit, before))
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor([posts[-1]["id"]])
+    return posts, next_cursor
 
 class TagView(HTTPMethodView):
     @openapi.summary("获取标签列表")
+    @openapi.parameter("fields", str, "query")
     async def get(self, request):
-        tags = await Tag.all()
-        return json({
-            "tags": [{
-                "id": tag.id,
-                "name": tag.name
-            } for tag in tags]
-        })
+        try:
+            selection = projection(request, Tag, TagResponse)
+            # 标签没有时间字段，仅按 id 分页
+            tags, next_cursor = await paginate(Tag.all(), request, keys=('id',), fetch=selection.fetch)
+        except (PaginationError, FieldsError) as e:
+            return json({"error": str(e)}, status=400)
+        
+        # 标签没有 updated_at，ETag 直接由当前页内容计算（标签行很小）
+        etag = make_etag("tags", [tuple(tag.values()) for tag in tags], next_cursor)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        
+        return json_response({
+            "tags": [selection.serialize(tag) for tag in tags],
+            "next_cursor": next_cursor
+        }, headers=validator_headers(etag))
     
     @openapi.summary("创建新标签")
     @openapi.body({"name": str})
     @openapi.response(201, {"id": int, "name": str})
-    @jwt_required
+    @jwt_required(load_user=False)
     async def post(self, request):
         try:
             data = request.json
@@ -36,36 +96,58 @@ class TagView(HTTPMethodView):
             
             # 创建新标签
             tag = await Tag.create(name=data['name'])
+            await response_cache.invalidate_tag(tag.id)
             
-            return json({
-                "id": tag.id,
-                "name": tag.name
-            }, status=201)
+            return json_response(serialize_tag(tag), status=201)
             
         except Exception as e:
             return json({"error": f"创建标签失败: {str(e)}"}, status=500)
 
 class TagDetailView(HTTPMethodView):
     @openapi.summary("获取标签详情")
+    @openapi.parameter("fields", str, "query")
     async def get(self, request, tag_id):
+        try:
+            selection = projection(request, None, TagDetailResponse)
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
+        
         tag = await Tag.get_or_none(id=tag_id)
         if not tag:
             return json({"error": "标签不存在"}, status=404)
-            
-        # 获取与该标签相关的帖子
-        await tag.fetch_related("posts")
         
-        return json({
+        # 帖子页和帖子数只在选中时查询
+        posts, next_cursor = [], None
+        if selection.wants('posts') or selection.wants('next_cursor'):
+            try:
+                posts, next_cursor = await _tag_posts_page(tag.id, request)
+            except PaginationError as e:
+                return json({"error": str(e)}, status=400)
+        
+        post_count = None
+        if selection.wants('post_count'):
+            # 帖子数用聚合查询，不加载帖子
+            rows = await read_connection(Tag).execute_query_dict(TAG_POST_COUNT_SQL, [tag.id])
+            post_count = rows[0]["count"]
+        
+        # ETag 只由标签、帖子数和当前页内容计算，与标签下的帖子总数无关
+        etag = make_etag(
+            "tag", tag.id, tag.name, post_count,
+            [(post["id"], post["title"]) for post in posts], next_cursor, selection.key
+        )
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        
+        return json_response(selection.serialize({
             "id": tag.id,
             "name": tag.name,
-            "posts": [{
-                "id": post.id,
-                "title": post.title
-            } for post in tag.posts]
-        })
+            "post_count": post_count,
+            "posts": posts,
+            "next_cursor": next_cursor
+        }), headers=validator_headers(etag))
         
     @openapi.summary("更新标签")
-    @jwt_required
+    @jwt_required(load_user=False)
     async def put(self, request, tag_id):
         tag = await Tag.get_or_none(id=tag_id)
         if not tag:
@@ -81,21 +163,28 @@ class TagDetailView(HTTPMethodView):
             if existing_tag:
                 return json({"error": "标签名称已存在"}, status=400)
                 
-        # 更新标签
+        # 更新标签（名称未变化时不写库，也不需要失效缓存）
         tag.name = data['name']
-        await tag.save()
+        if tag.changed_fields():
+            await tag.save()
+            
+            # 展示该标签的帖子其 updated_at 随之更新（ETag 和列表指纹中不含标签）；
+            # 受影响的帖子详情可能很多，整体清空响应缓存，开销与帖子数无关
+            await Post.touch_tag(tag.id)
+            await response_cache.invalidate_all()
         
-        return json({
-            "id": tag.id,
-            "name": tag.name
-        })
+        return json_response(serialize_tag(tag))
         
     @openapi.summary("删除标签")
-    @jwt_required
+    @jwt_required(load_user=False)
     async def delete(self, request, tag_id):
         tag = await Tag.get_or_none(id=tag_id)
         if not tag:
             return json({"error": "标签不存在"}, status=404)
             
+        # 删除前更新带有该标签的帖子（删除标签会级联删除关联行）
+        await Post.touch_tag(tag.id)
         await tag.delete()
+        await response_cache.invalidate_all()
+        tag_index.index.drop_tag(tag_id)
         return json({"message": "标签已删除"}) 
\ No newline at end of file
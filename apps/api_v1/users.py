@@ -3,21 +3,49 @@ from sanic.response import json
 from sanic_ext import openapi
 from schemas.user import UserCreate, UserResponse
 from models.user import User
+from models.post import Post
 from middleware.jwt_middleware import jwt_required
+from middleware.user_cache import invalidate_user
+from utils import response_cache, tag_index
 from tortoise.exceptions import IntegrityError
+from utils.passwords import PasswordHasherBusy
+from utils.serializers import compile_serializer, json_response
+from utils.streaming import stream_format, stream_query
+from utils.projection import projection, FieldsError
+from utils.conditional import make_etag, table_fingerprint, is_not_modified, not_modified, validator_headers
+from utils.pagination import paginate, PaginationError
+
+serialize_user = compile_serializer(UserResponse)
 
 class UserView(HTTPMethodView):
     @openapi.summary("获取用户列表")
+    @openapi.parameter("fields", str, "query")
     async def get(self, request):
-        users = await User.all()
-        return json({
-            "users": [{
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "created_at": str(user.created_at)
-            } for user in users]
-        })
+        # 只查询响应需要的列，不读取密码哈希
+        try:
+            selection = projection(request, User, UserResponse, required=('created_at',))
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
+        
+        # 流式导出（NDJSON 或分块 JSON），按批次读取全部用户
+        fmt = stream_format(request)
+        if fmt:
+            return stream_query(request, User.all(), selection.serialize, "users", fmt, fetch=selection.fetch)
+        
+        count, last_modified = await table_fingerprint(User.all())
+        etag = make_etag("users", count, last_modified, request.query_string)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        
+        try:
+            users, next_cursor = await paginate(User.all(), request, fetch=selection.fetch)
+        except PaginationError as e:
+            return json({"error": str(e)}, status=400)
+        
+        return json_response({
+            "users": [selection.serialize(user) for user in users],
+            "next_cursor": next_cursor
+        }, headers=validator_headers(etag))
     
     @openapi.summary("创建新用户")
     @openapi.body({"username": str, "password": str, "email": str})
@@ -42,34 +70,38 @@ class UserView(HTTPMethodView):
             )
             
             # 返回创建的用户信息
-            return json({
-                "id": user.id,
-                "username": user.username,
-                "email": user.email
-            }, status=201)
+            return json_response(serialize_user(user), status=201)
             
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             return json({"error": f"创建用户失败: {str(e)}"}, status=500)
 
 class UserDetailView(HTTPMethodView):
     @openapi.summary("获取用户详情")
+    @openapi.parameter("fields", str, "query")
     async def get(self, request, user_id):
-        user = await User.get_or_none(id=user_id)
-        if not user:
+        try:
+            selection = projection(request, User, UserResponse, required=('updated_at',))
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
+        
+        users = await selection.fetch(User.filter(id=user_id))
+        if not users:
             return json({"error": "用户不存在"}, status=404)
+        user = users[0]
+            
+        etag = make_etag("user", user["id"], user["updated_at"], selection.key)
+        if is_not_modified(request, etag, user["updated_at"]):
+            return not_modified(etag, user["updated_at"])
             
-        return json({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "created_at": str(user.created_at)
-        })
+        return json_response(selection.serialize(user), headers=validator_headers(etag, user["updated_at"]))
         
     @openapi.summary("更新用户")
-    @jwt_required
+    @jwt_required(load_user=False)
     async def put(self, request, user_id):
         # 只能更新自己的信息
-        if str(request.ctx.user.id) != str(user_id):
+        if str(request.ctx.user_id) != str(user_id):
             return json({"error": "没有权限"}, status=403)
             
         user = await User.get_or_none(id=user_id)
@@ -77,33 +109,39 @@ class UserDetailView(HTTPMethodView):
             return json({"error": "用户不存在"}, status=404)
             
         data = request.json
+        username_changed = False
         if data.get('username') and data['username'] != user.username:
             # 检查新用户名是否已存在
             existing_user = await User.filter(username=data['username']).first()
             if existing_user:
                 return json({"error": "用户名已存在"}, status=400)
             user.username = data['username']
+            username_changed = True
             
         if data.get('email'):
             user.email = data['email']
             
         if data.get('password'):
-            user.password = data['password']  # 哈希处理在save方法中
+            user.password = data['password']  # 哈希处理在save方法中（只在密码变化时执行一次）
             
-        await user.save()
+        # 只 UPDATE 有变化的列，没有变化时不写库
+        if user.changed_fields():
+            await user.save()
+            invalidate_user(user.id)
+        
+        # 帖子详情中包含作者用户名，其 updated_at 随之更新（ETag 和列表指纹中不含作者）；
+        # 作者的帖子可能很多，整体清空响应缓存，不逐个失效帖子详情
+        if username_changed:
+            await Post.touch_author(user.id)
+            await response_cache.invalidate_all()
         
-        return json({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "updated_at": str(user.updated_at)
-        })
+        return json_response(serialize_user(user))
         
     @openapi.summary("删除用户")
-    @jwt_required
+    @jwt_required(load_user=False)
     async def delete(self, request, user_id):
         # 只能删除自己的账户
-        if str(request.ctx.user.id) != str(user_id):
+        if str(request.ctx.user_id) != str(user_id):
             return json({"error": "没有权限"}, status=403)
             
         user = await User.get_or_none(id=user_id)
@@ -111,4 +149,8 @@ class UserDetailView(HTTPMethodView):
             return json({"error": "用户不存在"}, status=404)
             
         await user.delete()
+        invalidate_user(user.id)
+        # 级联删除的帖子可能出现在任意标签详情中，直接清空响应缓存并重建标签索引
+        await response_cache.invalidate_all()
+        tag_index.index.invalidate()
         return json({"message": "用户已删除"}) 
\ No newline at end of file
@@ -2,11 +2,18 @@ from sanic import Blueprint
 from sanic.views import HTTPMethodView
 from sanic.response import json
 from sanic_ext import openapi
-from sanic_jwt.decorators import protected, inject_user
 from tortoise.exceptions import DoesNotExist
 from pydantic import BaseModel, EmailStr, Field
 
+from middleware.jwt_middleware import jwt_required
+from middleware.user_cache import invalidate_user
 from models.user import User
+from schemas.user import UserResponse
+from utils import response_cache, tag_index
+from utils.pagination import paginate, PaginationError
+from utils.projection import projection, FieldsError
+from utils.serializers import compile_serializer, json_response
+from utils.conditional import make_etag, table_fingerprint, is_not_modified, not_modified, validator_headers
 
 bp = Blueprint('v2', url_prefix='/api/v2')
 
@@ -16,27 +23,34 @@ class UserCreate(BaseModel):
     password: str = Field(..., min_length=6)
     email: EmailStr
 
-class UserResponse(BaseModel):
-    id: int
-    username: str
-    email: str
-    created_at: str
+serialize_user = compile_serializer(UserResponse)
 
 class UsersView(HTTPMethodView):
     @openapi.summary("获取用户列表（v2）")
     @openapi.description("返回所有用户的详细信息列表，包括创建时间")
-    @openapi.response(200, {"users": [{"id": int, "username": str, "email": str, "created_at": str}]})
-    @protected()
+    @openapi.response(200, {"users": [{"id": int, "username": str, "email": str, "created_at": str}], "next_cursor": str})
+    @openapi.parameter("fields", str, "query")
+    @jwt_required(load_user=False)
     async def get(self, request):
-        users = await User.all()
-        return json({
-            "users": [{
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "created_at": str(user.created_at)
-            } for user in users]
-        })
+        try:
+            selection = projection(request, User, UserResponse, required=('created_at',))
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
+        
+        count, last_modified = await table_fingerprint(User.all())
+        etag = make_etag("users", count, last_modified, request.query_string)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        
+        try:
+            users, next_cursor = await paginate(User.all(), request, fetch=selection.fetch)
+        except PaginationError as e:
+            return json({"error": str(e)}, status=400)
+        
+        return json_response({
+            "users": [selection.serialize(user) for user in users],
+            "next_cursor": next_cursor
+        }, headers=validator_headers(etag))
     
     @openapi.summary("创建新用户")
     @openapi.description("创建一个新用户")
@@ -69,41 +83,48 @@ class UsersView(HTTPMethodView):
             email=user_data.email
         )
         
-        return json({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email
-        }, status=201)
+        return json_response(serialize_user(user), status=201)
 
 class UserDetailView(HTTPMethodView):
     @openapi.summary("获取单个用户信息")
     @openapi.description("根据用户ID返回用户详细信息")
     @openapi.response(200, {"user": {"id": int, "username": str, "email": str, "created_at": str}})
-    @protected()
+    @openapi.parameter("fields", str, "query")
+    @jwt_required(load_user=False)
     async def get(self, request, user_id):
         try:
-            user = await User.get(id=user_id)
-            return json({
-                "user": {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "created_at": str(user.created_at)
-                }
-            })
-        except DoesNotExist:
+            selection = projection(request, User, UserResponse, required=('updated_at',))
+        except FieldsError as e:
+            return json({"error": str(e)}, status=400)
+        
+        users = await selection.fetch(User.filter(id=user_id))
+        if not users:
             return json({"error": "用户不存在"}, status=404)
+        user = users[0]
+        etag = make_etag("user", user["id"], user["updated_at"], selection.key)
+        if is_not_modified(request, etag, user["updated_at"]):
+            return not_modified(etag, user["updated_at"])
+        return json_response({"user": selection.serialize(user)}, headers=validator_headers(etag, user["updated_at"]))
     
     @openapi.summary("删除用户")
     @openapi.description("根据用户ID删除用户")
-    @protected()
+    @jwt_required(load_user=False)
     async def delete(self, request, user_id):
+        # 只能删除自己的账户
+        if str(request.ctx.user_id) != str(user_id):
+            return json({"error": "没有权限"}, status=403)
+        
         try:
             user = await User.get(id=user_id)
             await user.delete()
-            return json({"message": "用户已删除"})
         except DoesNotExist:
             return json({"error": "用户不存在"}, status=404)
+        
+        invalidate_user(user.id)
+        # 级联删除的帖子可能出现在任意标签详情中，直接清空响应缓存并重建标签索引
+        await response_cache.invalidate_all()
+        tag_index.index.invalidate()
+        return json({"message": "用户已删除"})
 
 # 注册路由
 bp.add_route(UsersView.as_view(), "/users")
@@ -1,10 +1,15 @@
 from sanic import Blueprint
 from sanic.views import HTTPMethodView
 from sanic.response import json
+from datetime import datetime, timezone
+
 from sanic_ext import openapi
-from middleware.jwt_middleware import generate_tokens, verify_refresh_token
+from middleware import admission, refresh_tokens
+from middleware.auth import schedule_rehash
+from middleware.refresh_tokens import RefreshTokenError
 from models.user import User
-import bcrypt
+from utils import write_behind
+from utils.passwords import PasswordHasherBusy
 
 bp = Blueprint('auth', url_prefix='/auth')
 
@@ -14,6 +19,9 @@ class AuthView(HTTPMethodView):
     @openapi.body({"username": str, "password": str})
     @openapi.response(200, {"access_token": str, "refresh_token": str, "expires_in": int})
     @openapi.response(401, {"error": str})
+    @openapi.response(429, {"error": str})
+    @openapi.response(503, {"error": str})
+    @admission.limit("login")
     async def post(self, request):
         try:
             data = request.json
@@ -23,19 +31,33 @@ class AuthView(HTTPMethodView):
             if not username or not password:
                 return json({"error": "用户名和密码不能为空"}, status=400)
             
+            # 按用户名和客户端地址限速（在查询用户和校验密码之前），登录成功时退还
+            rejected = admission.admit_username(request, username)
+            if rejected:
+                return rejected
+            
             # 查找用户
             user = await User.get_or_none(username=username)
             if not user:
                 return json({"error": "用户名或密码不正确"}, status=401)
             
-            # 验证密码
-            if not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+            # 验证密码（在哈希线程池中执行，不阻塞事件循环）
+            if not await user.verify_password(password):
                 return json({"error": "用户名或密码不正确"}, status=401)
             
-            # 生成令牌
-            tokens = generate_tokens(user.id, request.app.config)
+            admission.refund_username(request, username)
+            
+            # 生成令牌（记录刷新令牌的 jti，须立即写入以便刷新时校验）
+            tokens = await refresh_tokens.issue(user.id, request.app.config)
+            
+            # 登录时间由后台队列合并写入，不在请求中等待
+            write_behind.update(User, user.id, last_login=datetime.now(timezone.utc))
+            # 存储的哈希成本与当前策略不同时在后台重新哈希
+            schedule_rehash(request, user, password)
             
             return json(tokens)
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             return json({"error": str(e)}, status=500)
 
@@ -45,6 +67,8 @@ class TokenRefreshView(HTTPMethodView):
     @openapi.body({"refresh_token": str})
     @openapi.response(200, {"access_token": str, "refresh_token": str, "expires_in": int})
     @openapi.response(401, {"error": str})
+    @openapi.response(429, {"error": str})
+    @admission.limit("refresh")
     async def post(self, request):
         try:
             data = request.json
@@ -53,23 +77,41 @@ class TokenRefreshView(HTTPMethodView):
             if not refresh_token:
                 return json({"error": "刷新令牌不能为空"}, status=400)
             
-            # 验证刷新令牌
-            user_id = await verify_refresh_token(refresh_token, request.app.config)
+            # 校验并轮换刷新令牌：签名、吊销索引和一次条件更新，无需查询用户
+            tokens = await refresh_tokens.rotate(refresh_token, request.app.config)
             
-            # 检查用户是否存在
-            user = await User.get_or_none(id=user_id)
-            if not user:
-                return json({"error": "用户不存在或已被删除"}, status=401)
+            return json(tokens)
+        except RefreshTokenError as e:
+            return json({"error": str(e)}, status=401)
+        except Exception as e:
+            return json({"error": str(e)}, status=500)
+
+class LogoutView(HTTPMethodView):
+    @openapi.summary("退出登录")
+    @openapi.description("吊销刷新令牌；all 为 true 时吊销该用户的全部刷新令牌")
+    @openapi.body({"refresh_token": str, "all": bool})
+    @openapi.response(200, {"message": str, "revoked": int})
+    @openapi.response(401, {"error": str})
+    async def post(self, request):
+        try:
+            data = request.json or {}
+            refresh_token = data.get('refresh_token')
             
-            # 生成新令牌
-            tokens = generate_tokens(user.id, request.app.config)
+            if not refresh_token:
+                return json({"error": "刷新令牌不能为空"}, status=400)
             
-            return json(tokens)
-        except ValueError as e:
+            user_id = await refresh_tokens.revoke(refresh_token)
+            revoked = 1
+            if data.get('all'):
+                revoked += await refresh_tokens.revoke_user(user_id)
+            
+            return json({"message": "已退出登录", "revoked": revoked})
+        except RefreshTokenError as e:
             return json({"error": str(e)}, status=401)
         except Exception as e:
             return json({"error": str(e)}, status=500)
 
 # 注册路由
 bp.add_route(AuthView.as_view(), "/login")
-bp.add_route(TokenRefreshView.as_view(), "/refresh") 
\ No newline at end of file
+bp.add_route(TokenRefreshView.as_view(), "/refresh")
+bp.add_route(LogoutView.as_view(), "/logout") 
\ No newline at end of file
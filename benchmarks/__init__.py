@@ -0,0 +1 @@
+# 性能基准测试脚本，运行方式：python -m benchmarks.<脚本名>
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """按 ASGI lifespan 协议启动和关闭应用（启动/关闭监听器各只执行一次）"""
+    receive_queue = asyncio.Queue()
+    send_queue = asyncio.Queue()
+
+    task = asyncio.create_task(
+        app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive_queue.get, send_queue.put)
+    )
+    await receive_queue.put({"type": "lifespan.startup"})
+    reply = asyncio.ensure_future(send_queue.get())
+    await asyncio.wait([reply, task], return_when=asyncio.FIRST_COMPLETED)
+    if not reply.done():
+        reply.cancel()
+        task.result()  # 启动监听器抛出的异常
+        raise RuntimeError("应用启动失败")
+    message = reply.result()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"应用启动失败: {message.get('message')}")
+    try:
+        yield app
+    finally:
+        await receive_queue.put({"type": "lifespan.shutdown"})
+        await send_queue.get()
+        await task
+
+
+@asynccontextmanager
+async def app_client(**config):
+    """
+    在临时目录中启动应用（使用独立的 SQLite 数据库），返回 (app, client)
+
+    client 为 httpx.AsyncClient，请求通过 ASGI 在当前进程内处理，不经过网络。
+    """
+    import httpx
+    import main
+    from main import app
+    from utils.db import tortoise_config
+
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="sanic_demo_bench_"))
+    try:
+        app.config.update(config)
+        # 数据库配置在导入 main 时已生成，这里按覆盖后的配置原地重建
+        orm_config = tortoise_config(app.config)
+        main.TORTOISE_ORM.clear()
+        main.TORTOISE_ORM.update(orm_config)
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                yield app, client
+    finally:
+        os.chdir(cwd)
+
+
+async def login(client, username, password):
+    """登录并返回带访问令牌的请求头"""
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,111 @@
+"""
+全文检索基准：在合成语料上对比 /api/v1/posts/search（FTS5）与 LIKE 全表扫描
+
+    python -m benchmarks.fts_search --posts 1000000
+    python -m benchmarks.fts_search --posts 100000 --requests 50
+
+语料由固定词表随机组合生成（中英文混合），写入时由触发器同步 FTS 索引。
+对不同选择度的查询分别测量两种排序（rank / recent）的接口延迟，并用同一查询的 LIKE 扫描作为对照。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks.common import app_client, login
+from benchmarks.sqlite_mixed import percentile
+
+WORDS_EN = [f"{a}{b}{c}" for a in "bcdfghklmnprst" for b in "aeiou" for c in ("ran", "lex", "tor", "mix", "dus")]
+# trigram 分词要求查询词至少 3 个字符，中文词同样取 3 个字
+WORDS_ZH = [a + b + c for a in "数据性能查询" for b in "索引缓存并发" for c in "库表页锁"]
+# 不同选择度的查询：常见词、较少见的词、两个词同时命中
+QUERIES = ["performance", WORDS_EN[7], WORDS_ZH[3] + " " + WORDS_EN[11], "zzzz-none"]
+
+
+def make_post(rng, i):
+    words = rng.choices(WORDS_EN, k=24) + rng.choices(WORDS_ZH, k=8)
+    if i % 10 == 0:
+        words.append("performance")
+    rng.shuffle(words)
+    return (f"post {i} {rng.choice(WORDS_ZH)}", " ".join(words))
+
+
+def populate(path, user_id, count, batch=10000):
+    """用独立连接批量写入帖子（每批一个事务），返回耗时"""
+    rng = random.Random(42)
+    conn = sqlite3.connect(path, isolation_level=None)
+    start = time.perf_counter()
+    for offset in range(0, count, batch):
+        rows = [make_post(rng, i) for i in range(offset, min(offset + batch, count))]
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO posts (title, content, created_at, updated_at, user_id) "
+            "VALUES (?, ?, datetime('now'), datetime('now'), ?)",
+            [(title, content, user_id) for title, content in rows]
+        )
+        conn.execute("COMMIT")
+    elapsed = time.perf_counter() - start
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return elapsed
+
+
+def like_scan(path, q, limit=20):
+    """对照组：对每个词做 LIKE '%词%' 的全表扫描"""
+    conn = sqlite3.connect(path)
+    terms = q.split()
+    sql = "SELECT id FROM posts WHERE " + " AND ".join("(title LIKE ? OR content LIKE ?)" for _ in terms) + " LIMIT ?"
+    params = [p for t in terms for p in (f"%{t}%", f"%{t}%")] + [limit]
+    start = time.perf_counter()
+    conn.execute(sql, params).fetchall()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+async def run(args):
+    async with app_client(RESPONSE_CACHE_MAX_BYTES=0) as (app, client):
+        from models.user import User
+
+        await User.create(username="bench", password="bench-password", email="bench@example.com")
+        await login(client, "bench", "bench-password")
+        path = os.path.abspath("db.sqlite3")
+
+        elapsed = populate(path, 1, args.posts)
+        size = sum(os.path.getsize(f) for f in (path, path + "-wal") if os.path.exists(f))
+        print(f"写入 {args.posts} 篇帖子（含 FTS 触发器）: {elapsed:.1f}s，数据库 {size / 1024 / 1024:.0f}MB")
+
+        print(f"{'查询':<24}{'排序':>8}{'命中/页':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'翻页p50':>10}{'LIKE(ms)':>10}")
+        for q, sort in [(q, sort) for q in QUERIES for sort in ("rank", "recent")]:
+            first, later = [], []
+            hits = 0
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = await client.get("/api/v1/posts/search", params={"q": q, "limit": 20, "sort": sort})
+                first.append(time.perf_counter() - start)
+                body = response.json()
+                assert response.status_code == 200, body
+                hits = len(body["posts"])
+                if body["next_cursor"]:
+                    start = time.perf_counter()
+                    await client.get("/api/v1/posts/search", params={"q": q, "limit": 20, "sort": sort, "cursor": body["next_cursor"]})
+                    later.append(time.perf_counter() - start)
+            like = like_scan(path, q) * 1000
+            print(f"{q:<24}{sort:>8}{hits:>8}{percentile(first, 0.5):>10.1f}{percentile(first, 0.95):>10.1f}"
+                  f"{percentile(later, 0.5):>10.1f}{like:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=20, help="每个查询的请求次数")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
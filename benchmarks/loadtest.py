@@ -0,0 +1,368 @@
+"""
+负载测试：回放 JSONL 请求轨迹（或按合成比例生成请求），统计各接口的延迟分位数、RPS 和数据库查询次数
+
+    python -m benchmarks.loadtest                                   # 进程内（ASGI）回放默认轨迹
+    python -m benchmarks.loadtest --mix read --requests 5000        # 合成的只读负载
+    python -m benchmarks.loadtest --target server --workers 4 --duration 20
+    python -m benchmarks.loadtest --save-baseline benchmarks/baseline.json
+    python -m benchmarks.loadtest --baseline benchmarks/baseline.json   # 出现回归时以状态码 1 退出
+
+轨迹文件每行一个请求，例如
+{"name": "PostDetailView.get", "method": "GET", "path": "/api/v1/posts/{post_id}", "auth": false, "body": null}。
+path 和 body 中的占位符在发送时按种子数据随机填充（见 placeholders）；不含占位符的轨迹
+（例如由访问日志转换而来）按原样回放。轨迹按文件顺序循环发送，name 缺省时为 "方法 路径"。
+
+--target inprocess 在临时数据库上进程内启动应用，请求经 ASGI 处理；--target server 以
+serve.py 启动真实的多 worker 服务器，经本机网络发送请求。查询次数只在进程内模式下统计：
+压测前对每个接口串行发送几次请求，用 sqlite3 的 trace 回调计数实际执行的 SQL 语句（不含事务控制语句）。
+进程内模式关闭准入控制；服务器模式按默认配置运行，超出登录限速的请求返回 429，计为错误。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import seed
+from benchmarks.common import app_client
+from benchmarks.sqlite_mixed import percentile
+from benchmarks.worker_scaling import ROOT, free_port, wait_ready
+
+DEFAULT_TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces", "mixed.jsonl")
+# trigram 分词要求检索词至少 3 个字符
+SEARCH_WORDS = ["sanic", "tortoise", "sqlite", "python"]
+# 合成负载：按接口名称加权抽样（接口定义取自默认轨迹）
+MIXES = {
+    "read": {
+        "PostView.get": 25, "PostView.get[fields]": 5, "PostView.get[tags]": 5, "PostDetailView.get": 35,
+        "PostSearchView.get": 5, "TagView.get": 5, "TagDetailView.get": 10, "UserView.get": 5, "UserDetailView.get": 5,
+    },
+    "write": {"PostView.get": 20, "PostDetailView.get": 30, "PostView.post": 25, "PostDetailView.put": 25},
+    "auth": {"AuthView.post": 1},
+}
+# 回归判定：延迟超过基线 (1 + tolerance) 倍且绝对差值超过 MIN_DELTA_MS 才算回归，避免噪声误报
+DEFAULT_TOLERANCE = 0.5
+MIN_DELTA_MS = 2.0
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def load_trace(path):
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entry.setdefault("name", f"{entry['method']} {entry['path'].split('?')[0]}")
+                entries.append(entry)
+    if not entries:
+        raise ValueError(f"{path} 中没有请求")
+    return entries
+
+
+def placeholders(rng, volumes, user_id, counter):
+    """占位符名称 → 取值函数；own_post_id 为当前认证用户自己的帖子（见 seed.author_of）"""
+    users, posts = volumes["users"], volumes["posts"]
+    return {
+        "post_id": lambda: rng.randint(1, posts),
+        "user_id": lambda: rng.randint(1, users),
+        "tag_id": lambda: rng.randint(1, volumes["tags"]),
+        "own_post_id": lambda: user_id + users * rng.randrange(max(1, posts // users)),
+        "username": lambda: seed.username(rng.randint(1, users)),
+        "password": lambda: seed.PASSWORD,
+        "word": lambda: rng.choice(SEARCH_WORDS),
+        "n": lambda: next(counter),
+    }
+
+
+def fill(value, values):
+    """替换占位符；整个字符串就是一个占位符时保留取值的类型（如 "{tag_id}" → 整数）"""
+    if isinstance(value, str):
+        match = _PLACEHOLDER.fullmatch(value)
+        if match:
+            return values[match.group(1)]()
+        return _PLACEHOLDER.sub(lambda m: str(values[m.group(1)]()), value)
+    if isinstance(value, list):
+        return [fill(item, values) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, values) for key, item in value.items()}
+    return value
+
+
+async def send(client, entry, rng, volumes, tokens, counter):
+    user_id = rng.choice(list(tokens)) if entry.get("auth") else None
+    values = placeholders(rng, volumes, user_id, counter)
+    return await client.request(
+        entry["method"],
+        fill(entry["path"], values),
+        json=fill(entry.get("body"), values),
+        headers=tokens[user_id] if user_id else None
+    )
+
+
+async def login_pool(client, volumes, size):
+    """为前 size 个种子用户登录，返回 {用户 id: 认证请求头}"""
+    tokens = {}
+    for user_id in range(1, min(size, volumes["users"]) + 1):
+        response = await client.post(
+            "/auth/login", json={"username": seed.username(user_id), "password": seed.PASSWORD}
+        )
+        response.raise_for_status()
+        tokens[user_id] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return tokens
+
+
+class QueryCounter:
+    """用 sqlite3 的 trace 回调统计实际执行的 SQL 语句数（回调在 aiosqlite 的线程中执行）"""
+
+    IGNORED = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "--")
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement):
+        if not statement.lstrip().upper().startswith(self.IGNORED):
+            self.count += 1
+
+    async def _set(self, callback):
+        from tortoise import connections
+
+        for client in connections.all():
+            await client.create_connection(with_db=True)
+            # aiosqlite 的连接只能在其工作线程中操作
+            connection = client._connection
+            await connection._execute(connection._conn.set_trace_callback, callback)
+
+    async def install(self):
+        await self._set(self)
+
+    async def uninstall(self):
+        await self._set(None)
+
+
+async def count_queries(client, entries, volumes, tokens, counter, repeat=3):
+    """对每个接口串行发送 repeat 次请求，返回 {接口: 每次请求执行的 SQL 语句数（中位数）}"""
+    catalog = {}
+    for entry in entries:
+        catalog.setdefault(entry["name"], entry)
+
+    queries = QueryCounter()
+    await queries.install()
+    rng = random.Random(1)
+    result = {}
+    try:
+        for name, entry in catalog.items():
+            counts = []
+            for _ in range(repeat):
+                before = queries.count
+                await send(client, entry, rng, volumes, tokens, counter)
+                counts.append(queries.count - before)
+            result[name] = statistics.median(counts)
+    finally:
+        await queries.uninstall()
+    return result
+
+
+def request_source(entries, mix):
+    """返回取下一个请求的函数：回放轨迹时按顺序循环，合成负载时按权重抽样"""
+    if mix is None:
+        cycle = itertools.cycle(entries)
+        return lambda rng: next(cycle)
+
+    catalog = {}
+    for entry in entries:
+        catalog.setdefault(entry["name"], entry)
+    missing = set(MIXES[mix]) - set(catalog)
+    if missing:
+        raise ValueError(f"轨迹中缺少合成负载 {mix} 所需的接口: {', '.join(sorted(missing))}")
+    names = list(MIXES[mix])
+    weights = [MIXES[mix][name] for name in names]
+    return lambda rng: catalog[rng.choices(names, weights)[0]]
+
+
+async def run_load(client, next_entry, args, volumes, tokens, counter):
+    """以 concurrency 个并发客户端发送请求，直到达到 requests 数量或 duration 秒"""
+    stats = {}
+    remaining = args.requests
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    async def worker(worker_seed):
+        nonlocal remaining
+        rng = random.Random(worker_seed)
+        while (deadline is None and remaining > 0) or (deadline is not None and time.monotonic() < deadline):
+            remaining -= 1
+            entry = next_entry(rng)
+            start = time.perf_counter()
+            try:
+                status = (await send(client, entry, rng, volumes, tokens, counter)).status_code
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - start
+            item = stats.setdefault(entry["name"], {"latencies": [], "errors": 0})
+            item["latencies"].append(elapsed)
+            if status is None or status >= 400:
+                item["errors"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return stats, time.perf_counter() - start
+
+
+def summarize(stats, elapsed, queries, meta):
+    endpoints = {}
+    for name, item in sorted(stats.items()):
+        latencies = item["latencies"]
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": item["errors"],
+            "p50": round(percentile(latencies, 0.5), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "queries": queries.get(name),
+        }
+    total = sum(item["requests"] for item in endpoints.values())
+    return {
+        "meta": meta,
+        "requests": total,
+        "errors": sum(item["errors"] for item in endpoints.values()),
+        "rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(result):
+    print(f"{'接口':<26}{'请求':>7}{'错误':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'查询':>6}")
+    for name, item in result["endpoints"].items():
+        queries = "-" if item["queries"] is None else f"{item['queries']:g}"
+        print(f"{name:<26}{item['requests']:>7}{item['errors']:>6}{item['p50']:>10.1f}"
+              f"{item['p95']:>10.1f}{item['p99']:>10.1f}{queries:>6}")
+    print(f"合计 {result['requests']} 个请求，{result['errors']} 个错误，{result['rps']} req/s")
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """与基线比较，返回回归描述列表：查询次数增加、错误增加、p50/p95 明显变慢"""
+    regressions = []
+    for name, base in baseline["endpoints"].items():
+        current = result["endpoints"].get(name)
+        if current is None:
+            continue
+        if base["queries"] is not None and current["queries"] is not None and current["queries"] > base["queries"]:
+            regressions.append(f"{name}: 查询次数 {base['queries']:g} → {current['queries']:g}")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: 错误 {base['errors']} → {current['errors']}")
+        for pct in ("p50", "p95"):
+            if current[pct] > base[pct] * (1 + tolerance) + MIN_DELTA_MS:
+                regressions.append(f"{name}: {pct} {base[pct]:.1f}ms → {current[pct]:.1f}ms")
+    return regressions
+
+
+async def run_inprocess(args, entries, volumes):
+    from utils import tag_index
+
+    counter = itertools.count(1)
+    # 所有请求来自同一客户端地址，关闭准入控制，避免登录请求被限速
+    async with app_client(ADMISSION_CONTROL=False) as (app, client):
+        seed.populate(os.path.abspath("db.sqlite3"), **volumes)
+        # 索引在应用启动时已从空库加载
+        await tag_index.index.load()
+        tokens = await login_pool(client, volumes, args.auth_users)
+        queries = await count_queries(client, entries, volumes, tokens, counter) if args.query_counts else {}
+        stats, elapsed = await run_load(client, request_source(entries, args.mix), args, volumes, tokens, counter)
+    return stats, elapsed, queries
+
+
+async def run_server(args, entries, volumes):
+    import httpx
+
+    directory = tempfile.mkdtemp(prefix="sanic_demo_loadtest_")
+    await seed.create_database(os.path.join(directory, "db.sqlite3"), **volumes)
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(args.workers)],
+        cwd=directory,
+        env={**os.environ, "PYTHONPATH": ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+            await wait_ready(client)
+            tokens = await login_pool(client, volumes, args.auth_users)
+            counter = itertools.count(1)
+            stats, elapsed = await run_load(client, request_source(entries, args.mix), args, volumes, tokens, counter)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return stats, elapsed, {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", default=DEFAULT_TRACE, help="JSONL 请求轨迹")
+    parser.add_argument("--mix", choices=sorted(MIXES), help="按合成比例生成请求（接口定义取自轨迹），不按顺序回放")
+    parser.add_argument("--target", choices=("inprocess", "server"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="--target server 时的 worker 数量")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=0, help="按时长压测（秒），设置后忽略 --requests")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--auth-users", type=int, default=10, help="预先登录、用于认证请求的用户数")
+    parser.add_argument("--no-query-counts", dest="query_counts", action="store_false")
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    parser.add_argument("--save-baseline", help="将结果保存为基线文件")
+    parser.add_argument("--baseline", help="与基线文件比较，出现回归时以状态码 1 退出")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="延迟回归的相对容忍度")
+    seed.add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    entries = load_trace(args.trace)
+    volumes = seed.volumes(args)
+    runner = run_inprocess if args.target == "inprocess" else run_server
+    stats, elapsed, queries = asyncio.run(runner(args, entries, volumes))
+
+    meta = {
+        "target": args.target,
+        "workers": args.workers if args.target == "server" else 1,
+        "trace": os.path.relpath(args.trace, ROOT),
+        "mix": args.mix,
+        "requests": args.requests,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "volumes": volumes,
+    }
+    result = summarize(stats, elapsed, queries, meta)
+    print_report(result)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        changed = sorted(key for key in meta if baseline["meta"].get(key) != meta[key])
+        if changed:
+            print(f"注意：以下参数与基线不同，延迟对比仅供参考: {', '.join(changed)}")
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"[回归] {line}")
+        if regressions:
+            sys.exit(1)
+        print("与基线相比没有回归")
+
+
+if __name__ == "__main__":
+    main()
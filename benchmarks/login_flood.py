@@ -0,0 +1,122 @@
+"""
+登录洪水下其他接口的延迟：对比开启准入控制（ADMISSION_CONTROL=True）与关闭时，
+持续的错误密码登录请求对同时访问帖子详情的正常请求的影响
+
+    python -m benchmarks.login_flood --duration 10 --rate 100
+
+每种配置在独立的子进程中进程内（ASGI）启动应用（同一进程中应用只能启动一次）。洪水请求来自同一客户端地址，
+按 --rate 的固定速率发送（两种配置下客户端的开销相同），轮换用户名；正常请求顺序发送，统计其延迟分位数。关闭准入控制时每个洪水请求都要查询用户并
+执行一次 bcrypt（哈希线程池满时返回 503），开启时超出限速的请求在解析请求体之前返回 429。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks.common import app_client
+from benchmarks.sqlite_mixed import percentile
+from benchmarks.worker_scaling import ROOT
+
+MODES = {"on": True, "off": False}
+
+
+async def flood(client, deadline, rate, statuses):
+    """按固定速率发送错误密码的登录请求（不等待前一个请求完成），轮换用户名"""
+    async def attempt(n):
+        response = await client.post(
+            "/auth/login", json={"username": f"victim{n % 50}", "password": "wrong-password"}
+        )
+        statuses[response.status_code] += 1
+
+    pending = set()
+    next_at = time.monotonic()
+    n = 0
+    while next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        task = asyncio.ensure_future(attempt(n))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        n += 1
+        next_at += 1 / rate
+    await asyncio.gather(*pending)
+
+
+async def browse(client, deadline, latencies, statuses):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/api/v1/posts/1")
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] += 1
+
+
+async def measure(args):
+    """在当前进程中按 --mode 启动应用，返回正常请求的延迟分位数和双方的状态码计数"""
+    async with app_client(ADMISSION_CONTROL=MODES[args.mode], RESPONSE_CACHE_MAX_BYTES=0) as (app, client):
+        from models.post import Post
+        from models.user import User
+        from utils.passwords import hash_password
+        # bulk_create 不经过 User.save，直接写入已哈希的密码
+        hashed = await hash_password("bench-password")
+        await User.bulk_create([User(username=f"victim{i}", password=hashed, email=f"victim{i}@example.com")
+                                for i in range(50)])
+        await Post.create(title="post", content="内容 " * 50, user_id=1)
+
+        deadline = time.monotonic() + args.duration
+        flood_statuses = Counter()
+        browse_statuses = Counter()
+        latencies = []
+        await asyncio.gather(
+            browse(client, deadline, latencies, browse_statuses),
+            flood(client, deadline, args.rate, flood_statuses)
+        )
+        return {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "browse_rps": len(latencies) / args.duration,
+            "browse": dict(browse_statuses),
+            "flood": dict(flood_statuses)
+        }
+
+
+def run_child(mode, args):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.login_flood", "--mode", mode,
+         "--duration", str(args.duration), "--rate", str(args.rate)],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT},
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(args):
+    print(f"{'admission':<9}  {'p50':>8}  {'p95':>8}  {'p99':>8}  {'rps':>6}  flood statuses")
+    for mode in ("off", "on"):
+        result = run_child(mode, args)
+        flood_statuses = ", ".join(f"{status}: {n}" for status, n in sorted(result["flood"].items()))
+        print(f"{mode:<9}  {result['p50']:>6.1f}ms  {result['p95']:>6.1f}ms  {result['p99']:>6.1f}ms  "
+              f"{result['browse_rps']:>6.1f}  {flood_statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10, help="每种配置的压测秒数")
+    parser.add_argument("--rate", type=float, default=100, help="洪水登录请求的速率（每秒请求数）")
+    parser.add_argument("--mode", choices=tuple(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    if args.mode:
+        # 子进程：只输出一行 JSON 结果
+        print(json.dumps(asyncio.run(measure(args))))
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
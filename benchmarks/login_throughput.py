@@ -0,0 +1,86 @@
+"""
+登录吞吐量基准：并发登录的同时测量事件循环延迟
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 20
+    python -m benchmarks.login_throughput --workers 0   # 在事件循环中同步执行 bcrypt 作为对照
+
+事件循环延迟由一个每 10ms 唤醒一次的探针任务测得：实际唤醒时间比预期晚多少，
+就说明事件循环被阻塞了多久。哈希在线程池中执行时，最大延迟应保持在几毫秒内。
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from benchmarks.common import app_client
+from utils import passwords
+
+PROBE_INTERVAL = 0.01
+
+
+async def probe_loop_lag(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def run(args):
+    async with app_client(
+        PASSWORD_HASH_WORKERS=args.workers,
+        PASSWORD_HASH_QUEUE_LIMIT=args.logins,
+        PASSWORD_HASH_ROUNDS=args.rounds,
+        # 测量的是哈希线程池本身，关闭按 IP / 用户名的限速和并发上限
+        ADMISSION_CONTROL=False
+    ) as (app, client):
+        from models.user import User
+        await User.create(username="bench", password="bench-password", email="bench@example.com")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        statuses = []
+
+        async def one_login():
+            async with semaphore:
+                response = await client.post(
+                    "/auth/login",
+                    json={"username": "bench", "password": "bench-password"}
+                )
+                statuses.append(response.status_code)
+
+        stop = asyncio.Event()
+        lags = []
+        probe = asyncio.create_task(probe_loop_lag(stop, lags))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await probe
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    print(f"hash workers:      {args.workers if args.workers is not None else 'default'}")
+    print(f"bcrypt rounds:     {passwords.hasher.rounds}")
+    print(f"logins:            {args.logins} (concurrency {args.concurrency})")
+    print(f"status codes:      { {s: statuses.count(s) for s in set(statuses)} }")
+    print(f"throughput:        {args.logins / elapsed:.1f} logins/s")
+    print(f"loop lag p50:      {statistics.median(lags_ms):.2f} ms")
+    print(f"loop lag p99:      {lags_ms[int(len(lags_ms) * 0.99) - 1]:.2f} ms")
+    print(f"loop lag max:      {lags_ms[-1]:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None, help="哈希线程数，0 表示在事件循环中同步执行")
+    parser.add_argument("--rounds", type=int, default=None, help="bcrypt 成本，不指定时按目标耗时自动校准")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+匿名请求的认证开销基准：对比按路由认证级别跳过 JWT 中间件（AUTH_ROUTE_POLICY=True）
+与每个请求都在中间件中解析令牌（False）时公开接口的 RPS
+
+    python -m benchmarks.route_auth --duration 5 --rounds 3
+
+每种配置在独立的子进程中进程内（ASGI）启动应用（同一进程中应用只能启动一次），两种配置交替先后运行
+--rounds 轮，取每个接口的最高 RPS 和最低的服务端耗时中位数（另行顺序发送 --samples 个请求测得）。"anon" 为不带 Authorization 头的请求，
+"token" 为携带有效访问令牌访问公开接口（客户端统一附带令牌的常见情况）。
+
+ASGI 客户端与应用共用 CPU，RPS 受客户端开销和机器负载影响较大；服务端耗时取自响应的
+Server-Timing 头（app，从第一个请求中间件到最后一个响应中间件，包含 JWT 中间件），
+顺序发送时不含事件循环上的排队时间，更能反映节省的时间。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import app_client, login
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = (
+    ("root", "/"),
+    ("tags", "/api/v1/tags"),
+    ("posts", "/api/v1/posts?limit=20"),
+)
+POLICIES = {"on": True, "off": False}
+APP_DURATION = re.compile(r"app;dur=([0-9.]+)")
+
+
+async def load(client, path, headers, duration, concurrency):
+    done = 0
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            response = await client.get(path, headers=headers)
+            done += 1
+            if response.status_code != 200:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / duration, errors
+
+
+async def server_time(client, path, headers, samples):
+    """顺序发送请求，返回服务端耗时（Server-Timing 的 app）的中位数，单位 ms"""
+    app_ms = []
+    for _ in range(samples):
+        response = await client.get(path, headers=headers)
+        match = APP_DURATION.search(response.headers.get("server-timing", ""))
+        if match:
+            app_ms.append(float(match.group(1)))
+    return statistics.median(app_ms) if app_ms else 0.0
+
+
+async def measure(args):
+    """在当前进程中按 --policy 启动应用并压测，返回 {接口/请求类型: [rps, 服务端耗时中位数 ms, errors]}"""
+    async with app_client(AUTH_ROUTE_POLICY=POLICIES[args.policy]) as (app, client):
+        from models.post import Post
+        from models.tag import Tag
+        from models.user import User
+        user = await User.create(username="bench", password="bench-password", email="bench@example.com")
+        await Tag.bulk_create([Tag(name=f"tag{i}") for i in range(20)])
+        await Post.bulk_create([Post(title=f"post {i}", content="内容 " * 50, user_id=user.id) for i in range(100)])
+        token = await login(client, "bench", "bench-password")
+
+        results = {}
+        for name, path in ENDPOINTS:
+            for kind, headers in (("anon", {}), ("token", token)):
+                # 预热：填充响应缓存和令牌声明缓存
+                await load(client, path, headers, 0.2, args.concurrency)
+                rps, errors = await load(client, path, headers, args.duration, args.concurrency)
+                app_ms = await server_time(client, path, headers, args.samples)
+                results[f"{name}/{kind}"] = (rps, app_ms, errors)
+        return results
+
+
+def run_child(policy, args):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.route_auth", "--policy", policy,
+         "--duration", str(args.duration), "--concurrency", str(args.concurrency),
+         "--samples", str(args.samples)],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT},
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(args):
+    best = {"on": {}, "off": {}}
+    for round_no in range(args.rounds):
+        for policy in (("off", "on") if round_no % 2 else ("on", "off")):
+            for key, (rps, app_ms, errors) in run_child(policy, args).items():
+                previous = best[policy].get(key, (0, float("inf"), 0))
+                best[policy][key] = (max(previous[0], rps), min(previous[1], app_ms), previous[2] + errors)
+        print(f"第 {round_no + 1}/{args.rounds} 轮完成", file=sys.stderr)
+
+    print(f"{'endpoint':<12}  {'eager rps':>9}  {'route rps':>9}  {'gain':>7}  "
+          f"{'eager app':>9}  {'route app':>9}  {'saved':>7}  errors")
+    for key, (off_rps, off_ms, off_errors) in best["off"].items():
+        on_rps, on_ms, on_errors = best["on"][key]
+        print(f"{key:<12}  {off_rps:>9.1f}  {on_rps:>9.1f}  {(on_rps / off_rps - 1) * 100:>6.1f}%  "
+              f"{off_ms * 1000:>7.0f}us  {on_ms * 1000:>7.0f}us  {(off_ms - on_ms) * 1000:>5.0f}us  "
+              f"{off_errors + on_errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=5, help="每个接口的压测秒数")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=500, help="测量服务端耗时时顺序发送的请求数")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--policy", choices=tuple(POLICIES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    if args.policy:
+        # 子进程：只输出一行 JSON 结果
+        print(json.dumps(asyncio.run(measure(args))))
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+按指定规模填充基准数据库（用户、帖子、标签及其关联）
+
+    python -m benchmarks.seed --db /tmp/bench/db.sqlite3 --users 1000 --posts 100000 --tags 200
+
+先创建并迁移数据库，再直接用 sqlite3 的 executemany 批量写入（每批一个事务），
+FTS 索引由触发器同步。所有用户共用同一个密码（只计算一次 bcrypt 哈希），
+帖子按 id 轮流分配给用户：帖子 i 的作者为 (i - 1) % users + 1。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import bcrypt
+
+from utils import passwords
+
+PASSWORD = "bench-password"
+BATCH_SIZE = 10000
+WORDS = ["sanic", "tortoise", "sqlite", "缓存", "索引", "并发", "python", "异步", "性能", "查询", "分页", "事务"]
+
+
+def username(i):
+    return f"user{i}"
+
+
+def author_of(post_id, users):
+    """帖子的作者 id（与 populate 的分配方式一致）"""
+    return (post_id - 1) % users + 1
+
+
+def _timestamps(count, start):
+    # 与 Tortoise 写入的格式一致（str(datetime)，带时区），按 id 递增
+    return [str(start + timedelta(seconds=i)) for i in range(count)]
+
+
+def populate(path, users=100, posts=10000, tags=50, tags_per_post=3, content_size=1000, seed=0):
+    """向已迁移的空数据库写入数据，返回 {表: 行数}"""
+    rng = random.Random(seed)
+    # 与应用默认配置相同的校准成本，登录时不会触发重新哈希
+    password = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(passwords.calibrate())).decode('utf-8')
+    start = datetime.now(timezone.utc) - timedelta(seconds=users + posts)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        stamps = _timestamps(users, start)
+        conn.executemany(
+            'INSERT INTO "users" ("id", "username", "password", "email", "created_at", "updated_at") '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(i, username(i), password, f"{username(i)}@example.com", stamps[i - 1], stamps[i - 1])
+             for i in range(1, users + 1)]
+        )
+        conn.executemany(
+            'INSERT INTO "tags" ("id", "name") VALUES (?, ?)',
+            [(i, f"tag{i}") for i in range(1, tags + 1)]
+        )
+        conn.execute("COMMIT")
+
+        links = 0
+        for offset in range(0, posts, BATCH_SIZE):
+            ids = range(offset + 1, min(offset + BATCH_SIZE, posts) + 1)
+            stamps = _timestamps(len(ids), start + timedelta(seconds=users + offset))
+            rows = []
+            post_tags = []
+            for post_id, stamp in zip(ids, stamps):
+                words = " ".join(rng.choices(WORDS, k=max(1, content_size // 6)))
+                rows.append((post_id, f"post {post_id} {rng.choice(WORDS)}", words[:content_size],
+                             stamp, stamp, author_of(post_id, users)))
+                if tags:
+                    post_tags.extend(
+                        (post_id, tag_id) for tag_id in rng.sample(range(1, tags + 1), min(tags_per_post, tags))
+                    )
+            conn.execute("BEGIN")
+            conn.executemany(
+                'INSERT INTO "posts" ("id", "title", "content", "created_at", "updated_at", "user_id") '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.executemany('INSERT INTO "posts_tags" ("posts_id", "tag_id") VALUES (?, ?)', post_tags)
+            conn.execute("COMMIT")
+            links += len(post_tags)
+
+        conn.execute("PRAGMA optimize")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return {"users": users, "posts": posts, "tags": tags, "posts_tags": links}
+
+
+async def create_database(path, **volumes):
+    """创建并迁移数据库文件，然后填充数据"""
+    from tortoise import Tortoise, connections
+    from utils.db import tortoise_config
+    from utils.migrations import migrate
+
+    await Tortoise.init(config=tortoise_config({"DB_URL": f"sqlite://{path}"}))
+    try:
+        await migrate()
+    finally:
+        await connections.close_all()
+    return populate(path, **volumes)
+
+
+def add_volume_arguments(parser):
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--tags-per-post", type=int, default=3)
+    parser.add_argument("--content-size", type=int, default=1000, help="每篇帖子内容的字符数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+
+
+def volumes(args):
+    return {
+        "users": args.users, "posts": args.posts, "tags": args.tags,
+        "tags_per_post": args.tags_per_post, "content_size": args.content_size, "seed": args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="数据库文件路径（须不存在）")
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} 已存在")
+
+    logging.disable(logging.INFO)
+    start = time.perf_counter()
+    counts = asyncio.run(create_database(os.path.abspath(args.db), **volumes(args)))
+    print(f"已写入 {counts}，耗时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
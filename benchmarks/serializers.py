@@ -0,0 +1,87 @@
+"""
+序列化微基准：对比手写字典 + sanic.response.json 与预编译序列化器 + 字节编码
+
+    python -m benchmarks.serializers --rows 10000
+
+不访问数据库，使用与 ORM 对象属性一致的内存对象，只测量序列化本身的开销。
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sanic.response import json
+
+from schemas.post import PostResponse
+from utils.serializers import compile_serializer, json_response
+
+
+def make_posts(rows):
+    now = datetime.now(timezone.utc)
+    user = SimpleNamespace(id=1, username="bench")
+    tags = [SimpleNamespace(id=i, name=f"tag-{i}") for i in range(3)]
+    return [
+        SimpleNamespace(
+            id=i,
+            title=f"标题 {i}",
+            content="内容 " * 40,
+            created_at=now,
+            updated_at=now,
+            user=user,
+            tags=tags
+        )
+        for i in range(rows)
+    ]
+
+
+def baseline(posts):
+    # 重构前 PostView.get 的写法
+    return json({
+        "posts": [{
+            "id": post.id,
+            "title": post.title,
+            "content": post.content,
+            "created_at": str(post.created_at),
+            "updated_at": str(post.updated_at),
+            "user": {
+                "id": post.user.id,
+                "username": post.user.username
+            },
+            "tags": [{
+                "id": tag.id,
+                "name": tag.name
+            } for tag in post.tags]
+        } for post in posts]
+    })
+
+
+serialize_post = compile_serializer(PostResponse)
+
+
+def compiled(posts):
+    return json_response({"posts": [serialize_post(post) for post in posts]})
+
+
+def measure(func, posts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = func(posts)
+        best = min(best, time.perf_counter() - start)
+    return best, len(response.body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    posts = make_posts(args.rows)
+    for name, func in (("hand-built dict + json()", baseline), ("compiled serializer", compiled)):
+        elapsed, size = measure(func, posts, args.repeat)
+        print(f"{name:<26} {args.rows / elapsed:>12,.0f} rows/s  {elapsed * 1000:8.1f} ms  {size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
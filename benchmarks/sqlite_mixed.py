@@ -0,0 +1,144 @@
+"""
+SQLite 混合读写负载基准
+
+    python -m benchmarks.sqlite_mixed --profile tuned --external-writers 2
+    python -m benchmarks.sqlite_mixed --profile baseline --external-writers 2
+
+baseline 使用 SQLite 默认的 PRAGMA（busy_timeout=0、synchronous=FULL）且读写共用一个连接；
+tuned 使用 utils.db 中的性能配置和读写连接分离。--external-writers 会启动若干个
+独立进程持续写同一个数据库文件，模拟多 worker 部署下的写入竞争。
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks.common import app_client, login
+
+PROFILES = {
+    "baseline": {
+        "DB_READ_WRITE_SPLIT": False,
+        "SQLITE_PRAGMAS": {
+            "synchronous": "FULL",
+            "cache_size": -2000,
+            "mmap_size": 0,
+            "busy_timeout": 0,
+            "temp_store": "DEFAULT",
+        },
+    },
+    "tuned": {
+        "DB_READ_WRITE_SPLIT": True,
+        "SQLITE_PRAGMAS": {},
+    },
+}
+
+
+def external_writer(path, stop, busy_timeout):
+    """独立进程：每 10ms 执行一个短写事务"""
+    conn = sqlite3.connect(path, isolation_level=None, timeout=busy_timeout / 1000)
+    i = 0
+    while not stop.is_set():
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO tags (name) VALUES (?)", (f"ext-{os.getpid()}-{i}",))
+            time.sleep(0.002)
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        i += 1
+        time.sleep(0.01)
+    conn.close()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000 if values else 0.0
+
+
+async def run(args):
+    profile = PROFILES[args.profile]
+    async with app_client(RESPONSE_CACHE_MAX_BYTES=0, **profile) as (app, client):
+        from models.user import User
+        from models.post import Post
+
+        user = await User.create(username="bench", password="bench-password", email="bench@example.com")
+        headers = await login(client, "bench", "bench-password")
+        for i in range(0, args.posts, 500):
+            await Post.bulk_create([
+                Post(title=f"post {j}", content="内容 " * 50, user_id=user.id)
+                for j in range(i, min(i + 500, args.posts))
+            ])
+
+        stop = multiprocessing.Event()
+        busy_timeout = app.config.SQLITE_PRAGMAS.get("busy_timeout", 5000)
+        writers = [
+            multiprocessing.Process(target=external_writer, args=(os.path.abspath("db.sqlite3"), stop, busy_timeout))
+            for _ in range(args.external_writers)
+        ]
+        for w in writers:
+            w.start()
+
+        latencies = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+
+        async def worker():
+            rng = random.Random()
+            for _ in range(args.requests // args.concurrency):
+                if rng.random() < args.write_ratio:
+                    kind = "write"
+                    start = time.perf_counter()
+                    if rng.random() < 0.5:
+                        response = await client.post("/api/v1/posts", json={"title": "t", "content": "c"}, headers=headers)
+                    else:
+                        post_id = rng.randint(1, args.posts)
+                        response = await client.put(f"/api/v1/posts/{post_id}", json={"title": "u", "content": "u"}, headers=headers)
+                else:
+                    kind = "read"
+                    start = time.perf_counter()
+                    if rng.random() < 0.5:
+                        response = await client.get("/api/v1/posts?limit=20")
+                    else:
+                        response = await client.get(f"/api/v1/posts/{rng.randint(1, args.posts)}")
+                latencies[kind].append(time.perf_counter() - start)
+                if response.status_code >= 500:
+                    errors[kind] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        for w in writers:
+            w.join()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"profile:           {args.profile} (external writers: {args.external_writers})")
+    print(f"throughput:        {total / elapsed:.1f} req/s")
+    for kind in ("read", "write"):
+        values = latencies[kind]
+        if values:
+            print(f"{kind:<6} n={len(values):<6} p50={percentile(values, 0.5):7.1f} ms  "
+                  f"p95={percentile(values, 0.95):7.1f} ms  errors={errors[kind]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="tuned")
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--external-writers", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
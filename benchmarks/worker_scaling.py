@@ -0,0 +1,138 @@
+"""
+多 worker 扩展性基准：分别以 1..N 个 worker 启动 serve.py，测量帖子列表和详情接口的 RPS
+
+    python -m benchmarks.worker_scaling --max-workers 4 --duration 10
+
+每一轮都在同一个预先填充好的临时数据库上启动真实的多进程服务器，压测客户端使用
+httpx 在本进程内并发发起请求。客户端本身也会消耗 CPU，核数较少时结果偏保守。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def seed(directory, posts):
+    from tortoise import Tortoise, connections
+    from models.user import User
+    from models.post import Post
+    from utils.db import tortoise_config
+    from utils.migrations import migrate
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        await Tortoise.init(config=tortoise_config({}))
+        await migrate()
+        user = await User.create(username="bench", password="bench-password", email="bench@example.com")
+        for i in range(0, posts, 500):
+            await Post.bulk_create([
+                Post(title=f"post {j}", content="内容 " * 50, user_id=user.id)
+                for j in range(i, min(i + 500, posts))
+            ])
+        await connections.close_all()
+    finally:
+        os.chdir(cwd)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("服务器未能在规定时间内启动")
+
+
+async def load(client, path_for, duration, concurrency):
+    done = 0
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        nonlocal done, errors
+        rng = random.Random()
+        while time.monotonic() < deadline:
+            response = await client.get(path_for(rng))
+            done += 1
+            if response.status_code != 200:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / duration, errors
+
+
+async def run_round(directory, workers, args):
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        cwd=directory,
+        env={**os.environ, "PYTHONPATH": ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            await wait_ready(client)
+            results = {}
+            for name, path_for in (
+                ("list", lambda rng: "/api/v1/posts?limit=20"),
+                ("detail", lambda rng: f"/api/v1/posts/{rng.randint(1, args.posts)}"),
+            ):
+                results[name] = await load(client, path_for, args.duration, args.concurrency)
+            return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def run(args):
+    directory = tempfile.mkdtemp(prefix="sanic_demo_scaling_")
+    await seed(directory, args.posts)
+
+    print(f"{'workers':>7}  {'list rps':>10}  {'detail rps':>10}  errors")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        results = await run_round(directory, workers, args)
+        list_rps, list_errors = results["list"]
+        detail_rps, detail_errors = results["detail"]
+        baseline = baseline or (list_rps, detail_rps)
+        print(f"{workers:>7}  {list_rps:>10.1f}  {detail_rps:>10.1f}  {list_errors + detail_errors}"
+              f"   (x{list_rps / baseline[0]:.2f} / x{detail_rps / baseline[1]:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--posts", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+from multiprocessing import Value
+
 from sanic import Sanic
 from sanic.response import json
 from sanic_cors import CORS
+from tortoise import Tortoise, connections
 from tortoise.contrib.sanic import register_tortoise
 
 # 导入蓝图
@@ -8,32 +11,182 @@ from apps.api_v1.routes import bp as v1_blueprint
 from apps.api_v2.routes import bp as v2_blueprint
 from apps.auth.routes import bp as auth_bp
 from middleware.jwt_middleware import add_user_to_request
+from middleware import admission, instrumentation, refresh_tokens, route_auth, token_service, user_cache
+from utils import passwords, response_cache, tag_index, write_behind
+from utils.db import tortoise_config
+from utils.migrations import migrate
 
 app = Sanic("MyApp")
 
 # 配置
 app.config.update({
-    'DB_URL': 'sqlite:///db.sqlite3',
+    'DB_URL': 'sqlite://db.sqlite3',
+    'DB_READ_WRITE_SPLIT': True,  # 读查询使用独立的只读连接
+    'SQLITE_PRAGMAS': {},  # 覆盖 utils.db.DEFAULT_SQLITE_PRAGMAS 中的默认值
     'JWT_SECRET': 'your-very-secret-and-very-long-random-key-here',
     'JWT_ACCESS_TOKEN_EXPIRES': 60 * 30,  # 30分钟
     'JWT_REFRESH_TOKEN_EXPIRES': 60 * 60 * 24 * 30,  # 30天
+    'JWT_ALGORITHM': 'HS256',  # 签发与校验令牌使用的算法
+    'JWT_CLAIMS_CACHE_SIZE': 4096,  # 已校验令牌声明的缓存容量（按令牌哈希缓存到过期）
+    'AUTH_ROUTE_POLICY': True,  # 按路由的认证级别跳过公开路由的 JWT 处理，False 时每个请求都在中间件中解析令牌
+    'AUTH_DEFAULT_POLICY': 'public',  # 未标记认证级别的处理函数：public / optional / required
+    'REFRESH_REVOKED_CAPACITY': 100000,  # 已吊销刷新令牌内存索引的预期容量（布隆过滤器按此分配）
+    'PAGE_DEFAULT_LIMIT': 20,  # 列表接口默认每页条数
+    'PAGE_MAX_LIMIT': 100,  # 列表接口每页条数上限
+    'STREAM_BATCH_SIZE': 500,  # 流式导出时每批读取的行数
+    'TAG_INDEX_REFRESH': 60,  # 标签倒排索引的后台重建间隔（秒），兜底多 worker 间的同步，0 表示不重建
+    'BULK_MAX_ITEMS': 10000,  # 批量导入接口单次请求的条目上限
+    'BULK_CHUNK_SIZE': 500,  # 批量导入时每个事务写入的条目数
+    'RESPONSE_CACHE_MAX_BYTES': 16 * 1024 * 1024,  # 响应缓存容量（字节）
+    'RESPONSE_CACHE_TTL': 30,  # 响应缓存过期时间（秒），兜底多 worker 间的失效延迟
+    'USER_CACHE_SIZE': 1024,  # 已认证用户缓存容量
+    'USER_CACHE_TTL': 60,  # 已认证用户缓存过期时间（秒）
+    'PASSWORD_HASH_WORKERS': None,  # 密码哈希线程数，None 表示 min(4, CPU 核数)
+    'PASSWORD_HASH_QUEUE_LIMIT': 32,  # 哈希任务排队上限，超出时返回 503
+    'PASSWORD_HASH_USE_PROCESSES': False,  # 是否改用进程池执行哈希
+    'PASSWORD_HASH_ROUNDS': None,  # 固定的 bcrypt 成本，None 表示启动时按目标耗时自动校准
+    'PASSWORD_HASH_TARGET_MS': 250,  # 自动校准时单次哈希的目标耗时（毫秒）
+    'PASSWORD_HASH_MIN_ROUNDS': 10,  # 自动校准的成本下限
+    'ADMISSION_CONTROL': True,  # 准入控制：按 IP / 用户名限速和按路由类别限制并发，False 时关闭
+    'ADMISSION_BACKEND': 'memory',  # 令牌桶存储：memory（各 worker 独立）/ shared（主进程分配的共享内存，各 worker 共用）
+    'ADMISSION_MAX_KEYS': 65536,  # 令牌桶的最大数量（shared 时为槽位数）
+    'ADMISSION_IP_RATES': {'login': (1, 20), 'refresh': (1, 20)},  # 各路由类别的每 IP 限速：(每秒补充令牌数, 桶容量)
+    'ADMISSION_USERNAME_RATE': (0.1, 5),  # 登录时每个 (用户名, 客户端 IP) 的限速，登录成功时退还令牌，None 表示不限
+    'ADMISSION_CONCURRENCY': {'login': 16, 'bulk': 2},  # 各路由类别同时处理的请求数上限（每个 worker）
+    'WRITE_BEHIND_INTERVAL': 1.0,  # 后台写入队列的刷新间隔（秒）
+    'WRITE_BEHIND_BATCH_SIZE': 500,  # 待写入行数达到该值时立即刷新
+    'WRITE_BEHIND_MAX_PENDING': 10000,  # 后台写入队列的容量，超出时丢弃新的更新
+    'SERVER_TIMING': True,  # 响应中附带 Server-Timing 头（数据库耗时、查询次数和总耗时）
+    'SLOW_QUERY_MS': 100,  # 耗时超过该值（毫秒）的 SQL 语句记录到日志
+    'N_PLUS_ONE_THRESHOLD': 5,  # 同一请求中同一语句执行达到该次数时记录可能的 N+1 查询，0 表示不检测
     'API_VERSION': '1.0.0',
     'API_TITLE': 'My API',
     'API_DESCRIPTION': 'API Documentation'
 })
 
-# 替换原有的数据库初始化
+# 统计每个请求的 SQL 语句（包装 Tortoise 客户端的 execute_* 方法）
+instrumentation.install()
+
+# 替换原有的数据库初始化（SQLite 性能配置与读写连接分离见 utils/db.py）
+TORTOISE_ORM = tortoise_config(app.config)
+
 register_tortoise(
     app,
-    db_url='sqlite://db.sqlite3',
-    modules={'models': ['models.user', 'models.post', 'models.tag']},
-    generate_schemas=True
+    config=TORTOISE_ORM,
+    generate_schemas=False
 )
 
+# 在主进程中执行一次迁移（幂等地创建表和索引），worker 启动时不再重复
+@app.listener('main_process_start')
+async def migrate_database(app, loop):
+    await Tortoise.init(config=TORTOISE_ORM)
+    await migrate()
+    await connections.close_all()
+    app.shared_ctx.schema_migrated = Value('b', 1)
+
+# ASGI 等不经过主进程启动的模式下在当前进程中迁移（在 register_tortoise 初始化连接之后、载入索引之前）
+@app.listener('before_server_start')
+async def migrate_database_fallback(app, loop):
+    if getattr(app.shared_ctx, 'schema_migrated', None) is None:
+        await migrate()
+
 # 初始化 CORS
 CORS(app)
 
-# 添加自定义JWT中间件
+# 令牌服务使用应用配置中的密钥和算法
+@app.listener('before_server_start')
+async def setup_token_service(app, loop):
+    token_service.configure(app.config)
+
+# 认证级别的配置；路由表在 sanic-ext 注册文档路由后才最终确定，在 after_server_start 中收集
+@app.listener('before_server_start')
+async def setup_route_auth(app, loop):
+    route_auth.configure(app.config)
+
+# 收集各路由的认证级别，公开路由和必须认证的路由不再经过 JWT 中间件（收集前由中间件按路由判断）
+@app.listener('after_server_start')
+async def collect_route_auth(app, loop):
+    route_auth.collect(app, jwt_middleware)
+
+# 载入已吊销的刷新令牌索引
+@app.listener('before_server_start')
+async def setup_refresh_tokens(app, loop):
+    refresh_tokens.configure(app.config)
+    await refresh_tokens.load()
+
+# 按配置初始化用户缓存
+@app.listener('before_server_start')
+async def setup_user_cache(app, loop):
+    user_cache.configure(app.config)
+
+# 初始化响应缓存
+@app.listener('before_server_start')
+async def setup_response_cache(app, loop):
+    response_cache.configure(app.config)
+
+# 加载标签倒排索引
+@app.listener('before_server_start')
+async def setup_tag_index(app, loop):
+    tag_index.configure(app.config)
+    await tag_index.index.load()
+
+# 查询统计的阈值和 Server-Timing 开关
+@app.listener('before_server_start')
+async def setup_instrumentation(app, loop):
+    instrumentation.configure(app.config)
+
+# 在主进程中确定一次 bcrypt 成本，各 worker 共用，避免不同 worker 的成本不一致导致登录时反复重新哈希
+@app.listener('main_process_start')
+async def calibrate_password_hash(app, loop):
+    app.shared_ctx.password_hash_rounds = Value('i', passwords.policy_rounds(app.config))
+
+# 初始化密码哈希线程池（ASGI 等不经过主进程启动的模式下在当前进程中校准）
+@app.listener('before_server_start')
+async def setup_password_hasher(app, loop):
+    shared = getattr(app.shared_ctx, 'password_hash_rounds', None)
+    passwords.configure(app.config, shared.value if shared is not None else None)
+
+# 多 worker 共用的令牌桶须在主进程中分配
+@app.listener('main_process_start')
+async def allocate_admission_buckets(app, loop):
+    if app.config.ADMISSION_BACKEND == 'shared':
+        app.shared_ctx.admission_buckets = admission.SharedBuckets.allocate(app.config.ADMISSION_MAX_KEYS)
+
+# 准入控制的限速和并发上限
+@app.listener('before_server_start')
+async def setup_admission(app, loop):
+    admission.configure(app.config, getattr(app.shared_ctx, 'admission_buckets', None))
+
+# 后台写入队列（登录时间等非关键更新）
+@app.listener('before_server_start')
+async def start_write_behind(app, loop):
+    write_behind.configure(app.config)
+    write_behind.queue.start()
+
+# 在关闭数据库连接之前写完队列中剩余的更新
+@app.listener('before_server_stop')
+async def drain_write_behind(app, loop):
+    await write_behind.queue.stop()
+
+@app.listener('after_server_stop')
+async def shutdown_password_hasher(app, loop):
+    passwords.hasher.shutdown()
+
+# 查询统计：最先开始、最后结束，包含 JWT 中间件和响应缓存中的查询
+@app.middleware('request', priority=100)
+async def instrumentation_start(request):
+    await instrumentation.start_request(request)
+
+@app.middleware('response', priority=-100)
+async def instrumentation_finish(request, response):
+    await instrumentation.finish_request(request, response)
+
+# 按客户端 IP 限速：在解析请求体、认证和访问数据库之前拒绝（排在查询统计之后，拒绝的请求也计入指标）
+@app.middleware('request', priority=90)
+async def admission_check(request):
+    return await admission.admit(request)
+
+# 添加自定义JWT中间件（只用于可选认证的路由，见 setup_route_auth）
 @app.middleware('request')
 async def jwt_middleware(request):
     return await add_user_to_request(request)
@@ -54,5 +207,23 @@ async def root(request):
         "documentation": "/docs"
     })
 
+@app.route("/stats")
+async def stats(request):
+    return json({
+        "user_cache": user_cache.stats(),
+        "token_claims_cache": token_service.stats(),
+        "refresh_tokens": refresh_tokens.stats(),
+        "password_hasher": passwords.hasher.stats(),
+        "response_cache": response_cache.stats(),
+        "tag_index": tag_index.index.stats(),
+        "write_behind": write_behind.queue.stats(),
+        "admission": admission.controller.stats()
+    })
+
+@app.route("/metrics")
+async def metrics(request):
+    # Prometheus 文本格式：按路由的请求数、耗时和 SQL 语句统计，以及后台写入队列和准入控制（当前 worker 进程）
+    return instrumentation.metrics_response(write_behind.queue.metrics, admission.controller.metrics)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=True) 
\ No newline at end of file
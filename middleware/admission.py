@@ -0,0 +1,319 @@
+"""
+请求准入控制：按客户端 IP 和用户名的令牌桶限速，以及按路由类别的并发上限
+
+路由类别由处理函数上的 limit() 装饰器声明（登录 login、刷新令牌 refresh、批量导入 bulk），
+未声明的路由为 default。请求中间件在解析 JSON 和访问数据库之前按 "类别:IP" 取令牌，
+令牌不足时直接返回 429 和 Retry-After；登录接口在查询用户之前再按 "用户名:IP" 取令牌，
+限制从同一地址针对单个账号的猜测，登录成功时退还该令牌。按用户名和地址共同计数，
+其他地址的失败尝试不会耗尽账号主人的令牌（不会被人从任意地址锁定账号）。
+limit() 装饰器限制同一类别同时处理的请求数（每个 worker 分别计数），超出时返回 503，不排队等待。
+
+令牌桶存储：
+- memory：各 worker 进程内的 LRU 表，最多 ADMISSION_MAX_KEYS 个键，超出时淘汰最久未使用的桶
+- shared：主进程分配的共享内存（经 app.shared_ctx 传给各 worker），所有 worker 共用同一组桶，
+  键按散列落到固定数量的槽位，不同的键落到同一槽位时后来者接管槽位
+其他实现 take(key, rate, burst, now) 和 refund(key, burst) 的对象也可以传给 configure() 作为存储。
+"""
+import math
+import time
+import zlib
+from collections import Counter, OrderedDict
+from functools import wraps
+from multiprocessing import Array
+
+from sanic.log import logger
+from sanic.response import json
+
+from middleware.route_auth import route_handler
+
+DEFAULT_CLASS = "default"
+DEFAULT_MAX_KEYS = 65536
+# 每个类别的每 IP 限速：(每秒补充的令牌数, 桶容量)，None 表示不限速
+DEFAULT_IP_RATES = {"login": (1, 20), "refresh": (1, 20)}
+DEFAULT_USERNAME_RATE = (0.1, 5)
+# 每个类别同时处理的请求数上限（每个 worker）
+DEFAULT_CONCURRENCY = {"login": 16, "bulk": 2}
+BACKENDS = ("memory", "shared")
+
+
+def _take(tokens, updated, rate, burst, now):
+    """按经过的时间补充令牌后取走一个，返回 (剩余令牌数, 需要等待的秒数)，等待为 0 表示放行"""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBuckets:
+    """进程内的令牌桶表，按最近使用顺序淘汰"""
+
+    name = "memory"
+
+    def __init__(self, capacity=DEFAULT_MAX_KEYS):
+        self.capacity = capacity
+        self.evicted = 0
+        # 键 → [令牌数, 更新时间]
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key, rate, burst, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.capacity:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+            bucket = self._buckets[key] = [burst, now]
+        else:
+            self._buckets.move_to_end(key)
+        bucket[0], wait = _take(bucket[0], bucket[1], rate, burst, now)
+        bucket[1] = now
+        return wait
+
+    def refund(self, key, burst):
+        """退还一个令牌（不超过桶容量）"""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(burst, bucket[0] + 1)
+
+
+class SharedBuckets:
+    """
+    多 worker 共用的令牌桶，保存在 multiprocessing.Array 中（每个槽位：键的散列值、令牌数、更新时间，
+    最后一个元素为淘汰次数，同样由各 worker 共用）
+
+    散列使用 crc32（内置 hash() 在各进程中的种子不同），时间使用各进程一致的 time.monotonic()。
+    """
+
+    name = "shared"
+    FIELDS = 3
+
+    def __init__(self, array):
+        self._array = array
+        self.capacity = (len(array) - 1) // self.FIELDS
+
+    @classmethod
+    def allocate(cls, capacity=DEFAULT_MAX_KEYS):
+        """在主进程中分配共享内存（须在创建 worker 之前）"""
+        return Array('d', capacity * cls.FIELDS + 1)
+
+    def __len__(self):
+        with self._array.get_lock():
+            data = self._array.get_obj()
+            return sum(1 for digest in data[:self.capacity * self.FIELDS:self.FIELDS] if digest)
+
+    @property
+    def evicted(self):
+        with self._array.get_lock():
+            return int(self._array.get_obj()[-1])
+
+    def _slot(self, key):
+        # 0 表示空槽位
+        digest = zlib.crc32(key.encode('utf-8')) + 1
+        return digest, digest % self.capacity * self.FIELDS
+
+    def take(self, key, rate, burst, now):
+        digest, i = self._slot(key)
+        with self._array.get_lock():
+            data = self._array.get_obj()
+            if data[i] == digest:
+                tokens, updated = data[i + 1], data[i + 2]
+            else:
+                if data[i]:
+                    data[-1] += 1
+                tokens, updated = burst, now
+            tokens, wait = _take(tokens, updated, rate, burst, now)
+            data[i], data[i + 1], data[i + 2] = digest, tokens, now
+        return wait
+
+    def refund(self, key, burst):
+        digest, i = self._slot(key)
+        with self._array.get_lock():
+            data = self._array.get_obj()
+            if data[i] == digest:
+                data[i + 1] = min(burst, data[i + 1] + 1)
+
+
+def _rate(value, name):
+    if value is None:
+        return None
+    rate, burst = value
+    if rate <= 0 or burst < 1:
+        raise ValueError(f"{name} 须为 (每秒令牌数 > 0, 桶容量 >= 1)")
+    return (rate, burst)
+
+
+def too_many_requests(wait):
+    return json({"error": "请求过于频繁，请稍后重试"}, status=429,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))})
+
+
+def server_busy():
+    return json({"error": "服务器繁忙，请稍后重试"}, status=503, headers={"Retry-After": "1"})
+
+
+def client_ip(request):
+    """客户端地址：按 Sanic 的代理配置（PROXIES_COUNT、REAL_IP_HEADER 等）取转发头，否则为连接的对端地址"""
+    return request.remote_addr or request.ip
+
+
+def route_class(request):
+    """当前请求的路由类别（每个路由首次请求时计算并保存在 route.ctx.admission）"""
+    route = request.route
+    if route is None:
+        return DEFAULT_CLASS
+    classes = getattr(route.ctx, 'admission', None)
+    if classes is None:
+        classes = route.ctx.admission = {
+            method: getattr(route_handler(route.handler, method), 'admission_class', DEFAULT_CLASS)
+            for method in route.methods
+        }
+    return classes.get(request.method, DEFAULT_CLASS)
+
+
+class AdmissionController:
+    def __init__(self, buckets=None):
+        self.buckets = buckets if buckets is not None else MemoryBuckets()
+        self.enabled = True
+        self.ip_rates = dict(DEFAULT_IP_RATES)
+        self.username_rate = DEFAULT_USERNAME_RATE
+        self.concurrency = dict(DEFAULT_CONCURRENCY)
+        self.in_flight = Counter()
+        # 按原因（ip / username / concurrency）统计的拒绝次数
+        self.rejected = Counter()
+
+    def admit(self, request):
+        """按 "类别:IP" 取令牌，令牌不足时返回 429 响应"""
+        if not self.enabled:
+            return None
+        name = route_class(request)
+        limit = self.ip_rates.get(name)
+        if limit is None:
+            return None
+        wait = self.buckets.take(f"{name}:{client_ip(request)}", *limit, time.monotonic())
+        if wait:
+            self.rejected["ip"] += 1
+            return too_many_requests(wait)
+        return None
+
+    def admit_username(self, username, ip):
+        """登录前按 "用户名:IP" 取令牌，令牌不足时返回 429 响应"""
+        if not self.enabled or self.username_rate is None:
+            return None
+        wait = self.buckets.take(f"username:{username}:{ip}", *self.username_rate, time.monotonic())
+        if wait:
+            self.rejected["username"] += 1
+            return too_many_requests(wait)
+        return None
+
+    def refund_username(self, username, ip):
+        """登录成功：退还 admit_username 取走的令牌，正常登录不消耗限额"""
+        if self.enabled and self.username_rate is not None:
+            self.buckets.refund(f"username:{username}:{ip}", self.username_rate[1])
+
+    def enter(self, name):
+        """占用类别 name 的一个并发名额，已满时返回 False"""
+        limit = self.concurrency.get(name)
+        if self.enabled and limit is not None and self.in_flight[name] >= limit:
+            self.rejected["concurrency"] += 1
+            return False
+        self.in_flight[name] += 1
+        return True
+
+    def leave(self, name):
+        self.in_flight[name] -= 1
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "backend": self.buckets.name,
+            "buckets": len(self.buckets),
+            "capacity": self.buckets.capacity,
+            "evicted": self.buckets.evicted,
+            "in_flight": dict(self.in_flight),
+            "rejected": dict(self.rejected)
+        }
+
+    def metrics(self):
+        """Prometheus 文本格式的指标行（由 /metrics 输出）"""
+        lines = [
+            "# HELP sanic_admission_rejected_total 准入控制拒绝的请求数",
+            "# TYPE sanic_admission_rejected_total counter",
+        ]
+        for reason in ("ip", "username", "concurrency"):
+            lines.append(f'sanic_admission_rejected_total{{reason="{reason}"}} {self.rejected[reason]}')
+        lines.append("# HELP sanic_admission_in_flight 各路由类别正在处理的请求数")
+        lines.append("# TYPE sanic_admission_in_flight gauge")
+        for name in sorted(set(self.concurrency) | set(self.in_flight)):
+            lines.append(f'sanic_admission_in_flight{{class="{name}"}} {self.in_flight[name]}')
+        lines.append("# HELP sanic_admission_buckets_evicted_total 容量已满或散列冲突时淘汰的令牌桶数")
+        lines.append("# TYPE sanic_admission_buckets_evicted_total counter")
+        lines.append(f"sanic_admission_buckets_evicted_total {self.buckets.evicted}")
+        return lines
+
+
+controller = AdmissionController()
+
+
+def configure(app_config, buckets=None):
+    """
+    按配置设置限速和并发上限；buckets 为令牌桶存储（shared 模式下为主进程分配的共享数组）
+
+    ADMISSION_BACKEND 为 shared 但没有共享数组时（ASGI 等不经过主进程启动的模式）退回进程内存储。
+    """
+    backend = app_config.get('ADMISSION_BACKEND', 'memory')
+    if backend not in BACKENDS:
+        raise ValueError(f"ADMISSION_BACKEND 须为 {', '.join(BACKENDS)} 之一")
+    capacity = app_config.get('ADMISSION_MAX_KEYS', DEFAULT_MAX_KEYS)
+    if buckets is None:
+        if backend == 'shared':
+            logger.warning("没有共享的令牌桶存储，准入控制改用进程内存储")
+        buckets = MemoryBuckets(capacity)
+    elif not hasattr(buckets, 'take'):
+        buckets = SharedBuckets(buckets)
+
+    controller.buckets = buckets
+    controller.enabled = app_config.get('ADMISSION_CONTROL', True)
+    controller.ip_rates = {
+        name: _rate(value, f"ADMISSION_IP_RATES[{name!r}]")
+        for name, value in app_config.get('ADMISSION_IP_RATES', DEFAULT_IP_RATES).items()
+    }
+    controller.username_rate = _rate(
+        app_config.get('ADMISSION_USERNAME_RATE', DEFAULT_USERNAME_RATE), "ADMISSION_USERNAME_RATE"
+    )
+    controller.concurrency = dict(app_config.get('ADMISSION_CONCURRENCY', DEFAULT_CONCURRENCY))
+
+
+def limit(name):
+    """
+    处理函数装饰器：声明路由类别，并限制该类别同时处理的请求数
+
+    放在 jwt_required 之下时，未认证的请求不占用名额。
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapped(*args, **kwargs):
+            if not controller.enter(name):
+                return server_busy()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                controller.leave(name)
+
+        wrapped.admission_class = name
+        return wrapped
+    return decorator
+
+
+async def admit(request):
+    """请求中间件：按客户端 IP 限速（见 AdmissionController.admit）"""
+    return controller.admit(request)
+
+
+def admit_username(request, username):
+    return controller.admit_username(username, client_ip(request))
+
+
+def refund_username(request, username):
+    controller.refund_username(username, client_ip(request))
@@ -1,15 +1,12 @@
-import jwt
-import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from sanic_jwt.exceptions import AuthenticationFailed
 from models.user import User
+from middleware import refresh_tokens, token_service
+from middleware.refresh_tokens import RefreshTokenError
+from middleware.user_cache import get_user, invalidate_user
 from tortoise.exceptions import DoesNotExist
-
-# JWT 配置
-JWT_SECRET = "your-very-secret-and-very-long-random-key-here"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-REFRESH_TOKEN_EXPIRE_DAYS = 7
-ALGORITHM = "HS256"
+from utils import passwords, write_behind
+from utils.passwords import PasswordHasherBusy
 
 async def authenticate(request, *args, **kwargs):
     username = request.json.get("username", None)
@@ -23,93 +20,47 @@ async def authenticate(request, *args, **kwargs):
         if not await user.verify_password(password):
             raise AuthenticationFailed("用户名或密码无效")
             
-        # 更新登录时间
-        user.last_login = datetime.utcnow()
-        await user.save()
-            
-        # 生成 refresh token
-        refresh_token = str(uuid.uuid4())
-        user.refresh_token = refresh_token
-        await user.save()
+        # 更新登录时间（后台队列合并写入）；哈希成本与当前策略不同时在后台重新哈希
+        write_behind.update(User, user.id, last_login=datetime.now(timezone.utc))
+        schedule_rehash(request, user, password)
             
-        # 返回用户信息用于生成 JWT
-        return {"user_id": user.id, "refresh_token": refresh_token}
+        # 返回用户信息用于生成 JWT（刷新令牌由 middleware.refresh_tokens 签发和记录）
+        return {"user_id": user.id}
             
     except DoesNotExist:
         raise AuthenticationFailed("用户名或密码无效")
 
-def generate_tokens(user_id, refresh_token=None):
-    """生成访问令牌和刷新令牌"""
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    refresh_token_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    
-    expire = datetime.utcnow() + access_token_expires
-    access_payload = {
-        "user_id": user_id,
-        "exp": expire,
-        "type": "access"
-    }
-    
-    access_token = jwt.encode(access_payload, JWT_SECRET, algorithm=ALGORITHM)
-    
-    if not refresh_token:
-        refresh_token = str(uuid.uuid4())
-    
-    refresh_expire = datetime.utcnow() + refresh_token_expires
-    refresh_payload = {
-        "user_id": user_id,
-        "refresh_token": refresh_token,
-        "exp": refresh_expire,
-        "type": "refresh"
-    }
-    
-    refresh_token_encoded = jwt.encode(refresh_payload, JWT_SECRET, algorithm=ALGORITHM)
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token_encoded,
-        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    }
+async def _rehash_password(user, password):
+    try:
+        if await user.rehash_password(password):
+            passwords.hasher.rehashed += 1
+            invalidate_user(user.id)
+    except PasswordHasherBusy:
+        # 哈希线程池繁忙，下次登录时再重新哈希
+        pass
+
+def schedule_rehash(request, user, password):
+    """登录校验通过后，若存储的哈希成本与当前策略不同，在后台按新成本重新哈希（不延长本次请求）"""
+    if user.needs_rehash():
+        request.app.add_task(_rehash_password(user, password))
 
 async def refresh_token(request):
-    """使用刷新令牌生成新的访问令牌"""
+    """使用刷新令牌生成新的访问令牌（刷新令牌随之轮换）"""
     refresh_token = request.json.get("refresh_token", None)
     
     if not refresh_token:
         raise AuthenticationFailed("缺少刷新令牌")
     
     try:
-        payload = jwt.decode(refresh_token, JWT_SECRET, algorithms=[ALGORITHM])
-        
-        if payload["type"] != "refresh":
-            raise AuthenticationFailed("无效的令牌类型")
-        
-        user_id = payload["user_id"]
-        token_str = payload["refresh_token"]
-        
-        # 验证 refresh token 是否与用户存储的匹配
-        user = await User.get(id=user_id)
-        if user.refresh_token != token_str:
-            raise AuthenticationFailed("刷新令牌已失效")
-        
-        # 生成新的 token
-        tokens = generate_tokens(user_id, token_str)
-        return tokens
-        
-    except jwt.PyJWTError:
-        raise AuthenticationFailed("无效的刷新令牌")
+        return await refresh_tokens.rotate(refresh_token, request.app.config)
+    except RefreshTokenError as e:
+        raise AuthenticationFailed(str(e))
         
 async def verify_token(request, token):
     """验证 JWT token"""
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        user_id = payload["user_id"]
+    claims = token_service.access_claims(token)
+    if claims is None:
+        return None
         
-        if payload["type"] != "access":
-            return None
-            
-        # 验证用户是否存在
-        user = await User.get(id=user_id)
-        return user
-    except (jwt.PyJWTError, DoesNotExist):
-        return None 
\ No newline at end of file
+    # 验证用户是否存在（优先读取用户缓存）
+    return await get_user(claims["user_id"])
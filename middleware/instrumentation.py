@@ -0,0 +1,224 @@
+"""
+请求级数据库查询统计
+
+包装 Tortoise SQLite 客户端的 execute_* 方法（ORM 查询和原生 SQL 都经过这里），
+把每条语句的耗时记到当前请求的 QueryStats（通过 contextvar 传递，保存在 request.ctx.query_stats）。
+响应时附带 Server-Timing 头，汇总到 /metrics（Prometheus 文本格式，按路由），
+并记录慢查询和同一请求中重复执行的语句（可能的 N+1 查询）。
+
+指标保存在各 worker 进程内，多 worker 部署时每个进程分别计数。
+"""
+import functools
+import heapq
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sanic.log import logger
+from sanic.response import HTTPResponse
+from tortoise.backends.sqlite.client import SqliteClient, SqliteTransactionWrapper
+
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+# 每个请求保留的最慢语句条数
+SLOWEST_KEPT = 3
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_EXECUTE_METHODS = ("execute_query", "execute_query_dict", "execute_insert", "execute_many", "execute_script")
+
+_current = ContextVar("query_stats", default=None)
+_server_timing = True
+_slow_query_ms = DEFAULT_SLOW_QUERY_MS
+_n_plus_one_threshold = DEFAULT_N_PLUS_ONE_THRESHOLD
+
+
+class QueryStats:
+    """一个请求内执行的 SQL 语句：次数、总耗时、最慢的几条以及每条语句的执行次数"""
+
+    __slots__ = ("count", "duration", "statements", "_slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._slowest = []
+
+    def record(self, sql, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        self.statements[sql] += 1
+        if len(self._slowest) < SLOWEST_KEPT:
+            heapq.heappush(self._slowest, (elapsed, sql))
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (elapsed, sql))
+
+    @property
+    def slowest(self):
+        """[(耗时秒数, SQL)]，从慢到快"""
+        return sorted(self._slowest, reverse=True)
+
+    def repeated(self, threshold):
+        """执行次数达到 threshold 的语句 [(SQL, 次数)]"""
+        return [(sql, n) for sql, n in self.statements.items() if n >= threshold]
+
+
+def _instrumented(method):
+    @functools.wraps(method)
+    async def wrapper(self, query, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return await method(self, query, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.record(query, elapsed)
+            if elapsed * 1000 >= _slow_query_ms:
+                logger.warning("慢查询 %.1fms: %s", elapsed * 1000, query[:500])
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def install():
+    """包装 SQLite 客户端（含事务连接）的 execute_* 方法，可重复调用"""
+    for cls in (SqliteClient, SqliteTransactionWrapper):
+        for name in _EXECUTE_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "_instrumented", False):
+                setattr(cls, name, _instrumented(method))
+
+
+@contextmanager
+def collect():
+    """在请求之外（脚本、测试）统计 with 块中执行的语句，产出 QueryStats"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def configure(app_config):
+    global _server_timing, _slow_query_ms, _n_plus_one_threshold
+    _server_timing = app_config.get('SERVER_TIMING', True)
+    _slow_query_ms = app_config.get('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)
+    _n_plus_one_threshold = app_config.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, buckets, value):
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+# 按路由汇总的指标
+_requests = Counter()          # (route, method, status) → 请求数
+_queries = Counter()           # route → 语句数
+_query_seconds = Counter()     # route → 数据库耗时
+_n_plus_one = Counter()        # route → 检测到 N+1 的请求数
+_durations = {}                # route → 请求耗时直方图
+_query_counts = {}             # route → 每请求语句数直方图
+
+
+def _route_label(request):
+    route = request.route
+    return "/" + route.path if route is not None else "unmatched"
+
+
+async def start_request(request):
+    """请求中间件：为当前请求开始统计（应最先执行，以包含认证等中间件的查询）"""
+    request.ctx.query_stats = QueryStats()
+    request.ctx.started_at = time.perf_counter()
+    _current.set(request.ctx.query_stats)
+
+
+async def finish_request(request, response):
+    """响应中间件：写出 Server-Timing，汇总指标，记录可能的 N+1 查询"""
+    stats = getattr(request.ctx, "query_stats", None)
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - request.ctx.started_at
+    route = _route_label(request)
+
+    if _server_timing:
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.duration * 1000:.3f};desc="{stats.count} queries", app;dur={elapsed * 1000:.3f}'
+        )
+
+    _requests[(route, request.method, response.status)] += 1
+    _queries[route] += stats.count
+    _query_seconds[route] += stats.duration
+    _durations.setdefault(route, _Histogram(DURATION_BUCKETS)).observe(DURATION_BUCKETS, elapsed)
+    _query_counts.setdefault(route, _Histogram(QUERY_BUCKETS)).observe(QUERY_BUCKETS, stats.count)
+
+    if _n_plus_one_threshold:
+        repeated = stats.repeated(_n_plus_one_threshold)
+        if repeated:
+            _n_plus_one[route] += 1
+            for sql, n in repeated:
+                logger.warning("可能的 N+1 查询：%s %s 中同一语句执行了 %d 次: %s", request.method, request.path, n, sql[:500])
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _render_histogram(lines, name, help_text, buckets, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for route, histogram in sorted(histograms.items()):
+        for bound, count in zip(buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(route=route, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(route=route, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(route=route)} {histogram.sum:g}")
+        lines.append(f"{name}_count{_labels(route=route)} {histogram.count}")
+
+
+def _render_counter(lines, name, help_text, values):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for route, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(route=route)} {value:g}")
+
+
+def render_metrics(*collectors):
+    """Prometheus 文本格式的指标；collectors 为返回额外指标行的函数"""
+    lines = [
+        "# HELP sanic_requests_total 请求数",
+        "# TYPE sanic_requests_total counter",
+    ]
+    for (route, method, status), value in sorted(_requests.items()):
+        lines.append(f"sanic_requests_total{_labels(route=route, method=method, status=status)} {value}")
+    _render_histogram(lines, "sanic_request_duration_seconds", "请求处理耗时", DURATION_BUCKETS, _durations)
+    _render_histogram(lines, "sanic_db_queries_per_request", "每个请求执行的 SQL 语句数", QUERY_BUCKETS, _query_counts)
+    _render_counter(lines, "sanic_db_queries_total", "执行的 SQL 语句数", _queries)
+    _render_counter(lines, "sanic_db_query_seconds_total", "SQL 语句总耗时", _query_seconds)
+    _render_counter(lines, "sanic_db_n_plus_one_total", "检测到可能的 N+1 查询的请求数", _n_plus_one)
+    for collect in collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response(*collectors):
+    return HTTPResponse(render_metrics(*collectors), content_type=PROMETHEUS_CONTENT_TYPE)
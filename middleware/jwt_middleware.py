@@ -1,142 +1,107 @@
 from sanic import Request, HTTPResponse
 from functools import wraps
 from sanic.exceptions import Unauthorized
-from middleware.auth import verify_token
-import jwt
+from middleware import route_auth, token_service
+from middleware.route_auth import LazyUser
+from middleware.user_cache import get_user
 import time
-from models.user import User
 
-def jwt_required(wrapped):
-    """JWT 验证装饰器"""
+def _find_request(args):
+    """从处理函数参数中取出请求对象（兼容 HTTPMethodView 方法的 self 参数）"""
+    for arg in args[:2]:
+        if isinstance(arg, Request):
+            return arg
+    raise TypeError("无法在处理函数参数中找到请求对象")
+
+def jwt_required(wrapped=None, *, load_user=True):
+    """
+    JWT 验证装饰器
+
+    令牌声明由令牌服务解析（每个请求一次）。load_user=False 时只设置
+    request.ctx.user_id，不加载用户记录，适用于只需要用户 id 的处理函数。
+    被装饰的处理函数认证级别为 required，JWT 中间件不再处理这些路由。
+    """
+    if wrapped is None:
+        return lambda func: jwt_required(func, load_user=load_user)
+
     @wraps(wrapped)
-    async def decorated_function(request, *args, **kwargs):
-        # 从请求头中获取令牌
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+    async def decorated_function(*args, **kwargs):
+        request = _find_request(args)
+        if not token_service.bearer_token(request):
             raise Unauthorized('缺少有效的授权令牌')
         
-        token = auth_header.split(' ')[1]
-        user = await verify_token(request, token)
-        
-        if not user:
+        claims = token_service.request_claims(request)
+        if not claims or not claims.get('user_id'):
             raise Unauthorized('无效的授权令牌')
+        request.ctx.user_id = claims['user_id']
         
-        # 将用户信息添加到请求对象
-        request.ctx.user = user
-        return await wrapped(request, *args, **kwargs)
+        if load_user:
+            user = await get_user(claims['user_id'])
+            if not user:
+                raise Unauthorized('无效的授权令牌')
+            # 将用户信息添加到请求对象
+            request.ctx.user = user
+        return await wrapped(*args, **kwargs)
     
+    decorated_function.auth_policy = route_auth.REQUIRED
     return decorated_function
 
 def inject_user(middleware_or_route):
-    """注入用户信息中间件，但不强制要求验证"""
+    """注入用户信息，但不强制要求验证（认证级别为 optional，匿名请求时 request.ctx.user 为 None）"""
     @wraps(middleware_or_route)
-    async def wrapped_function(request, *args, **kwargs):
-        # 从请求头中获取令牌
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            user = await verify_token(request, token)
-            if user:
-                request.ctx.user = user
+    async def wrapped_function(*args, **kwargs):
+        request = _find_request(args)
+        lazy_user = getattr(request.ctx, 'user', None)
+        if not isinstance(lazy_user, LazyUser):
+            lazy_user = LazyUser(request)
+        request.ctx.user = await lazy_user
         
-        return await middleware_or_route(request, *args, **kwargs)
+        return await middleware_or_route(*args, **kwargs)
     
+    wrapped_function.auth_policy = route_auth.OPTIONAL
     return wrapped_function
 
 async def add_user_to_request(request):
     """
-    JWT中间件：验证token并将用户添加到请求上下文
+    JWT中间件：为可选认证的路由设置 request.ctx.user（LazyUser，await 时才校验令牌和加载用户）
+
+    公开路由和必须认证的路由不经过这里（见 middleware.route_auth.collect）；
+    关闭 AUTH_ROUTE_POLICY 时每个请求都会解析令牌并设置 request.ctx.user_id。
     """
-    try:
-        # 获取Authorization头
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.replace('Bearer ', '')
-            
-            # 验证token
-            payload = jwt.decode(
-                token, 
-                request.app.config.JWT_SECRET, 
-                algorithms=["HS256"]
-            )
-            
-            # 检查token是否过期
-            if payload.get('exp') and payload.get('exp') < time.time():
-                request.ctx.user = None
-                return None
-                
-            # 获取用户
-            user_id = payload.get('user_id')
-            if user_id:
-                user = await User.get_or_none(id=user_id)
-                request.ctx.user = user
-                return None
-                
-        request.ctx.user = None
-    except jwt.PyJWTError:
-        request.ctx.user = None
-    except Exception as e:
-        print(f"JWT错误: {str(e)}")
-        request.ctx.user = None
-        
+    level = route_auth.policy(request)
+    if level == route_auth.OPTIONAL:
+        request.ctx.user = LazyUser(request)
+        if not route_auth.enabled():
+            request.ctx.user_id = request.ctx.user.user_id
     return None
 
-def generate_tokens(user_id, app_config):
+def generate_tokens(user_id, app_config, jti=None):
     """
     生成访问令牌和刷新令牌
+
+    jti 为刷新令牌的唯一标识，由 middleware.refresh_tokens 记录并在刷新时轮换。
     """
     # 设置过期时间
     access_token_expires = time.time() + app_config.JWT_ACCESS_TOKEN_EXPIRES
     refresh_token_expires = time.time() + app_config.JWT_REFRESH_TOKEN_EXPIRES
     
     # 生成访问令牌
-    access_token = jwt.encode(
-        {
-            'user_id': user_id,
-            'exp': access_token_expires,
-            'type': 'access'
-        },
-        app_config.JWT_SECRET,
-        algorithm='HS256'
-    )
+    access_token = token_service.encode({
+        'user_id': user_id,
+        'exp': access_token_expires,
+        'type': 'access'
+    })
     
     # 生成刷新令牌
-    refresh_token = jwt.encode(
-        {
-            'user_id': user_id,
-            'exp': refresh_token_expires,
-            'type': 'refresh'
-        },
-        app_config.JWT_SECRET,
-        algorithm='HS256'
-    )
+    refresh_token = token_service.encode({
+        'user_id': user_id,
+        'exp': refresh_token_expires,
+        'type': 'refresh',
+        'jti': jti
+    })
     
     return {
         'access_token': access_token,
         'refresh_token': refresh_token,
         'expires_in': app_config.JWT_ACCESS_TOKEN_EXPIRES
     }
-
-async def verify_refresh_token(refresh_token, app_config):
-    """
-    验证刷新令牌并返回用户ID
-    """
-    try:
-        payload = jwt.decode(
-            refresh_token, 
-            app_config.JWT_SECRET, 
-            algorithms=["HS256"]
-        )
-        
-        # 检查令牌类型
-        if payload.get('type') != 'refresh':
-            raise ValueError("无效的刷新令牌")
-            
-        # 检查令牌是否过期
-        if payload.get('exp') and payload.get('exp') < time.time():
-            raise ValueError("刷新令牌已过期")
-            
-        # 返回用户ID
-        return payload.get('user_id')
-    except (jwt.PyJWTError, ValueError) as e:
-        raise ValueError(f"刷新令牌验证失败: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+刷新令牌存储
+
+每个刷新令牌带唯一的 jti，记录在 refresh_tokens 表中；每次刷新都会吊销旧 jti 并签发新令牌（轮换）。
+已吊销的 jti 同时保存在内存索引（布隆过滤器 + 精确集合）中，已吊销令牌无需访问数据库即可拒绝。
+多 worker 之间内存索引不共享，数据库中的条件更新是轮换的最终裁决。
+"""
+import time
+import uuid
+from datetime import datetime, timezone
+
+from tortoise.transactions import in_transaction
+
+from middleware import token_service
+from middleware.jwt_middleware import generate_tokens
+from models.refresh_token import RefreshToken
+from utils.bloom import BloomFilter
+
+DEFAULT_REVOKED_CAPACITY = 100000
+
+
+class RefreshTokenError(ValueError):
+    """刷新令牌无效、过期或已被吊销"""
+
+
+class RevocationIndex:
+    """
+    已吊销 jti 的内存索引
+
+    布隆过滤器先排除绝大多数未吊销的 jti，命中时再由精确集合确认；
+    精确集合只保留未过期的 jti，超过容量时清理过期项并重建过滤器。
+    """
+
+    def __init__(self, capacity=DEFAULT_REVOKED_CAPACITY, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._expires = {}
+
+    def add(self, jti, exp):
+        if jti in self._expires:
+            return
+        if len(self._expires) >= self._bloom.capacity:
+            self.prune()
+        self._expires[jti] = exp
+        self._bloom.add(jti)
+
+    def __contains__(self, jti):
+        return jti in self._bloom and jti in self._expires
+
+    def __len__(self):
+        return len(self._expires)
+
+    def prune(self, now=None):
+        """清理已过期的 jti 并重建布隆过滤器，清理后仍超出容量时扩容一倍"""
+        now = time.time() if now is None else now
+        self._expires = {jti: exp for jti, exp in self._expires.items() if exp > now}
+        capacity = self._bloom.capacity
+        while len(self._expires) >= capacity:
+            capacity *= 2
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._expires:
+            self._bloom.add(jti)
+
+    def stats(self):
+        return {"revoked": len(self._expires), "bloom": self._bloom.stats()}
+
+
+_index = RevocationIndex()
+
+
+def configure(app_config):
+    """按配置设置吊销索引容量（容量变化时重建，需随后调用 load）"""
+    global _index
+    capacity = app_config.get('REFRESH_REVOKED_CAPACITY', DEFAULT_REVOKED_CAPACITY)
+    if capacity != _index.capacity:
+        _index = RevocationIndex(capacity)
+
+
+async def load():
+    """启动时清理已过期的令牌记录，并把未过期的吊销记录载入内存索引"""
+    now = datetime.now(timezone.utc)
+    await RefreshToken.filter(expires_at__lte=now).delete()
+    rows = await RefreshToken.filter(revoked=True, expires_at__gt=now).values_list('jti', 'expires_at')
+    for jti, expires_at in rows:
+        _index.add(jti, expires_at.timestamp())
+    return len(rows)
+
+
+def _refresh_claims(refresh_token):
+    # 刷新令牌只使用一次，不进入声明缓存
+    claims = token_service.decode(refresh_token, cache=False)
+    if claims is None:
+        raise RefreshTokenError("无效或已过期的刷新令牌")
+    if claims.get('type') != 'refresh' or not claims.get('jti'):
+        raise RefreshTokenError("无效的刷新令牌")
+    return claims
+
+
+async def issue(user_id, app_config, using_db=None):
+    """签发访问令牌和刷新令牌，并记录刷新令牌的 jti"""
+    jti = uuid.uuid4().hex
+    expires_at = datetime.fromtimestamp(time.time() + app_config.JWT_REFRESH_TOKEN_EXPIRES, timezone.utc)
+    tokens = generate_tokens(user_id, app_config, jti=jti)
+    await RefreshToken.create(jti=jti, user_id=user_id, expires_at=expires_at, using_db=using_db)
+    return tokens
+
+
+async def rotate(refresh_token, app_config):
+    """
+    用刷新令牌换取新令牌，旧 jti 随即吊销
+
+    已吊销的令牌再次出现说明令牌可能泄露，此时吊销该用户的全部刷新令牌。
+    """
+    claims = _refresh_claims(refresh_token)
+    jti, user_id = claims['jti'], claims['user_id']
+
+    tokens = None
+    if jti not in _index:
+        # 条件更新保证同一 jti 只能成功轮换一次
+        async with in_transaction("default") as conn:
+            updated = await RefreshToken.filter(
+                jti=jti, user_id=user_id, revoked=False
+            ).using_db(conn).update(revoked=True)
+            if updated:
+                tokens = await issue(user_id, app_config, using_db=conn)
+
+    _index.add(jti, claims['exp'])
+    if tokens is None:
+        await revoke_user(user_id)
+        raise RefreshTokenError("刷新令牌已失效")
+    return tokens
+
+
+async def revoke(refresh_token):
+    """吊销单个刷新令牌（退出登录），返回用户 id"""
+    claims = _refresh_claims(refresh_token)
+    await RefreshToken.filter(jti=claims['jti']).update(revoked=True)
+    _index.add(claims['jti'], claims['exp'])
+    return claims['user_id']
+
+
+async def revoke_user(user_id):
+    """吊销用户的全部刷新令牌，返回吊销数量"""
+    async with in_transaction("default") as conn:
+        rows = await RefreshToken.filter(
+            user_id=user_id, revoked=False
+        ).using_db(conn).values_list('jti', 'expires_at')
+        if rows:
+            await RefreshToken.filter(jti__in=[jti for jti, _ in rows]).using_db(conn).update(revoked=True)
+    for jti, expires_at in rows:
+        _index.add(jti, expires_at.timestamp())
+    return len(rows)
+
+
+def stats():
+    return _index.stats()
@@ -0,0 +1,144 @@
+"""
+按路由的认证级别：public（公开）/ optional（可选认证）/ required（必须认证）
+
+级别标记在处理函数上（jwt_required 标记为 required，inject_user 和 optional 标记为 optional，
+未标记的处理函数使用 AUTH_DEFAULT_POLICY，默认 public）。服务启动后从路由表收集每个路由各方法的级别，
+并从不含可选认证方法的路由上移除 JWT 中间件：公开路由不解析 Authorization 头、不校验令牌；
+必须认证的路由由 jwt_required 自行校验；只有可选认证的路由由中间件设置可 await 的 request.ctx.user。
+"""
+from functools import partial
+
+from middleware import token_service
+from middleware.user_cache import get_user
+
+PUBLIC = "public"
+OPTIONAL = "optional"
+REQUIRED = "required"
+POLICIES = (PUBLIC, OPTIONAL, REQUIRED)
+
+_default = PUBLIC
+_enabled = True
+
+
+def configure(app_config):
+    global _default, _enabled
+    default = app_config.get('AUTH_DEFAULT_POLICY', PUBLIC)
+    if default not in POLICIES:
+        raise ValueError(f"AUTH_DEFAULT_POLICY 须为 {', '.join(POLICIES)} 之一")
+    _default = default
+    _enabled = app_config.get('AUTH_ROUTE_POLICY', True)
+
+
+def enabled():
+    """是否按路由级别跳过 JWT 处理（AUTH_ROUTE_POLICY）"""
+    return _enabled
+
+
+def auth_policy(level):
+    """处理函数装饰器：声明认证级别"""
+    if level not in POLICIES:
+        raise ValueError(f"未知的认证级别: {level}")
+
+    def decorator(handler):
+        handler.auth_policy = level
+        return handler
+    return decorator
+
+
+public = auth_policy(PUBLIC)
+optional = auth_policy(OPTIONAL)
+
+
+def route_handler(handler, method):
+    """
+    路由在指定方法上实际执行的处理函数（HTTPMethodView 取对应的方法）
+
+    Sanic 自动添加的 HEAD 处理函数取 GET 的处理函数，自动添加的 OPTIONS 处理函数返回 None。
+    """
+    if isinstance(handler, partial):
+        get_handler = handler.keywords.get('get_handler')
+        if get_handler is None:
+            return None
+        handler, method = get_handler, 'GET'
+    view_class = getattr(handler, 'view_class', None)
+    if view_class is not None:
+        handler = getattr(view_class, method.lower(), None)
+    return handler
+
+
+def handler_policy(handler, method):
+    """路由处理函数在指定方法上的认证级别（HEAD 沿用 GET 的级别，自动添加的 OPTIONS 为公开）"""
+    resolved = route_handler(handler, method)
+    if resolved is None and isinstance(handler, partial):
+        return PUBLIC
+    return getattr(resolved, 'auth_policy', _default)
+
+
+def _route_policies(route):
+    return {method: handler_policy(route.handler, method) for method in route.methods}
+
+
+def collect(app, middleware):
+    """
+    收集路由表中各路由的认证级别（保存在 route.ctx.auth），并从不需要的路由上移除 JWT 中间件
+
+    须在路由表最终确定后调用（after_server_start，sanic-ext 在 before_server_start 中还会重建路由）；
+    middleware 为 app.middleware 注册的 JWT 中间件，返回 {级别: 路由方法数}。
+    """
+    func = getattr(middleware, 'func', middleware)
+    counts = dict.fromkeys(POLICIES, 0)
+    for route in app.router.routes:
+        route.ctx.auth = _route_policies(route)
+        for level in route.ctx.auth.values():
+            counts[level] += 1
+        if not _enabled or OPTIONAL in route.ctx.auth.values():
+            continue
+        remaining = [m for m in route.extra.request_middleware if m.func is not func]
+        # 路由上的中间件为空时 Sanic 会改用应用级中间件，此时保留原样，由 policy() 判断
+        if remaining:
+            route.extra.request_middleware.clear()
+            route.extra.request_middleware.extend(remaining)
+    return counts
+
+
+def policy(request):
+    """当前请求的认证级别（未收集过的路由在首次请求时计算）"""
+    if not _enabled:
+        return OPTIONAL
+    route = request.route
+    if route is None:
+        return PUBLIC
+    levels = getattr(route.ctx, 'auth', None)
+    if levels is None:
+        levels = route.ctx.auth = _route_policies(route)
+    return levels.get(request.method, _default)
+
+
+class LazyUser:
+    """
+    可选认证路由上的当前用户：await 时才校验令牌并加载用户（优先读取用户缓存），匿名请求得到 None
+
+        user = await request.ctx.user
+    """
+
+    __slots__ = ("_request", "_user", "_loaded")
+
+    def __init__(self, request):
+        self._request = request
+        self._user = None
+        self._loaded = False
+
+    @property
+    def user_id(self):
+        """令牌中的用户 id，只校验令牌、不查询用户"""
+        claims = token_service.request_claims(self._request)
+        return claims.get('user_id') if claims else None
+
+    async def resolve(self):
+        if not self._loaded:
+            self._user = await get_user(self.user_id)
+            self._loaded = True
+        return self._user
+
+    def __await__(self):
+        return self.resolve().__await__()
@@ -0,0 +1,100 @@
+"""
+统一的 JWT 令牌服务
+
+签发与校验使用同一份密钥和算法（来自应用配置），校验通过的声明按令牌哈希缓存到过期为止，
+同一令牌的后续请求不再重复验签和解析。
+"""
+import hashlib
+import time
+
+import jwt
+
+from utils.cache import TTLCache
+
+DEFAULT_ALGORITHM = "HS256"
+# 无 exp 声明的令牌在缓存中保留的秒数
+DEFAULT_CLAIMS_TTL = 300
+
+_secret = None
+_algorithm = DEFAULT_ALGORITHM
+_claims = TTLCache(4096, DEFAULT_CLAIMS_TTL)
+
+_UNSET = object()
+
+
+def configure(app_config):
+    """从应用配置读取密钥、算法和声明缓存容量；密钥或算法变化时清空缓存"""
+    global _secret, _algorithm
+    secret = app_config.JWT_SECRET
+    algorithm = app_config.get('JWT_ALGORITHM', DEFAULT_ALGORITHM)
+    if (secret, algorithm) != (_secret, _algorithm):
+        _claims.clear()
+    _secret, _algorithm = secret, algorithm
+    _claims.maxsize = app_config.get('JWT_CLAIMS_CACHE_SIZE', _claims.maxsize)
+
+
+def encode(payload):
+    return jwt.encode(payload, _secret, algorithm=_algorithm)
+
+
+def _token_key(token):
+    # 只保存令牌摘要，缓存中不留存可直接使用的令牌
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+
+def decode(token, cache=True):
+    """
+    校验令牌并返回声明，无效或过期时返回 None
+
+    校验通过的声明缓存到令牌的 exp 为止；无效令牌不缓存。cache=False 时既不读也不写缓存。
+    """
+    if cache:
+        key = _token_key(token)
+        claims = _claims.get(key)
+        if claims is not None:
+            return claims
+
+    try:
+        claims = jwt.decode(token, _secret, algorithms=[_algorithm])
+    except jwt.PyJWTError:
+        return None
+
+    exp = claims.get('exp')
+    ttl = exp - time.time() if exp else DEFAULT_CLAIMS_TTL
+    if cache and ttl > 0:
+        _claims.set(key, claims, ttl)
+    return claims
+
+
+def bearer_token(request):
+    """从 Authorization 头中取出 Bearer 令牌"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header[7:]
+    return None
+
+
+def access_claims(token):
+    """访问令牌的声明；刷新令牌或无效令牌返回 None"""
+    claims = decode(token)
+    if claims is None or claims.get('type') != 'access':
+        return None
+    return claims
+
+
+def request_claims(request):
+    """
+    当前请求访问令牌的声明
+
+    每个请求只解析一次，结果保存在 request.ctx.token_claims 中。
+    """
+    claims = getattr(request.ctx, 'token_claims', _UNSET)
+    if claims is _UNSET:
+        token = bearer_token(request)
+        claims = access_claims(token) if token else None
+        request.ctx.token_claims = claims
+    return claims
+
+
+def stats():
+    return _claims.stats()
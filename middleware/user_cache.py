@@ -0,0 +1,48 @@
+from tortoise.signals import post_save, post_delete
+
+from models.user import User
+from utils.cache import TTLCache
+
+# 已认证用户缓存：user_id -> User，按进程独立维护
+_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def configure(app_config):
+    """根据应用配置调整缓存容量和过期时间"""
+    _cache.maxsize = app_config.get('USER_CACHE_SIZE', _cache.maxsize)
+    _cache.ttl = app_config.get('USER_CACHE_TTL', _cache.ttl)
+
+
+async def get_user(user_id):
+    """获取用户，优先从缓存读取；用户不存在时返回 None（不缓存）"""
+    if user_id is None:
+        return None
+
+    user = _cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = await User.get_or_none(id=user_id)
+    if user is not None:
+        _cache.set(user_id, user)
+    return user
+
+
+def invalidate_user(user_id):
+    """使指定用户的缓存失效"""
+    _cache.pop(user_id)
+
+
+def stats():
+    """缓存命中统计"""
+    return _cache.stats()
+
+
+@post_save(User)
+async def _on_user_saved(sender, instance, created, using_db, update_fields):
+    invalidate_user(instance.id)
+
+
+@post_delete(User)
+async def _on_user_deleted(sender, instance, using_db):
+    invalidate_user(instance.id)
@@ -1,5 +1,6 @@
 from .user import User
 from .post import Post
 from .tag import Tag
+from .refresh_token import RefreshToken
 
-__all__ = ['User', 'Post', 'Tag'] 
\ No newline at end of file
+__all__ = ['User', 'Post', 'Tag', 'RefreshToken'] 
\ No newline at end of file
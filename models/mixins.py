@@ -0,0 +1,64 @@
+from tortoise.fields import DatetimeField
+
+_MISSING = object()
+
+
+class DirtyTrackingMixin:
+    """
+    字段级变更跟踪
+
+    从数据库加载或保存之后记录各列的值；再次 save() 时只 UPDATE 值有变化的列（连同 auto_now 列），
+    没有变化时不执行 UPDATE。显式传入 update_fields 时按原样保存。
+    """
+
+    _loaded_values = None
+
+    @classmethod
+    def _init_from_db(cls, **kwargs):
+        instance = super()._init_from_db(**kwargs)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self):
+        # 部分加载（only()）的对象只记录已加载的列
+        values = {}
+        for name in self._meta.fields_db_projection:
+            value = self.__dict__.get(name, _MISSING)
+            if value is not _MISSING:
+                values[name] = value
+        self._loaded_values = values
+
+    def changed_fields(self):
+        """值有变化的列；尚未保存的对象返回全部列"""
+        if self._loaded_values is None:
+            return list(self._meta.fields_db_projection)
+        return [
+            name for name, value in self._loaded_values.items()
+            if self.__dict__.get(name, value) != value
+        ]
+
+    def has_changed(self, name):
+        return name in self.changed_fields()
+
+    def _auto_now_fields(self):
+        return [
+            name for name, field in self._meta.fields_map.items()
+            if isinstance(field, DatetimeField) and field.auto_now
+        ]
+
+    async def save(self, using_db=None, update_fields=None, force_create=False, force_update=False):
+        explicit = update_fields is not None
+        if not explicit and self._saved_in_db and self._loaded_values is not None and not force_create:
+            changed = [name for name in self.changed_fields() if name != self._meta.pk_attr]
+            if not changed:
+                return
+            update_fields = changed + [name for name in self._auto_now_fields() if name not in changed]
+
+        await super().save(using_db=using_db, update_fields=update_fields,
+                           force_create=force_create, force_update=force_update)
+        if explicit and self._loaded_values is not None:
+            # 只保存了指定的列，其余列的变化仍待保存
+            for name in update_fields:
+                self._loaded_values[name] = self.__dict__.get(name)
+        else:
+            self._snapshot()
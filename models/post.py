@@ -1,7 +1,15 @@
-from tortoise import fields, models
+from tortoise import fields, models, timezone
 from tortoise.contrib.pydantic import pydantic_model_creator
+from models.mixins import DirtyTrackingMixin
 
-class Post(models.Model):
+# 按 posts_tags 的 (tag_id, posts_id) 索引找出标签下的帖子，再按主键更新
+TOUCH_TAG_SQL = (
+    'UPDATE "posts" SET "updated_at" = ? '
+    'WHERE "id" IN (SELECT "posts_id" FROM "posts_tags" WHERE "tag_id" = ?)'
+)
+
+
+class Post(DirtyTrackingMixin, models.Model):
     id = fields.IntField(pk=True)
     title = fields.CharField(max_length=255)
     content = fields.TextField()
@@ -16,6 +24,28 @@ class Post(models.Model):
     
     class Meta:
         table = "posts"
+        # 热点查询的复合索引：按作者列出帖子、键集分页、列表指纹 max(updated_at)
+        indexes = (
+            ("user_id", "created_at"),
+            ("created_at", "id"),
+            ("updated_at",),
+        )
+    
+    @classmethod
+    def touch_author_query(cls, user_id, now, using_db=None):
+        return cls.filter(user_id=user_id).using_db(using_db).update(updated_at=now)
+    
+    @classmethod
+    async def touch_author(cls, user_id, using_db=None):
+        """更新作者全部帖子的 updated_at（帖子响应中的作者用户名变化时，使 ETag 和列表指纹随之变化）"""
+        await cls.touch_author_query(user_id, timezone.now(), using_db)
+    
+    @classmethod
+    async def touch_tag(cls, tag_id, using_db=None):
+        """更新带有该标签的帖子的 updated_at（标签重命名或删除时），一条语句完成，不读取帖子 id"""
+        db = using_db or cls._meta.db
+        await db.execute_query(TOUCH_TAG_SQL, [timezone.now(), tag_id])
+
 
 # 使用Pydantic 2.x自动创建模型
 # Post_Pydantic = pydantic_model_creator(
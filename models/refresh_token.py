@@ -0,0 +1,17 @@
+from tortoise import fields, models
+
+class RefreshToken(models.Model):
+    # 刷新令牌的 jti（令牌本身不落库）
+    jti = fields.CharField(max_length=32, pk=True)
+    user = fields.ForeignKeyField("models.User", related_name="refresh_tokens", on_delete=fields.CASCADE)
+    expires_at = fields.DatetimeField()
+    revoked = fields.BooleanField(default=False)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    
+    class Meta:
+        table = "refresh_tokens"
+        # 启动时加载未过期的吊销记录；按用户吊销全部令牌
+        indexes = (
+            ("revoked", "expires_at"),
+            ("user_id", "revoked"),
+        )
@@ -1,7 +1,8 @@
 from tortoise import fields, models
 from tortoise.contrib.pydantic import pydantic_model_creator
+from models.mixins import DirtyTrackingMixin
 
-class Tag(models.Model):
+class Tag(DirtyTrackingMixin, models.Model):
     id = fields.IntField(pk=True)
     name = fields.CharField(max_length=50, unique=True)
     
@@ -1,30 +1,57 @@
 from tortoise import fields, models
 from tortoise.contrib.pydantic import pydantic_model_creator
-import bcrypt
+from models.mixins import DirtyTrackingMixin
+from utils.passwords import hash_password, check_password, needs_rehash
 
-class User(models.Model):
+class User(DirtyTrackingMixin, models.Model):
     id = fields.IntField(pk=True)
     username = fields.CharField(max_length=50, unique=True)
     password = fields.CharField(max_length=128)
     email = fields.CharField(max_length=255)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
+    # 最近一次登录时间，由后台写入队列更新（不改变 updated_at）
+    last_login = fields.DatetimeField(null=True)
     
     # 关系定义 - 一对多
     posts = fields.ReverseRelation["Post"]
     
-    async def save(self, *args, **kwargs):
-        # 如果是新用户或密码已更改，则对密码进行哈希处理
-        if not self.id or self._saved_in_db is False:
-            self.password = bcrypt.hashpw(
-                self.password.encode('utf-8'), 
-                bcrypt.gensalt()
-            ).decode('utf-8')
+    async def save(self, using_db=None, update_fields=None, force_create=False, force_update=False):
+        # 新用户或密码有变化时才哈希（在哈希线程池中执行）；保存后记录的是哈希值，再次保存不会重复哈希
+        if not self._saved_in_db or (
+            self.has_changed('password') and (update_fields is None or 'password' in update_fields)
+        ):
+            self.password = await hash_password(self.password)
         
-        await super().save(*args, **kwargs)
+        await super().save(using_db=using_db, update_fields=update_fields,
+                           force_create=force_create, force_update=force_update)
+    
+    async def verify_password(self, password):
+        """校验明文密码是否与存储的哈希匹配"""
+        return await check_password(password, self.password)
+    
+    def needs_rehash(self):
+        """存储的密码哈希成本与当前策略不同"""
+        return needs_rehash(self.password)
+    
+    async def rehash_password(self, password):
+        """
+        按当前成本重新哈希已校验过的明文密码，返回是否写入
+        
+        条件更新：期间密码已被修改时不覆盖；不经过 save()，不改变 updated_at。
+        """
+        old = self.password
+        new = await hash_password(password)
+        updated = await User.filter(id=self.id, password=old).update(password=new)
+        return bool(updated)
     
     class Meta:
         table = "users"
+        # 键集分页和列表指纹 max(updated_at)
+        indexes = (
+            ("created_at", "id"),
+            ("updated_at",),
+        )
 
 # # 使用Pydantic 2.x创建模型
 # User_Pydantic = pydantic_model_creator(
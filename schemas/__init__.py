@@ -4,6 +4,6 @@ from .tag import *
 
 __all__ = [
     'UserCreate', 'UserResponse', 'UserLogin', 'TokenResponse',
-    'PostCreate', 'PostResponse', 'PostUpdate',
-    'TagCreate', 'TagResponse'
+    'PostCreate', 'PostResponse', 'PostUpdate', 'PostAuthor', 'PostSearchItem',
+    'TagCreate', 'TagResponse', 'TagPostItem', 'TagDetailResponse'
 ] 
\ No newline at end of file
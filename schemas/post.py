@@ -22,12 +22,29 @@ class TagResponse(BaseModel):
         "from_attributes": True
     }
 
+class PostAuthor(BaseModel):
+    id: int
+    username: str
+    
+    model_config = {
+        "from_attributes": True
+    }
+
 class PostResponse(PostBase):
     id: int
     created_at: datetime
-    author_id: int
+    updated_at: Optional[datetime] = None
+    user: PostAuthor
     tags: List[TagResponse] = []
     
     model_config = {
         "from_attributes": True
-    } 
\ No newline at end of file
+    } 
+class PostSearchItem(BaseModel):
+    id: int
+    title: str
+    title_highlight: str = Field(..., description="标题，命中部分以 <mark> 标记")
+    snippet: str = Field(..., description="内容中命中部分的摘要")
+    rank: float = Field(..., description="BM25 相关度，越小越相关")
+    created_at: datetime
+    user: PostAuthor
@@ -13,4 +13,17 @@ class TagResponse(TagBase):
     
     model_config = {
         "from_attributes": True  # 更新为 Pydantic v2 语法
-    } 
\ No newline at end of file
+    }
+
+class TagPostItem(BaseModel):
+    id: int
+    title: str
+    
+    model_config = {
+        "from_attributes": True
+    }
+
+class TagDetailResponse(TagResponse):
+    post_count: int = Field(0, description="该标签下的帖子总数")
+    posts: List[TagPostItem] = Field([], description="当前页的帖子（按 id 降序）")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多帖子时为 null") 
\ No newline at end of file
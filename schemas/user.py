@@ -1,4 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
+from typing import Optional
+from datetime import datetime
 
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -13,6 +15,8 @@ class UserLogin(BaseModel):
 
 class UserResponse(UserBase):
     id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
     
     # Pydantic v2 的新配置方式
     model_config = {
@@ -0,0 +1,60 @@
+"""
+生产环境启动入口
+
+    python serve.py                      # worker 数量默认等于 CPU 核数
+    python serve.py --workers 4 --port 8000
+
+也可以通过环境变量配置（Sanic 会自动加载 SANIC_ 前缀的变量）：
+SANIC_WORKERS、SANIC_HOST、SANIC_PORT。
+
+- 关闭 debug、自动重载和访问日志
+- 以 fork 方式在导入模型和应用之后创建 worker，子进程无需重复导入
+- 数据库迁移只在主进程执行一次；每个 worker 在启动后才建立自己的 SQLite 连接
+  （连接不会跨进程继承），多进程写入依赖 WAL 和 busy_timeout（见 utils/db.py）
+- 向主进程发送 SIGHUP 时按 "先启动新 worker、再停止旧 worker" 的顺序滚动重启，
+  重启期间始终有 worker 在监听端口
+"""
+import argparse
+import os
+import signal
+
+from sanic import Sanic
+from sanic.log import logger
+
+from main import app
+
+# 发给 worker 管理器的消息：重启全部 worker，新 worker 就绪后再停止旧 worker
+ZERO_DOWNTIME_RESTART = "__ALL_PROCESSES__::STARTUP_FIRST"
+
+
+@app.main_process_ready
+async def install_reload_signal(app):
+    def reload_workers(signum, frame):
+        logger.info("收到 SIGHUP，开始滚动重启 worker")
+        app.manager.monitor_publisher.send(ZERO_DOWNTIME_RESTART)
+
+    signal.signal(signal.SIGHUP, reload_workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生产环境启动入口")
+    parser.add_argument("--host", default=app.config.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(app.config.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(app.config.get("WORKERS", 0)),
+                        help="worker 数量，0 表示等于 CPU 核数")
+    args = parser.parse_args()
+
+    Sanic.start_method = "fork"
+    app.run(
+        host=args.host,
+        port=args.port,
+        workers=args.workers or os.cpu_count() or 1,
+        debug=False,
+        auto_reload=False,
+        access_log=False,
+        motd=False
+    )
+
+
+if __name__ == "__main__":
+    main()
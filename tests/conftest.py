@@ -0,0 +1,60 @@
+"""
+测试共用的应用：整个测试会话只启动一次（Sanic 的路由表在同一进程中只能启动一次），
+通过 ASGI 在进程内处理请求，使用临时目录中的独立 SQLite 数据库。各测试共用同一个数据库，
+须自行创建所需的数据（用户名等带上唯一后缀），不依赖其他测试留下的数据。
+"""
+import itertools
+
+import pytest
+
+from benchmarks.common import app_client, login
+
+# 固定较低的 bcrypt 成本，跳过启动时的校准；准入控制由需要的测试自行开启
+TEST_CONFIG = {
+    'PASSWORD_HASH_ROUNDS': 4,
+    'ADMISSION_CONTROL': False,
+    'TAG_INDEX_REFRESH': 0,
+    'WRITE_BEHIND_INTERVAL': 60,
+}
+
+_counter = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def app_and_client(anyio_backend):
+    async with app_client(**TEST_CONFIG) as pair:
+        yield pair
+
+
+@pytest.fixture
+def app(app_and_client):
+    return app_and_client[0]
+
+
+@pytest.fixture
+def client(app_and_client):
+    return app_and_client[1]
+
+
+def _unique(prefix):
+    return f"{prefix}{next(_counter)}"
+
+
+@pytest.fixture
+def unique():
+    """生成测试数据的唯一名称，如 unique("user") 返回 user1、user2……"""
+    return _unique
+
+
+@pytest.fixture
+async def user(client):
+    """新建用户并登录，返回 (用户, 带访问令牌的请求头)"""
+    from models.user import User
+    username = _unique("user")
+    created = await User.create(username=username, password="secret1", email=f"{username}@example.com")
+    return created, await login(client, username, "secret1")
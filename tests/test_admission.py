@@ -0,0 +1,137 @@
+"""准入控制：令牌桶的补充和淘汰、429 与 Retry-After，以及登录的按用户名限速"""
+import multiprocessing
+
+import httpx
+import pytest
+
+from middleware import admission
+from middleware.admission import MemoryBuckets, SharedBuckets
+
+
+@pytest.fixture(params=["memory", "shared"])
+def buckets(request):
+    if request.param == "memory":
+        return MemoryBuckets(capacity=4)
+    return SharedBuckets(SharedBuckets.allocate(4))
+
+
+def test_take_refills_over_time(buckets):
+    # 每秒补充 1 个，容量 2
+    assert buckets.take("k", 1, 2, now=100.0) == 0
+    assert buckets.take("k", 1, 2, now=100.0) == 0
+    assert buckets.take("k", 1, 2, now=100.0) == pytest.approx(1.0)
+    assert buckets.take("k", 1, 2, now=100.5) == pytest.approx(0.5)
+    assert buckets.take("k", 1, 2, now=101.5) == 0
+    # 长时间空闲后最多补满容量
+    assert buckets.take("k", 1, 2, now=1000.0) == 0
+    assert buckets.take("k", 1, 2, now=1000.0) == 0
+    assert buckets.take("k", 1, 2, now=1000.0) > 0
+    # 不同的键互不影响
+    assert buckets.take("other", 1, 2, now=1000.0) == 0
+
+
+def test_refund_returns_one_token_up_to_burst(buckets):
+    assert buckets.take("k", 1, 2, now=0.0) == 0
+    assert buckets.take("k", 1, 2, now=0.0) == 0
+    buckets.refund("k", 2)
+    assert buckets.take("k", 1, 2, now=0.0) == 0
+    assert buckets.take("k", 1, 2, now=0.0) > 0
+
+    buckets.refund("k", 2)
+    buckets.refund("k", 2)
+    buckets.refund("k", 2)
+    assert buckets.take("k", 1, 2, now=0.0) == 0
+    assert buckets.take("k", 1, 2, now=0.0) == 0
+    assert buckets.take("k", 1, 2, now=0.0) > 0
+    # 没有桶的键不受影响
+    buckets.refund("missing", 2)
+
+
+def test_memory_buckets_evict_least_recently_used():
+    buckets = MemoryBuckets(capacity=2)
+    buckets.take("a", 1, 1, now=0.0)
+    buckets.take("b", 1, 1, now=0.0)
+    buckets.take("a", 1, 1, now=0.0)
+    buckets.take("c", 1, 1, now=0.0)
+    assert len(buckets) == 2 and buckets.evicted == 1
+    # b 已被淘汰，重新得到满的桶；a 仍然为空
+    assert buckets.take("b", 1, 1, now=0.0) == 0
+    assert buckets.take("c", 1, 1, now=0.0) > 0
+
+
+def _take_keys(array, keys):
+    buckets = SharedBuckets(array)
+    for key in keys:
+        buckets.take(key, 1, 1, now=0.0)
+
+
+def test_shared_buckets_count_evictions_across_processes():
+    # 只有一个槽位：每个新键都会接管槽位，淘汰前一个键
+    array = SharedBuckets.allocate(1)
+    parent = SharedBuckets(array)
+    parent.take("a", 1, 1, now=0.0)
+
+    worker = multiprocessing.Process(target=_take_keys, args=(array, ["b", "c"]))
+    worker.start()
+    worker.join()
+    assert worker.exitcode == 0
+
+    assert parent.evicted == 2
+    assert len(parent) == 1
+    parent.take("a", 1, 1, now=0.0)
+    assert parent.evicted == 3
+    assert "sanic_admission_buckets_evicted_total 3" in admission.AdmissionController(parent).metrics()
+
+
+@pytest.fixture
+def admission_on(monkeypatch):
+    """开启准入控制：登录每 IP 容量 3，每 (用户名, IP) 容量 2，补充足够慢"""
+    controller = admission.controller
+    monkeypatch.setattr(controller, "enabled", True)
+    monkeypatch.setattr(controller, "buckets", MemoryBuckets())
+    monkeypatch.setattr(controller, "ip_rates", {"login": (0.001, 3)})
+    monkeypatch.setattr(controller, "username_rate", (0.001, 2))
+    return controller
+
+
+def client_from(app, ip):
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def attempt(client, user, password):
+    return await client.post("/auth/login", json={"username": user.username, "password": password})
+
+
+@pytest.mark.anyio
+async def test_ip_limit_returns_429_with_retry_after(app, user, admission_on):
+    created, _ = user
+    async with client_from(app, "10.0.0.1") as client:
+        statuses = [(await attempt(client, created, f"wrong{i}")).status_code for i in range(2)]
+        # 换一个用户名，只受每 IP 的限制
+        statuses.append((await client.post("/auth/login", json={"username": "nobody", "password": "x"})).status_code)
+        response = await client.post("/auth/login", json={"username": "nobody", "password": "x"})
+    assert statuses == [401, 401, 401]
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert admission_on.rejected["ip"] >= 1
+
+
+@pytest.mark.anyio
+async def test_failed_logins_from_one_ip_do_not_lock_out_others(app, user, admission_on):
+    created, _ = user
+    async with client_from(app, "10.0.0.2") as attacker:
+        assert [(await attempt(attacker, created, "wrong")).status_code for _ in range(3)] == [401, 401, 429]
+    async with client_from(app, "10.0.0.3") as owner:
+        assert (await attempt(owner, created, "secret1")).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_successful_logins_do_not_consume_username_tokens(app, user, admission_on):
+    created, _ = user
+    admission_on.ip_rates = {"login": None}
+    async with client_from(app, "10.0.0.4") as client:
+        statuses = [(await attempt(client, created, "secret1")).status_code for _ in range(5)]
+        assert statuses == [200] * 5
+        # 失败的尝试仍然计数
+        assert [(await attempt(client, created, "wrong")).status_code for _ in range(3)] == [401, 401, 429]
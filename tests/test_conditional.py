@@ -0,0 +1,111 @@
+"""列表与详情接口的条件请求（ETag / Last-Modified）"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+# 远晚于任何数据的时间：按 Last-Modified 比较时一定判为未修改
+FAR_FUTURE = "Fri, 01 Jan 2100 00:00:00 GMT"
+
+
+async def create_post(client, headers):
+    response = await client.post("/api/v1/posts", json={"title": "标题", "content": "内容"}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+async def test_list_revalidates_with_etag(client, user):
+    _, headers = user
+    await create_post(client, headers)
+    first = await client.get("/api/v1/posts")
+    etag = first.headers["etag"]
+
+    response = await client.get("/api/v1/posts", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    await create_post(client, headers)
+    response = await client.get("/api/v1/posts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/api/v1/posts", "/api/v1/users", "/api/v2/users"])
+async def test_list_ignores_if_modified_since(client, user, path):
+    # 删除行不改变最大 updated_at，列表不能按 Last-Modified 判断是否修改
+    _, headers = user
+    response = await client.get(path, headers=headers)
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
+
+    response = await client.get(path, headers={**headers, "If-Modified-Since": FAR_FUTURE})
+    assert response.status_code == 200
+
+
+async def test_delete_invalidates_list_for_if_modified_since(client, user):
+    _, headers = user
+    post_id = await create_post(client, headers)
+    await create_post(client, headers)
+    before = await client.get("/api/v1/posts")
+
+    response = await client.delete(f"/api/v1/posts/{post_id}", headers=headers)
+    assert response.status_code == 200
+
+    response = await client.get("/api/v1/posts", headers={"If-Modified-Since": FAR_FUTURE})
+    assert response.status_code == 200
+    assert post_id not in [post["id"] for post in response.json()["posts"]]
+    response = await client.get("/api/v1/posts", headers={"If-None-Match": before.headers["etag"]})
+    assert response.status_code == 200
+
+
+async def test_detail_honours_if_modified_since(client, user):
+    _, headers = user
+    post_id = await create_post(client, headers)
+    response = await client.get(f"/api/v1/posts/{post_id}")
+    last_modified = response.headers["last-modified"]
+
+    # 第二次请求命中响应缓存，同样按缓存的 Last-Modified 判断
+    for _ in range(2):
+        response = await client.get(f"/api/v1/posts/{post_id}", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+
+async def test_tag_rename_changes_post_etag(client, user, unique):
+    _, headers = user
+    tag = (await client.post("/api/v1/tags", json={"name": unique("tag")}, headers=headers)).json()
+    response = await client.post("/api/v1/posts", json={"title": "标题", "content": "内容", "tag_ids": [tag["id"]]},
+                                 headers=headers)
+    post_id = response.json()["id"]
+    before = await client.get(f"/api/v1/posts/{post_id}")
+
+    response = await client.put(f"/api/v1/tags/{tag['id']}", json={"name": unique("tag")}, headers=headers)
+    assert response.status_code == 200
+    response = await client.get(f"/api/v1/posts/{post_id}", headers={"If-None-Match": before.headers["etag"]})
+    assert response.status_code == 200
+    assert response.json()["tags"][0]["name"] != tag["name"]
+
+
+async def test_tag_rename_touches_many_posts(client, user, unique):
+    # 帖子数超过 SQLite 的绑定参数上限（999）时同样只执行一条 UPDATE
+    from models.post import Post
+    author, headers = user
+    tag = (await client.post("/api/v1/tags", json={"name": unique("tag")}, headers=headers)).json()
+    await Post.bulk_create([Post(title="标题", content="内容", user_id=author.id) for _ in range(1200)])
+    post_ids = await Post.filter(user_id=author.id).values_list("id", flat=True)
+    await Post._meta.db.execute_many(
+        'INSERT INTO "posts_tags" ("posts_id", "tag_id") VALUES (?, ?)', [[post_id, tag["id"]] for post_id in post_ids]
+    )
+    before = await Post.filter(user_id=author.id).values_list("updated_at", flat=True)
+
+    response = await client.delete(f"/api/v1/tags/{tag['id']}", headers=headers)
+    assert response.status_code == 200
+    after = await Post.filter(user_id=author.id).values_list("updated_at", flat=True)
+    assert len(after) == 1200 and min(after) > max(before)
+
+
+async def test_username_change_changes_post_etag(client, user, unique):
+    author, headers = user
+    post_id = await create_post(client, headers)
+    before = await client.get(f"/api/v1/posts/{post_id}")
+
+    response = await client.put(f"/api/v1/users/{author.id}", json={"username": unique("user")}, headers=headers)
+    assert response.status_code == 200
+    response = await client.get(f"/api/v1/posts/{post_id}", headers={"If-None-Match": before.headers["etag"]})
+    assert response.status_code == 200
@@ -0,0 +1,94 @@
+"""字段级变更跟踪：save() 只写有变化的列，User.save 只在密码变化时重新哈希"""
+import pytest
+
+from middleware import instrumentation
+
+pytestmark = pytest.mark.anyio
+
+
+def updates(stats):
+    return [sql for sql in stats.statements if sql.lstrip().upper().startswith("UPDATE")]
+
+
+@pytest.fixture
+async def post(user):
+    from models.post import Post
+    author, _ = user
+    created = await Post.create(title="标题", content="内容", user_id=author.id)
+    return await Post.get(id=created.id)
+
+
+async def test_untouched_save_issues_no_update(post):
+    with instrumentation.collect() as stats:
+        await post.save()
+    assert stats.count == 0
+
+    # 赋相同的值也不算变化
+    post.title = post.title
+    with instrumentation.collect() as stats:
+        await post.save()
+    assert stats.count == 0
+
+
+async def test_save_writes_only_changed_columns(post):
+    from models.post import Post
+    before = post.updated_at
+    post.title = "新标题"
+    with instrumentation.collect() as stats:
+        await post.save()
+
+    [sql] = updates(stats)
+    assert '"title"' in sql and '"updated_at"' in sql
+    assert '"content"' not in sql and '"created_at"' not in sql
+    saved = await Post.get(id=post.id)
+    assert saved.title == "新标题" and saved.updated_at > before
+
+    # 保存后重新记录，再次保存没有变化
+    with instrumentation.collect() as stats:
+        await post.save()
+    assert stats.count == 0
+
+
+async def test_explicit_update_fields_keep_other_changes_pending(post):
+    post.title = "新标题"
+    post.content = "新内容"
+    await post.save(update_fields=["title"])
+    assert post.changed_fields() == ["content"]
+
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    import models.user
+    calls = []
+    original = models.user.hash_password
+
+    async def counting(password):
+        calls.append(password)
+        return await original(password)
+
+    monkeypatch.setattr(models.user, "hash_password", counting)
+    return calls
+
+
+async def test_user_save_rehashes_only_changed_password(user, hash_calls):
+    from models.user import User
+    created, _ = user
+    loaded = await User.get(id=created.id)
+    stored = loaded.password
+
+    loaded.email = "changed@example.com"
+    await loaded.save()
+    assert hash_calls == []
+    assert (await User.get(id=created.id)).password == stored
+
+    loaded.password = "secret2"
+    with instrumentation.collect() as stats:
+        await loaded.save()
+    assert hash_calls == ["secret2"]
+    [sql] = updates(stats)
+    assert '"password"' in sql and '"email"' not in sql
+    assert await (await User.get(id=created.id)).verify_password("secret2")
+
+    # 保存后记录的是哈希值，再次保存不会重复哈希
+    await loaded.save()
+    assert hash_calls == ["secret2"]
@@ -0,0 +1,63 @@
+"""迁移的幂等性，以及应用实际执行的热点查询是否命中索引（EXPLAIN QUERY PLAN）"""
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+from tortoise import connections
+
+from benchmarks.worker_scaling import ROOT
+from utils.migrations import migrate
+
+
+async def index_names():
+    rows = await connections.get('default').execute_query_dict(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )
+    return {row["name"] for row in rows}
+
+
+@pytest.mark.anyio
+async def test_asgi_startup_migrates(app):
+    # ASGI 模式下没有主进程，由 before_server_start 中的回退在当前进程中迁移
+    assert getattr(app.shared_ctx, 'schema_migrated', None) is None
+    assert "idx_posts_tags_tag_id_posts_id" in await index_names()
+
+
+@pytest.mark.anyio
+async def test_migrate_is_idempotent(app):
+    await migrate()
+    assert "idx_posts_tags_tag_id_posts_id" in await index_names()
+
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory):
+    """
+    在空数据库上执行 python -m utils.migrations --check，返回 {说明: (是否命中, 查询计划)}
+
+    查询计划与规划器统计信息有关，不使用其他测试写入过数据的共用数据库。
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "utils.migrations", "--check"],
+        cwd=tmp_path_factory.mktemp("plans"), env={**os.environ, "PYTHONPATH": ROOT},
+        capture_output=True, text=True
+    )
+    plans = {}
+    for line in result.stdout.splitlines():
+        match = re.match(r"\[(OK|FAIL)\] (.+?): 期望 .*?，计划: (.*)$", line)
+        if match:
+            plans[match[2]] = (match[1] == "OK", match[3])
+    assert plans, result.stdout + result.stderr
+    return plans
+
+
+def test_hot_queries_use_indexes(query_plans):
+    failed = [f"{label}: {plan}" for label, (used, plan) in query_plans.items() if not used]
+    assert not failed, "\n".join(failed)
+
+
+def test_keyset_pages_seek_instead_of_scanning(query_plans):
+    # 翻页条件 created_at < ? OR (id < ? AND created_at = ?) 须能在索引上定位起点，开销与翻到第几页无关
+    for label in ("帖子列表（键集分页）", "用户列表（键集分页）", "标签详情的帖子（键集分页）"):
+        assert query_plans[label][1].startswith("SEARCH"), f"{label}: {query_plans[label][1]}"
@@ -0,0 +1,88 @@
+"""键集分页：游标校验、同一 created_at 的并列行和最后一页"""
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.pagination import PaginationError, decode_cursor, encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+# 晚于其他测试数据的创建时间，这些帖子排在帖子列表的最前面
+FUTURE = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), 42]
+    assert decode_cursor(encode_cursor(values), ('created_at', 'id')) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!not-base64!!!",
+    "游标",
+    raw_cursor("not a list")[:-2],
+    raw_cursor({"created_at": "2024-01-01"}),
+    raw_cursor(["2024-01-01T00:00:00+00:00"]),
+    raw_cursor(["not a date", 1]),
+    raw_cursor([None, 1]),
+    raw_cursor(["2024-01-01T00:00:00+00:00", "1"]),
+    raw_cursor(["2024-01-01T00:00:00+00:00", True]),
+    raw_cursor(["2024-01-01T00:00:00+00:00", 10 ** 30]),
+])
+def test_decode_rejects_garbage(cursor):
+    with pytest.raises(PaginationError):
+        decode_cursor(cursor, ('created_at', 'id'))
+
+
+@pytest.mark.parametrize("path", ["/api/v1/posts", "/api/v1/users", "/api/v1/tags", "/api/v1/tags/{tag_id}"])
+@pytest.mark.parametrize("cursor", ["garbage", raw_cursor([10 ** 30]), raw_cursor(["2024-01-01", 10 ** 30])])
+async def test_invalid_cursor_is_400(client, user, unique, path, cursor):
+    _, headers = user
+    tag = (await client.post("/api/v1/tags", json={"name": unique("tag")}, headers=headers)).json()
+    response = await client.get(path.format(tag_id=tag["id"]), params={"cursor": cursor})
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+
+async def test_created_at_ties_are_broken_by_id(client, user):
+    from models.post import Post
+    author, _ = user
+    await Post.bulk_create([
+        Post(title=f"并列{i}", content="内容", user_id=author.id, created_at=FUTURE, updated_at=FUTURE)
+        for i in range(5)
+    ])
+    tied = sorted(await Post.filter(created_at=FUTURE).values_list("id", flat=True), reverse=True)
+
+    seen, cursor = [], None
+    while len(seen) < len(tied):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/v1/posts", params=params)).json()
+        seen += [post["id"] for post in page["posts"]]
+        cursor = page["next_cursor"]
+    # 同一时间的帖子按 id 降序，跨页既不重复也不遗漏
+    assert seen[:len(tied)] == tied
+
+
+@pytest.mark.parametrize("count, limit, pages", [(3, 2, [2, 1]), (2, 2, [2]), (0, 2, [0])])
+async def test_last_page_has_no_cursor(client, user, unique, count, limit, pages):
+    _, headers = user
+    tag = (await client.post("/api/v1/tags", json={"name": unique("tag")}, headers=headers)).json()
+    for _ in range(count):
+        await client.post("/api/v1/posts", json={"title": "标题", "content": "内容", "tag_ids": [tag["id"]]},
+                          headers=headers)
+
+    sizes, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get(f"/api/v1/tags/{tag['id']}", params=params)).json()
+        sizes.append(len(page["posts"]))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    # 恰好取满最后一页时同样不返回游标（多读一行判断是否还有下一页）
+    assert sizes == pages
@@ -0,0 +1,124 @@
+"""刷新令牌的轮换、重用检测和吊销索引"""
+import time
+import uuid
+
+import pytest
+
+from middleware import refresh_tokens, token_service
+from middleware.refresh_tokens import RevocationIndex
+from utils.bloom import BloomFilter
+
+
+async def login(client, user):
+    response = await client.post("/auth/login", json={"username": user.username, "password": "secret1"})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def refresh(client, refresh_token):
+    return await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [uuid.uuid4().hex for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+    # 达到预期容量时误判率接近设定值
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_revocation_index_confirms_bloom_hits():
+    index = RevocationIndex(capacity=100)
+    index.add("revoked", time.time() + 60)
+    assert "revoked" in index
+    assert "other" not in index
+
+    # 布隆过滤器误判时由精确集合否决
+    index._bloom.add("false-positive")
+    assert "false-positive" not in index
+
+
+def test_revocation_index_prunes_expired_and_grows():
+    index = RevocationIndex(capacity=10)
+    for i in range(10):
+        index.add(f"expired{i}", time.time() - 1)
+    # 容量已满：添加时清理过期项并重建过滤器
+    index.add("live", time.time() + 60)
+    assert len(index) == 1
+    assert "expired0" not in index and "live" in index
+
+    for i in range(20):
+        index.add(f"live{i}", time.time() + 60)
+    assert len(index) == 21
+    assert index._bloom.capacity > 10
+    assert all(f"live{i}" in index for i in range(20))
+
+
+@pytest.mark.anyio
+async def test_rotate_issues_new_tokens(client, user):
+    created, _ = user
+    tokens = await login(client, created)
+
+    response = await refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+
+    # 新的刷新令牌可以继续轮换
+    response = await refresh(client, rotated["refresh_token"])
+    assert response.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_reused_token_revokes_all_sessions(client, user):
+    from models.refresh_token import RefreshToken
+    created, _ = user
+    tokens = await login(client, created)
+    other_session = await login(client, created)
+    rotated = (await refresh(client, tokens["refresh_token"])).json()
+
+    # 旧令牌再次出现：拒绝，并吊销该用户的全部刷新令牌
+    response = await refresh(client, tokens["refresh_token"])
+    assert response.status_code == 401
+    for refresh_token in (rotated["refresh_token"], other_session["refresh_token"]):
+        assert (await refresh(client, refresh_token)).status_code == 401
+    assert not await RefreshToken.filter(user_id=created.id, revoked=False).exists()
+
+
+@pytest.mark.anyio
+async def test_expired_token_is_rejected(client, user):
+    created, _ = user
+    expired = token_service.encode({
+        'user_id': created.id, 'exp': time.time() - 10, 'type': 'refresh', 'jti': uuid.uuid4().hex
+    })
+    response = await refresh(client, expired)
+    assert response.status_code == 401
+
+    # 访问令牌不能当作刷新令牌使用
+    tokens = await login(client, created)
+    response = await refresh(client, tokens["access_token"])
+    assert response.status_code == 401
+
+
+class SaturatedBloom(BloomFilter):
+    """对任何 jti 都返回 True 的布隆过滤器（模拟误判）"""
+
+    def __contains__(self, key):
+        return True
+
+
+@pytest.mark.anyio
+async def test_rotation_survives_bloom_false_positive(client, user, monkeypatch):
+    created, _ = user
+    tokens = await login(client, created)
+    monkeypatch.setattr(refresh_tokens._index, "_bloom", SaturatedBloom(100))
+
+    # 精确集合中没有该 jti，仍然正常轮换，不会误判为重用而吊销全部令牌
+    response = await refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    response = await refresh(client, response.json()["refresh_token"])
+    assert response.status_code == 200
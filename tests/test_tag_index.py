@@ -0,0 +1,120 @@
+"""标签倒排索引：多标签 AND / OR 查询，以及帖子和标签写入后的增量维护"""
+from array import array
+
+import pytest
+
+from utils import tag_index
+from utils.tag_index import TagIndex
+
+
+def test_match_all_and_any():
+    index = TagIndex()
+    index.add(1, [10, 20])
+    index.add(2, [10])
+    index.add(3, [20, 30])
+    index.add(4, [10, 20, 30])
+
+    assert list(index.match([10, 20])) == [1, 4]
+    assert list(index.match([10, 20, 30])) == [4]
+    assert list(index.match([10, 20], match_all=False)) == [1, 2, 3, 4]
+    assert list(index.match([10, 99])) == []
+    assert list(index.match([99], match_all=False)) == []
+    assert list(index.match([])) == []
+
+
+def test_updates_keep_postings_sorted():
+    index = TagIndex()
+    for post_id in (5, 1, 3, 3):
+        index.add(post_id, [10])
+    assert index.match([10]) == array('I', [1, 3, 5])
+
+    index.remove(3, [10])
+    index.remove(7, [10, 20])
+    assert list(index.match([10])) == [1, 5]
+
+    index.drop_tag(10)
+    assert list(index.match([10])) == []
+
+
+def test_page_walks_ids_in_descending_order():
+    ids = array('I', [1, 2, 3, 4, 5])
+    assert tag_index.page(ids, None, 2) == ([5, 4], True)
+    assert tag_index.page(ids, 4, 2) == ([3, 2], True)
+    assert tag_index.page(ids, 2, 2) == ([1], False)
+    assert tag_index.page(array('I'), None, 2) == ([], False)
+
+
+async def create_post(client, headers, tag_ids):
+    response = await client.post("/api/v1/posts", json={"title": "标题", "content": "内容", "tag_ids": tag_ids},
+                                 headers=headers)
+    return response.json()["id"]
+
+
+async def search(client, tag_ids, match="all", **params):
+    response = await client.get("/api/v1/posts", params={
+        "tags": ",".join(map(str, tag_ids)), "match": match, **params
+    })
+    assert response.status_code == 200
+    return [post["id"] for post in response.json()["posts"]]
+
+
+@pytest.fixture
+async def tags(client, user, unique):
+    _, headers = user
+    return [
+        (await client.post("/api/v1/tags", json={"name": unique("tag")}, headers=headers)).json()["id"]
+        for _ in range(2)
+    ]
+
+
+@pytest.mark.anyio
+async def test_search_follows_post_writes(client, user, tags):
+    _, headers = user
+    a, b = tags
+    both = await create_post(client, headers, [a, b])
+    only_a = await create_post(client, headers, [a])
+    only_b = await create_post(client, headers, [b])
+
+    assert await search(client, [a, b]) == [both]
+    assert await search(client, [a, b], "any") == [only_b, only_a, both]
+    assert await search(client, [a, b], "any", limit=2) == [only_b, only_a]
+
+    # 修改帖子的标签
+    response = await client.put(f"/api/v1/posts/{only_a}", json={"title": "标题", "content": "内容", "tag_ids": [a, b]},
+                                headers=headers)
+    assert response.status_code == 200
+    assert await search(client, [a, b]) == [only_a, both]
+    # 接口按实际标签复核结果，这里直接检查索引本身已增量更新
+    assert list(tag_index.index.match([a, b])) == [both, only_a]
+
+    # 删除帖子
+    await client.delete(f"/api/v1/posts/{both}", headers=headers)
+    assert await search(client, [a, b]) == [only_a]
+    assert await search(client, [a]) == [only_a]
+    assert list(tag_index.index.match([a, b])) == [only_a]
+
+
+@pytest.mark.anyio
+async def test_search_follows_tag_delete(client, user, tags):
+    _, headers = user
+    a, b = tags
+    post_id = await create_post(client, headers, [a, b])
+
+    await client.delete(f"/api/v1/tags/{b}", headers=headers)
+    assert list(tag_index.index.match([b])) == []
+    assert await search(client, [b]) == []
+    assert await search(client, [a, b]) == []
+    assert await search(client, [a, b], "any") == [post_id]
+
+
+@pytest.mark.anyio
+async def test_search_follows_user_delete(client, user, tags):
+    created, headers = user
+    a, _ = tags
+    await create_post(client, headers, [a])
+
+    # 删除用户级联删除其帖子，索引在后台全量重建
+    response = await client.delete(f"/api/v1/users/{created.id}", headers=headers)
+    assert response.status_code == 200
+    await tag_index.index._loading
+    assert list(tag_index.index.match([a])) == []
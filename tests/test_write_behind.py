@@ -0,0 +1,101 @@
+"""后台写入队列：合并、批量刷新、失败重试，以及服务停止时写完剩余的更新"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils import write_behind
+from utils.write_behind import WriteBehindQueue
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+async def last_login(user_id):
+    from models.user import User
+    return (await User.get(id=user_id)).last_login
+
+
+async def test_updates_to_one_row_are_coalesced(user):
+    from models.user import User
+    created, _ = user
+    queue = WriteBehindQueue()
+    queue.update(User, created.id, last_login=T0)
+    queue.update(User, created.id, last_login=T0 + timedelta(seconds=1))
+    assert len(queue) == 1 and queue.coalesced == 1
+
+    assert await queue.flush() == 1
+    assert await last_login(created.id) == T0 + timedelta(seconds=1)
+
+
+async def test_full_batch_flushes_before_interval(user, unique):
+    from models.user import User
+    created, _ = user
+    other = await User.create(username=unique("user"), password="secret1", email="other@example.com")
+    queue = WriteBehindQueue(interval=60, batch_size=2)
+    queue.start()
+    try:
+        queue.update(User, created.id, last_login=T0)
+        queue.update(User, other.id, last_login=T0)
+        for _ in range(100):
+            if queue.written == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert queue.written == 2 and queue.flushes == 1
+    finally:
+        await queue.stop()
+    assert await last_login(other.id) == T0
+
+
+async def test_failed_flush_requeues_without_overwriting_newer_values(user):
+    from models.user import User
+    created, _ = user
+    queue = WriteBehindQueue()
+    write = queue._write
+
+    async def failing_write(batch):
+        # 写入期间又排入了同一行的新值
+        queue._pending[(User, created.id)] = {"last_login": T0 + timedelta(seconds=2)}
+        raise RuntimeError("database is locked")
+
+    queue.update(User, created.id, last_login=T0, email="requeued@example.com")
+    queue._write = failing_write
+    assert await queue.flush() == 0
+    assert queue.failures == 1 and len(queue) == 1
+
+    queue._write = write
+    assert await queue.flush() == 1
+    saved = await User.get(id=created.id)
+    assert saved.last_login == T0 + timedelta(seconds=2)
+    assert saved.email == "requeued@example.com"
+
+
+async def test_full_queue_drops_new_rows(user):
+    from models.user import User
+    created, _ = user
+    queue = WriteBehindQueue(max_pending=1)
+    queue.update(User, created.id, last_login=T0)
+    queue.update(User, created.id + 1, last_login=T0)
+    # 已在队列中的行仍可合并
+    queue.update(User, created.id, last_login=T0 + timedelta(seconds=1))
+    assert queue.dropped == 1 and len(queue) == 1
+    await queue.flush()
+
+
+async def test_server_stop_drains_pending_updates(app, client, user):
+    import main
+    created, _ = user
+    queue = write_behind.queue
+    # 测试配置的刷新间隔为 60 秒，登录时间留在队列中
+    response = await client.post("/auth/login", json={"username": created.username, "password": "secret1"})
+    assert response.status_code == 200
+    assert len(queue) >= 1
+    assert await last_login(created.id) is None
+
+    try:
+        await main.drain_write_behind(app, None)
+        assert len(queue) == 0
+        assert await last_login(created.id) is not None
+    finally:
+        await main.start_write_behind(app, None)
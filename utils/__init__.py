@@ -0,0 +1 @@
+# 空初始化文件，使utils成为一个包
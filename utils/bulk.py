@@ -0,0 +1,145 @@
+from pydantic import ValidationError
+
+from utils.serializers import loads
+from utils.streaming import NDJSON
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_ITEMS = 10000
+
+
+class BulkBodyError(ValueError):
+    """请求体无法解析为条目列表"""
+
+
+class BulkResult:
+    """
+    批量操作结果：按提交顺序记录成功条目的 id 和失败条目的错误
+
+    只保存 id 与错误信息，不保留条目本身，内存占用与请求体大小无关。
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.errors = []
+
+    def fail(self, index, error):
+        self.errors.append({"index": index, "error": error})
+
+    def fail_all(self, indexes, error):
+        for index in indexes:
+            self.fail(index, error)
+
+    def to_dict(self):
+        return {
+            "created": len(self.ids),
+            "failed": len(self.errors),
+            "ids": self.ids,
+            "errors": sorted(self.errors, key=lambda e: e["index"])
+        }
+
+
+def validation_message(exc):
+    """把 Pydantic 校验错误压缩成一行"""
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+            for err in exc.errors()
+        )
+    return str(exc)
+
+
+def validate(schema, item):
+    """校验单个条目，返回 (模型, None) 或 (None, 错误信息)"""
+    if not isinstance(item, dict):
+        return None, "条目必须是 JSON 对象"
+    try:
+        return schema(**item), None
+    except (ValidationError, TypeError, ValueError) as e:
+        return None, validation_message(e)
+
+
+async def _iter_ndjson(request):
+    """逐块读取请求体并按行解析，任意时刻只持有一个数据块"""
+    buffer = b""
+    while True:
+        chunk = await request.stream.read()
+        if chunk is None:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def iter_items(request):
+    """
+    迭代批量请求中的条目
+
+    Content-Type 为 application/x-ndjson 时流式读取（每行一条）；否则读取完整请求体，
+    接受 JSON 数组或 {"items": [...]}。无法解析的 NDJSON 行以 BulkBodyError 作为条目产出，
+    由调用方记为该条失败。
+    """
+    if NDJSON in request.headers.get('Content-Type', ''):
+        async for line in _iter_ndjson(request):
+            try:
+                yield loads(line)
+            except ValueError:
+                yield BulkBodyError("无效的 JSON 行")
+        return
+
+    await request.receive_body()
+    try:
+        body = loads(request.body) if request.body else None
+    except ValueError:
+        raise BulkBodyError("请求体不是有效的 JSON")
+    items = body.get('items') if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise BulkBodyError("请求体必须是条目数组或 {\"items\": [...]}")
+    for item in items:
+        yield item
+
+
+async def iter_chunks(request, max_items, chunk_size, result):
+    """
+    按 chunk_size 分块产出 [(序号, 条目)]
+
+    超出 max_items 的部分不再读取，记为一条错误。
+    """
+    chunk = []
+    index = 0
+    async for item in iter_items(request):
+        if index >= max_items:
+            result.fail(index, f"超出单次批量上限 {max_items} 条，其余条目未处理")
+            break
+        if isinstance(item, BulkBodyError):
+            result.fail(index, str(item))
+        else:
+            chunk.append((index, item))
+        index += 1
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_settings(app_config):
+    return (
+        app_config.get('BULK_MAX_ITEMS', DEFAULT_MAX_ITEMS),
+        app_config.get('BULK_CHUNK_SIZE', DEFAULT_CHUNK_SIZE),
+    )
+
+
+async def inserted_ids(conn, count):
+    """
+    取事务内刚由 bulk_create 插入的 count 行的主键
+
+    bulk_create 不回填主键。事务持有写锁期间 SQLite 的自增主键连续分配，
+    因此最后一次插入的 rowid 往前数 count 个即为本批的主键，按插入顺序排列。
+    """
+    _, rows = await conn.execute_query("SELECT last_insert_rowid() AS last_id")
+    last_id = rows[0]["last_id"]
+    return list(range(last_id - count + 1, last_id + 1))
@@ -0,0 +1,79 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from sanic.response import HTTPResponse
+from tortoise.functions import Count, Max
+
+
+def make_etag(*parts):
+    """根据版本信息（如 id、updated_at）计算强 ETag"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def fingerprint_query(query):
+    return query.annotate(_count=Count('id'), _last=Max('updated_at')).values('_count', '_last')
+
+
+async def table_fingerprint(query):
+    """
+    列表的廉价指纹：(行数, 最大 updated_at)
+
+    任何新增、删除（行数变化）或更新（updated_at 变化）都会改变指纹，
+    只需一次聚合查询，不加载任何行。
+    """
+    rows = await fingerprint_query(query)
+    row = rows[0] if rows else {}
+    return row.get('_count', 0), _to_datetime(row.get('_last'))
+
+
+def has_validators(request):
+    """请求是否携带了缓存校验头"""
+    return 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    判断客户端缓存的版本是否仍然有效
+
+    If-None-Match 优先（按弱比较忽略 W/ 前缀）；只有在请求未携带
+    If-None-Match 时才检查 If-Modified-Since。
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP 日期只精确到秒
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag, last_modified=None):
+    """生成响应中的 ETag / Last-Modified 头"""
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(etag, last_modified=None):
+    """构造不带响应体的 304 响应"""
+    return HTTPResponse(status=304, headers=validator_headers(etag, last_modified))
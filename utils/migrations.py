@@ -0,0 +1,174 @@
+"""
+数据库迁移：幂等地创建表和索引，并用 EXPLAIN QUERY PLAN 检查热点查询是否命中索引
+
+    python -m utils.migrations           # 对配置的数据库执行迁移
+    python -m utils.migrations --check   # 迁移后检查查询计划，未命中索引时以非零状态退出
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from tortoise import Tortoise, connections
+
+# 模型 Meta.indexes 无法声明的索引（多对多中间表的反向索引）
+EXTRA_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS "idx_posts_tags_tag_id_posts_id" ON "posts_tags" ("tag_id", "posts_id")',
+]
+
+# 已有表上新增的列：generate_schemas(safe=True) 只创建缺失的表，不会修改已有的表
+ADDED_COLUMNS = [
+    ("users", "last_login", "TIMESTAMP"),
+]
+
+# 帖子全文检索：外部内容 FTS5 表（只存索引不存原文），由触发器与 posts 保持同步。
+# trigram 分词按三个字符切分，中英文都能做子串匹配，查询词至少需要 3 个字符。
+FTS_TABLE = "posts_fts"
+FTS_SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5(
+        title, content, content="posts", content_rowid="id", tokenize="trigram"
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_ai" AFTER INSERT ON "posts" BEGIN
+        INSERT INTO "{FTS_TABLE}" (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_ad" AFTER DELETE ON "posts" BEGIN
+        INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END''',
+    # Tortoise 的 save 会写回所有列，只在标题或内容实际变化时更新索引
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_au" AFTER UPDATE OF title, content ON "posts"
+    WHEN old.title IS NOT new.title OR old.content IS NOT new.content BEGIN
+        INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO "{FTS_TABLE}" (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END''',
+]
+
+# 查询计划检查使用的游标值和时间（只影响 SQL 中的字面量，不影响查询计划）
+_PLAN_TIME = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def hot_queries():
+    """
+    热点查询及其应使用的索引列：[(说明, SQL, 参数, 表, 索引列)]
+
+    SQL 取自应用实际执行的查询（分页、指纹、字段投影等由同一组函数构造），
+    ORM 查询的参数内联在 SQL 中。
+    """
+    from apps.api_v1.tags import TAG_POST_COUNT_SQL, tag_posts_sql
+    from models.post import Post, TOUCH_TAG_SQL
+    from models.refresh_token import RefreshToken
+    from models.tag import Tag
+    from models.user import User
+    from schemas.post import PostResponse
+    from schemas.user import UserResponse
+    from utils.conditional import fingerprint_query
+    from utils.pagination import page_query
+    from utils.projection import Projection
+
+    keys = ('created_at', 'id')
+    posts = Projection(Post, PostResponse, required=('created_at',))
+    users = Projection(User, UserResponse, required=('created_at',))
+    orm = [
+        ("帖子列表（首页）", posts.query(page_query(Post.all(), keys, 20)), "posts", keys),
+        ("帖子列表（键集分页）", posts.query(page_query(Post.all(), keys, 20, [_PLAN_TIME, 100])), "posts", keys),
+        ("帖子列表指纹", fingerprint_query(Post.all()), "posts", ("updated_at",)),
+        ("帖子的标签（字段投影）", posts.many_query([1, 2], 'tags'), "posts_tags", ("posts_id", "tag_id")),
+        ("更新作者的帖子", Post.touch_author_query(1, _PLAN_TIME), "posts", ("user_id", "created_at")),
+        ("用户列表（键集分页）", users.query(page_query(User.all(), keys, 20, [_PLAN_TIME, 100])), "users", keys),
+        ("按用户名查找用户", User.filter(username="alice").limit(2), "users", ("username",)),
+        ("按名称查找标签", Tag.filter(name="python").first(), "tags", ("name",)),
+        ("加载未过期的已吊销刷新令牌",
+         RefreshToken.filter(revoked=True, expires_at__gt=_PLAN_TIME).values_list('jti', 'expires_at'),
+         "refresh_tokens", ("revoked", "expires_at")),
+        ("吊销用户的全部刷新令牌",
+         RefreshToken.filter(user_id=1, revoked=False).values_list('jti', 'expires_at'),
+         "refresh_tokens", ("user_id", "revoked")),
+    ]
+    queries = [(label, query.sql(params_inline=True), [], table, columns) for label, query, table, columns in orm]
+    queries += [
+        ("标签详情的帖子（键集分页）", *tag_posts_sql(1, 20, 100), "posts_tags", ("tag_id", "posts_id")),
+        ("标签的帖子数", TAG_POST_COUNT_SQL, [1], "posts_tags", ("tag_id", "posts_id")),
+        ("更新标签下的帖子", TOUCH_TAG_SQL, [_PLAN_TIME, 1], "posts_tags", ("tag_id", "posts_id")),
+    ]
+    return queries
+
+
+async def _table_exists(conn, name):
+    rows = await conn.execute_query_dict("SELECT 1 FROM sqlite_master WHERE name = ?", [name])
+    return bool(rows)
+
+
+async def add_columns(conn):
+    """为已有的表补上新增的列（列已存在时跳过）"""
+    for table, column, definition in ADDED_COLUMNS:
+        rows = await conn.execute_query_dict(f'PRAGMA table_info("{table}")')
+        if column not in {row["name"] for row in rows}:
+            await conn.execute_script(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}')
+
+
+async def create_fts(conn):
+    """创建全文检索表和同步触发器；首次创建时用已有帖子回填索引"""
+    existed = await _table_exists(conn, FTS_TABLE)
+    for sql in FTS_SCHEMA:
+        await conn.execute_script(sql)
+    if not existed:
+        await conn.execute_script(f"""INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}") VALUES ('rebuild')""")
+
+
+async def migrate(connection_name='default'):
+    """创建缺失的表和索引（可重复执行），并更新查询规划器的统计信息"""
+    conn = connections.get(connection_name)
+    await Tortoise.generate_schemas(safe=True)
+    await add_columns(conn)
+    for sql in EXTRA_INDEXES:
+        await conn.execute_script(sql)
+    await create_fts(conn)
+    await conn.execute_script("PRAGMA optimize")
+
+
+async def index_for_columns(conn, table, columns):
+    """按列查找索引名称（列顺序须一致）"""
+    for index in await conn.execute_query_dict(f'PRAGMA index_list("{table}")'):
+        info = await conn.execute_query_dict(f'PRAGMA index_info("{index["name"]}")')
+        if tuple(row["name"] for row in sorted(info, key=lambda r: r["seqno"])) == tuple(columns):
+            return index["name"]
+    return None
+
+
+async def check_query_plans(connection_name='default'):
+    """返回 [(说明, 期望索引, 查询计划, 是否命中)]"""
+    conn = connections.get(connection_name)
+    results = []
+    for label, sql, params, table, columns in hot_queries():
+        expected = await index_for_columns(conn, table, columns)
+        plan = " | ".join(
+            row["detail"] for row in await conn.execute_query_dict(f"EXPLAIN QUERY PLAN {sql}", params)
+        )
+        results.append((label, expected, plan, expected is not None and expected in plan))
+    return results
+
+
+async def _run(check):
+    from main import TORTOISE_ORM
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        await migrate()
+        print("迁移完成")
+        if not check:
+            return True
+
+        ok = True
+        for label, expected, plan, used in await check_query_plans():
+            ok = ok and used
+            print(f"[{'OK' if used else 'FAIL'}] {label}: 期望 {expected}，计划: {plan}")
+        return ok
+    finally:
+        await connections.close_all()
+
+
+def main():
+    ok = asyncio.run(_run("--check" in sys.argv[1:]))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime
+
+from tortoise.expressions import Q
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+# SQLite 整数的取值范围，超出时绑定参数会抛出 OverflowError
+MAX_ID = 2 ** 63 - 1
+
+
+class PaginationError(ValueError):
+    """分页参数错误（无效的游标或 limit）"""
+
+
+def encode_cursor(values):
+    """将排序键的值编码为不透明游标"""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """解码游标，返回与排序键一一对应的值列表"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise PaginationError("无效的分页游标")
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise PaginationError("无效的分页游标")
+
+    decoded = []
+    for key, value in zip(keys, values):
+        if key.endswith('_at'):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise PaginationError("无效的分页游标")
+        elif key == 'id' and (type(value) is not int or not 0 <= value <= MAX_ID):
+            raise PaginationError("无效的分页游标")
+        decoded.append(value)
+    return decoded
+
+
+def parse_limit(request):
+    """解析 limit 参数，超过服务端上限时截断"""
+    config = request.app.config
+    default = config.get('PAGE_DEFAULT_LIMIT', DEFAULT_PAGE_LIMIT)
+    maximum = config.get('PAGE_MAX_LIMIT', MAX_PAGE_LIMIT)
+
+    raw = request.args.get('limit')
+    if raw is None:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError("limit 必须是整数")
+    if limit < 1:
+        raise PaginationError("limit 必须大于 0")
+    return min(limit, maximum)
+
+
+def _after(keys, values):
+    """构造 "排在游标之后" 的条件（降序），例如 (a < x) OR (a = x AND b < y)"""
+    condition = None
+    for i, key in enumerate(keys):
+        branch = Q(**{f"{key}__lt": values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            branch &= Q(**{prev_key: prev_value})
+        condition = branch if condition is None else condition | branch
+    return condition
+
+
+def page_query(query, keys, limit, after=None):
+    """一页的查询：排在游标值 after 之后（after 为 None 时为首页），按 keys 降序取 limit + 1 行"""
+    if after is not None:
+        query = query.filter(_after(keys, after))
+    return query.order_by(*[f"-{key}" for key in keys]).limit(limit + 1)
+
+
+async def paginate(query, request, keys=('created_at', 'id'), fetch=None):
+    """
+    基于键集（keyset）的游标分页
+
+    按 keys 降序排列，只读取 limit + 1 行用于判断是否还有下一页，
+    因此每次请求的开销只与页大小有关，与表的总行数无关。
+    fetch 为执行查询的协程函数（如字段投影的 Projection.fetch），默认直接加载模型对象。
+    返回 (当前页的行, 下一页游标或 None)
+    """
+    limit = parse_limit(request)
+    cursor = request.args.get('cursor')
+    query = page_query(query, keys, limit, decode_cursor(cursor, keys) if cursor else None)
+    rows = await (fetch(query) if fetch else query)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([
+            last[key] if isinstance(last, dict) else getattr(last, key)
+            for key in keys
+        ])
+    return rows, next_cursor
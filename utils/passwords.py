@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import bcrypt
+from sanic.exceptions import ServiceUnavailable
+
+# bcrypt 库的默认成本（2^12 次迭代）
+DEFAULT_ROUNDS = 12
+# 自动校准的默认目标：单次哈希/校验约 250ms，成本不低于 10
+DEFAULT_TARGET_MS = 250
+DEFAULT_MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+# 校准时用低成本探测单次耗时，成本每加 1 耗时翻倍
+CALIBRATION_ROUNDS = 8
+CALIBRATION_SAMPLES = 3
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    """密码哈希线程池已饱和"""
+
+    def __init__(self, message="服务器繁忙，请稍后重试"):
+        super().__init__(message, headers={"Retry-After": "1"})
+
+
+def _hashpw(password, rounds=DEFAULT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    """
+    在事件循环之外执行 bcrypt 哈希与校验
+
+    bcrypt 计算期间会释放 GIL，因此默认使用线程池即可并行；
+    use_processes=True 时改用进程池。正在执行和排队的任务总数超过
+    workers + queue_limit 时直接拒绝，避免请求在队列中无限堆积。
+    workers=0 表示在事件循环中同步计算（仅用于调试和基准对比）。
+    """
+
+    def __init__(self, workers=None, queue_limit=32, use_processes=False):
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.queue_limit = queue_limit
+        self.use_processes = use_processes
+        # 新哈希使用的 bcrypt 成本（见 configure）
+        self.rounds = DEFAULT_ROUNDS
+        self.in_flight = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._executor = None
+
+    @property
+    def settings(self):
+        return (self.workers, self.queue_limit, self.use_processes)
+
+    def _get_executor(self):
+        if self._executor is None and self.workers > 0:
+            pool = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        executor = self._get_executor()
+        if executor is None:
+            return func(*args)
+
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password):
+        return await self._run(_hashpw, password, self.rounds)
+
+    async def verify(self, password, hashed):
+        return await self._run(_checkpw, password, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "rounds": self.rounds,
+            "rehashed": self.rehashed
+        }
+
+
+hasher = PasswordHasher()
+
+
+def calibrate(target_ms=DEFAULT_TARGET_MS, min_rounds=DEFAULT_MIN_ROUNDS):
+    """
+    测量本机的 bcrypt 耗时，返回单次哈希不超过 target_ms 的最大成本（不低于 min_rounds）
+
+    以 CALIBRATION_ROUNDS 的成本计时（取几次中最快的一次），按成本每加 1 耗时翻倍外推。
+    """
+    salt = bcrypt.gensalt(CALIBRATION_ROUNDS)
+    probe = min(_timed_hash(salt) for _ in range(CALIBRATION_SAMPLES)) * 1000
+    rounds = CALIBRATION_ROUNDS
+    while rounds < MAX_ROUNDS and probe * 2 ** (rounds + 1 - CALIBRATION_ROUNDS) <= target_ms:
+        rounds += 1
+    return min(MAX_ROUNDS, max(min_rounds, rounds))
+
+
+def _timed_hash(salt):
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", salt)
+    return time.perf_counter() - start
+
+
+def policy_rounds(app_config):
+    """按配置确定 bcrypt 成本：PASSWORD_HASH_ROUNDS 为固定值，未设置时按 PASSWORD_HASH_TARGET_MS 校准"""
+    rounds = app_config.get('PASSWORD_HASH_ROUNDS')
+    if rounds:
+        return rounds
+    return calibrate(
+        app_config.get('PASSWORD_HASH_TARGET_MS', DEFAULT_TARGET_MS),
+        app_config.get('PASSWORD_HASH_MIN_ROUNDS', DEFAULT_MIN_ROUNDS)
+    )
+
+
+def configure(app_config, rounds=None):
+    """
+    根据应用配置重建哈希线程池（配置未变化时保持不变）并设置 bcrypt 成本
+
+    rounds 为主进程校准好的成本（多 worker 共用同一成本）；未提供时在当前进程中按配置确定。
+    """
+    global hasher
+    new = PasswordHasher(
+        workers=app_config.get('PASSWORD_HASH_WORKERS'),
+        queue_limit=app_config.get('PASSWORD_HASH_QUEUE_LIMIT', 32),
+        use_processes=app_config.get('PASSWORD_HASH_USE_PROCESSES', False)
+    )
+    if new.settings != hasher.settings:
+        hasher.shutdown()
+        hasher = new
+    hasher.rounds = rounds or policy_rounds(app_config)
+
+
+def hash_rounds(hashed):
+    """bcrypt 哈希（$2b$12$...）中记录的成本，格式不符时返回 None"""
+    parts = hashed.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed):
+    """存储的哈希成本与当前策略不同，登录时应重新哈希"""
+    return hash_rounds(hashed) != hasher.rounds
+
+
+async def hash_password(password):
+    """计算密码的 bcrypt 哈希"""
+    return await hasher.hash(password)
+
+
+async def check_password(password, hashed):
+    """校验密码与 bcrypt 哈希是否匹配"""
+    return await hasher.verify(password, hashed)
@@ -0,0 +1,171 @@
+"""
+字段选择（sparse fieldsets）：?fields=id,title,user.username,tags
+
+选择在查询层下推为 values() 投影：只读取选中的列，外键字段（如 user）通过 JOIN 取出，
+多对多字段（如 tags）对当前页再做一次投影查询；未选中的列（如帖子 content、用户 password）
+既不从 SQLite 读出，也不构造 ORM 对象。未传 fields 时按响应模型的全部字段投影。
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+from pydantic import BaseModel
+
+from utils.serializers import compile_serializer, _unwrap
+
+# 不同 fields 组合各自编译一个序列化函数，按 LRU 保留最近使用的组合
+MAX_CACHED_PROJECTIONS = 256
+
+
+class FieldsError(ValueError):
+    """fields 参数中包含未知字段"""
+
+
+def _nested_schema(schema, name):
+    field_type, _ = _unwrap(schema.model_fields[name].annotation)
+    if isinstance(field_type, type) and issubclass(field_type, BaseModel):
+        return field_type
+    return None
+
+
+def parse_fields(raw, schema):
+    """
+    解析 fields 参数，返回字段选择 {字段名: 嵌套字段选择或 None}
+
+    嵌套字段用点号表示（user.username）；只写嵌套字段名（user）表示其全部字段。
+    """
+    selection = {}
+    for part in raw.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, sub = part.partition('.')
+        if name not in schema.model_fields:
+            raise FieldsError(f"未知字段: {part}")
+        if not sub:
+            selection[name] = None
+            continue
+
+        nested = _nested_schema(schema, name)
+        if nested is None or sub not in nested.model_fields:
+            raise FieldsError(f"未知字段: {part}")
+        if name not in selection:
+            selection[name] = {}
+        if selection[name] is not None:
+            selection[name][sub] = None
+
+    if not selection:
+        raise FieldsError("fields 不能为空")
+    return selection
+
+
+def _expand(schema, selection):
+    """把 None（全部字段）展开为嵌套模型的字段名列表"""
+    expanded = {}
+    for name, sub in selection.items():
+        nested = _nested_schema(schema, name)
+        if nested is None:
+            expanded[name] = None
+        else:
+            expanded[name] = list(sub if sub is not None else nested.model_fields)
+    return expanded
+
+
+def _selection_key(selection):
+    parts = []
+    for name, sub in sorted(selection.items()):
+        if sub is None:
+            parts.append(name)
+        else:
+            parts.extend(f"{name}.{field}" for field in sorted(sub))
+    return ",".join(parts)
+
+
+class Projection:
+    """
+    一次字段选择的查询投影和序列化函数
+
+    required 为视图自身需要的字段（分页键、ETag 用的 updated_at 等），会被查询但不输出。
+    model 为 None 时只做字段选择和序列化（用于原生 SQL 查询的结果）。
+    """
+
+    def __init__(self, model, schema, fields=None, required=()):
+        self.fields = fields
+        # 用于 ETag：同一资源不同字段选择的响应内容不同
+        self.key = None if fields is None else _selection_key(fields)
+        self.serialize = compile_serializer(schema, 'item', fields)
+        self.model = model
+
+        selected = dict.fromkeys(schema.model_fields) if fields is None else dict(fields)
+        for name in ('id',) + tuple(required):
+            selected.setdefault(name, None)
+
+        self.columns = []
+        self._joined = {}
+        self._many = {}
+        if model is None:
+            return
+        meta = model._meta
+        for name, sub in _expand(schema, selected).items():
+            if name in meta.fk_fields:
+                self._joined[name] = sub
+                self.columns.extend(f"{name}__{field}" for field in sub)
+            elif name in meta.m2m_fields:
+                # 关联行按 id 排序，始终读取 id
+                self._many[name] = sub if 'id' in sub else ['id'] + sub
+            elif name in meta.fields_db_projection:
+                self.columns.append(name)
+            # 其余字段（计数、游标等）由视图计算
+
+    def wants(self, name):
+        """响应中是否输出该字段"""
+        return self.fields is None or name in self.fields
+
+    def query(self, query):
+        """按投影读取列（外键字段 JOIN 读取）"""
+        return query.values(*self.columns)
+
+    def many_query(self, ids, name):
+        """一次读取 ids 对应行在多对多字段 name 上的关联记录"""
+        return self.model.filter(id__in=list(ids)).values(
+            'id', *(f"{name}__{field}" for field in self._many[name])
+        )
+
+    async def fetch(self, query):
+        """
+        按投影执行查询，返回字典列表
+
+        query 须已完成筛选、排序和 limit；外键字段嵌套为字典，多对多字段为字典列表。
+        """
+        rows = await self.query(query)
+        for name, sub in self._joined.items():
+            for row in rows:
+                values = {field: row.pop(f"{name}__{field}") for field in sub}
+                row[name] = None if all(value is None for value in values.values()) else values
+
+        if rows:
+            for name, sub in self._many.items():
+                await self._fetch_many(rows, name, sub)
+        return rows
+
+    async def _fetch_many(self, rows, name, sub):
+        # 一次查询取出当前页全部行的关联记录（JOIN 中间表，只读取选中的列）
+        related = {row['id']: [] for row in rows}
+        links = await self.many_query(related, name)
+        for link in links:
+            if link[f"{name}__id"] is not None:
+                related[link['id']].append({field: link[f"{name}__{field}"] for field in sub})
+        for row in rows:
+            row[name] = sorted(related[row['id']], key=itemgetter('id'))
+
+
+@lru_cache(maxsize=MAX_CACHED_PROJECTIONS)
+def _build(model, schema, raw, required):
+    fields = None if raw is None else parse_fields(raw, schema)
+    return Projection(model, schema, fields, required)
+
+
+def projection(request, model, schema, required=()):
+    """
+    按请求的 fields 参数构造（并缓存）投影，参数无效时抛出 FieldsError
+    """
+    return _build(model, schema, request.args.get('fields'), tuple(required))
@@ -0,0 +1,189 @@
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from sanic.response import HTTPResponse
+
+from utils.conditional import is_not_modified, not_modified
+
+# 缓存响应时保留的响应头
+_KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+class CachedResponse:
+    __slots__ = ("status", "headers", "body", "expires_at")
+
+    def __init__(self, status, headers, body, expires_at):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+class CacheBackend:
+    """
+    响应缓存后端接口
+
+    缓存键为 "路径?查询串"，同一路径的不同查询参数（如分页游标）归为一组，
+    失效时按路径整组删除。实现共享存储（如 Redis：每个路径一个 SET 记录其键）
+    即可让多个 worker 共享缓存和失效事件。
+    """
+
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def set(self, path, key, value):
+        raise NotImplementedError
+
+    async def invalidate(self, paths):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LRUBytesBackend(CacheBackend):
+    """进程内 LRU 后端，按响应体字节数限制总容量"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._keys_by_path = {}
+
+    def _remove(self, key):
+        path, value = self._entries.pop(key)
+        self.current_bytes -= value.size
+        keys = self._keys_by_path.get(path)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_path[path]
+
+    async def get(self, key):
+        item = self._entries.get(key)
+        if item is None or item[1].expires_at < time.monotonic():
+            if item is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    async def set(self, path, key, value):
+        if value.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (path, value)
+        self._keys_by_path.setdefault(path, set()).add(key)
+        self.current_bytes += value.size
+        while self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    async def invalidate(self, paths):
+        for path in paths:
+            for key in list(self._keys_by_path.get(path, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._keys_by_path.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+
+backend = LRUBytesBackend()
+_ttl = 30
+
+
+def configure(app_config, cache_backend=None):
+    """根据应用配置设置缓存容量和过期时间，可传入自定义后端"""
+    global backend, _ttl
+    if cache_backend is not None:
+        backend = cache_backend
+    elif isinstance(backend, LRUBytesBackend):
+        backend.max_bytes = app_config.get('RESPONSE_CACHE_MAX_BYTES', backend.max_bytes)
+    _ttl = app_config.get('RESPONSE_CACHE_TTL', _ttl)
+
+
+def cache_key(request):
+    return f"{request.path}?{request.query_string}"
+
+
+async def serve_cached(request):
+    """请求中间件：命中缓存时直接返回缓存的响应（或 304）"""
+    key = cache_key(request)
+    cached = await backend.get(key)
+    if cached is None:
+        request.ctx.response_cache_key = key
+        return None
+
+    etag = cached.headers.get("etag")
+    last_modified = cached.headers.get("last-modified")
+    if last_modified is not None:
+        last_modified = parsedate_to_datetime(last_modified)
+    if etag and is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    return HTTPResponse(cached.body, status=cached.status, headers=cached.headers)
+
+
+async def store_response(request, response):
+    """响应中间件：缓存未命中时生成的 200 响应"""
+    key = getattr(request.ctx, "response_cache_key", None)
+    if key is None or response.status != 200 or not isinstance(response.body, bytes):
+        return
+    headers = {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers}
+    headers.setdefault("content-type", response.content_type)
+    await backend.set(
+        request.path, key,
+        CachedResponse(response.status, headers, response.body, time.monotonic() + _ttl)
+    )
+
+
+# 失效事件：写操作完成后调用，精确删除受影响路径下的所有缓存键
+
+async def invalidate_post(post_id, tag_ids=()):
+    """帖子变更：帖子详情以及列出该帖子的标签详情"""
+    await backend.invalidate(
+        [f"/api/v1/posts/{post_id}"] + [f"/api/v1/tags/{tag_id}" for tag_id in set(tag_ids)]
+    )
+
+
+async def invalidate_tag(tag_id):
+    """新建标签：标签列表和标签详情（重命名、删除标签影响的帖子详情可能很多，由调用方整体清空）"""
+    await backend.invalidate(["/api/v1/tags", f"/api/v1/tags/{tag_id}"])
+
+
+async def invalidate_tags(tag_ids):
+    """批量导入：标签列表以及受影响的标签详情"""
+    await backend.invalidate(["/api/v1/tags"] + [f"/api/v1/tags/{tag_id}" for tag_id in set(tag_ids)])
+
+
+async def invalidate_all():
+    await backend.clear()
+
+
+def stats():
+    return backend.stats()
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from models.post import Post
+from utils.db import read_connection
+from utils.migrations import FTS_TABLE
+from utils.pagination import PaginationError, encode_cursor, decode_cursor
+
+# trigram 分词无法匹配短于 3 个字符的词
+MIN_TERM_LENGTH = 3
+SNIPPET_TOKENS = 16
+MARK_OPEN, MARK_CLOSE = "<mark>", "</mark>"
+
+
+class SearchError(ValueError):
+    """搜索词无效"""
+
+
+def match_expression(q):
+    """
+    将用户输入转换为 FTS5 MATCH 表达式
+
+    按空白切分，每个词作为短语加引号（避免用户输入被解析为 FTS5 语法），词之间为 AND。
+    """
+    terms = (q or "").split()
+    if not terms:
+        raise SearchError("搜索词不能为空")
+    if any(len(term) < MIN_TERM_LENGTH for term in terms):
+        raise SearchError(f"每个搜索词至少需要 {MIN_TERM_LENGTH} 个字符")
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _decode_search_cursor(cursor):
+    rank, post_id = decode_cursor(cursor, ('rank', 'id'))
+    if not isinstance(rank, (int, float)):
+        raise PaginationError("无效的分页游标")
+    return rank, post_id
+
+
+async def search_posts(q, limit, cursor=None, sort='rank', fields=None):
+    """
+    全文检索帖子，返回 (结果行, 下一页游标或 None)
+
+    sort='rank' 按相关度（bm25）排序，以 (rank, id) 做键集分页，需要为全部命中行计算相关度；
+    sort='recent' 按 id 降序，只为当前页计算相关度，命中很多的宽泛查询应使用此方式。
+    标题高亮、内容摘要和作者在同一条查询中取出；fields 为字段选择（None 为全部），
+    未选中的高亮和摘要不会计算（snippet 需要读取并切分帖子全文）。
+    """
+    if sort not in ('rank', 'recent'):
+        raise SearchError("sort 只能是 rank 或 recent")
+
+    params = []
+    title_highlight = snippet = "NULL"
+    if fields is None or 'title_highlight' in fields:
+        title_highlight = f'highlight("{FTS_TABLE}", 0, ?, ?)'
+        params += [MARK_OPEN, MARK_CLOSE]
+    if fields is None or 'snippet' in fields:
+        snippet = f"""snippet("{FTS_TABLE}", 1, ?, ?, '…', {SNIPPET_TOKENS})"""
+        params += [MARK_OPEN, MARK_CLOSE]
+    params.append(match_expression(q))
+    after = ""
+    if sort == 'rank':
+        order = f'"{FTS_TABLE}".rank, "{FTS_TABLE}".rowid'
+        if cursor:
+            rank, post_id = _decode_search_cursor(cursor)
+            after = f'AND ("{FTS_TABLE}".rank > ? OR ("{FTS_TABLE}".rank = ? AND "{FTS_TABLE}".rowid > ?))'
+            params += [rank, rank, post_id]
+    else:
+        order = f'"{FTS_TABLE}".rowid DESC'
+        if cursor:
+            after = f'AND "{FTS_TABLE}".rowid < ?'
+            params += decode_cursor(cursor, ('id',))
+    params.append(limit + 1)
+
+    rows = await read_connection(Post).execute_query_dict(
+        f'''SELECT "posts"."id", "posts"."title", "posts"."created_at",
+                   "users"."id" AS "user_id", "users"."username",
+                   {title_highlight} AS "title_highlight",
+                   {snippet} AS "snippet",
+                   "{FTS_TABLE}".rank AS "rank"
+            FROM "{FTS_TABLE}"
+            JOIN "posts" ON "posts"."id" = "{FTS_TABLE}".rowid
+            JOIN "users" ON "users"."id" = "posts"."user_id"
+            WHERE "{FTS_TABLE}" MATCH ? {after}
+            ORDER BY {order}
+            LIMIT ?''',
+        params
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last["rank"], last["id"]] if sort == 'rank' else [last["id"]])
+
+    return [
+        {
+            "id": row["id"],
+            "title": row["title"],
+            "title_highlight": row["title_highlight"],
+            "snippet": row["snippet"],
+            "rank": row["rank"],
+            "created_at": datetime.fromisoformat(row["created_at"]) if isinstance(row["created_at"], str) else row["created_at"],
+            "user": {"id": row["user_id"], "username": row["username"]}
+        }
+        for row in rows
+    ], next_cursor
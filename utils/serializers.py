@@ -0,0 +1,104 @@
+import typing
+from datetime import date, datetime
+
+from pydantic import BaseModel
+from sanic.response import HTTPResponse
+
+try:
+    import orjson
+
+    def dumps(data):
+        return orjson.dumps(data)
+
+    loads = orjson.loads
+except ImportError:  # pragma: no cover - 未安装 orjson 时退回 ujson
+    import ujson
+
+    def dumps(data):
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+    loads = ujson.loads
+
+
+def _format_datetime(value):
+    # 与 str(datetime) 输出保持一致，避免改变既有的响应格式
+    return None if value is None else value.isoformat(' ')
+
+
+def _unwrap(annotation):
+    """去掉 Optional[...]，返回 (实际类型, 是否为列表)"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return _unwrap(args[0])
+    if origin in (list, typing.List):
+        (item,) = typing.get_args(annotation) or (typing.Any,)
+        return item, True
+    return annotation, False
+
+
+_compiled = {}
+
+
+def compile_serializer(schema, source='attr', fields=None):
+    """
+    根据 Pydantic 响应模型生成专用的序列化函数
+
+    生成的函数直接按字段读取 ORM 对象属性（source='attr'）或字典键
+    （source='item'）并构造字典，不经过 Pydantic 校验，也不在运行时
+    反射字段，因此适合大列表的序列化。嵌套模型和模型列表会递归编译。
+
+    fields 为字段选择 {字段名: 嵌套字段选择或 None}，只输出选中的字段；
+    带 fields 的序列化函数不在此缓存，由调用方（utils.projection）缓存。
+    """
+    key = (schema, source)
+    if fields is None and key in _compiled:
+        return _compiled[key]
+
+    namespace = {'_dt': _format_datetime}
+    items = []
+    # id 始终排在最前，其余字段保持模型中的定义顺序
+    schema_fields = sorted(schema.model_fields.items(), key=lambda item: item[0] != 'id')
+    for i, (name, field) in enumerate(schema_fields):
+        if fields is not None and name not in fields:
+            continue
+        if source == 'attr':
+            getter = f"obj.{name}"
+        else:
+            getter = f"obj.get({name!r})"
+
+        field_type, is_list = _unwrap(field.annotation)
+        if isinstance(field_type, type) and issubclass(field_type, BaseModel):
+            nested = f"_nested_{i}"
+            namespace[nested] = compile_serializer(
+                field_type, source, None if fields is None else fields[name]
+            )
+            if is_list:
+                expr = f"[{nested}(x) for x in {getter}]"
+            else:
+                expr = f"(None if {getter} is None else {nested}({getter}))"
+        elif isinstance(field_type, type) and issubclass(field_type, (datetime, date)):
+            expr = f"_dt({getter})"
+        else:
+            expr = getter
+        items.append(f"{name!r}: {expr}")
+
+    func_name = f"serialize_{schema.__name__}"
+    code = f"def {func_name}(obj):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(code, f"<serializer {schema.__name__}>", 'exec'), namespace)
+
+    serializer = namespace[func_name]
+    if fields is None:
+        _compiled[key] = serializer
+    return serializer
+
+
+def json_response(body, status=200, headers=None):
+    """将数据直接编码为 JSON 字节串并构造响应"""
+    return HTTPResponse(
+        dumps(body),
+        status=status,
+        headers=headers,
+        content_type="application/json"
+    )
@@ -0,0 +1,69 @@
+from sanic.response import ResponseStream
+
+from utils.serializers import dumps
+
+NDJSON = "application/x-ndjson"
+DEFAULT_BATCH_SIZE = 500
+
+
+def stream_format(request):
+    """
+    判断客户端是否请求流式导出
+
+    Accept: application/x-ndjson 返回 "ndjson"（每行一条记录），
+    ?stream=1 返回 "json"（分块输出的普通 JSON），否则返回 None。
+    """
+    if NDJSON in request.headers.get('Accept', ''):
+        return "ndjson"
+    if request.args.get('stream') in ('1', 'true'):
+        return "json"
+    return None
+
+
+async def iter_batches(query, batch_size, fetch=None):
+    """
+    按 id 递增分批迭代查询结果，每批单独查询，内存占用只与批大小有关
+
+    fetch 为执行查询的协程函数（如字段投影的 Projection.fetch，返回字典），默认加载模型对象。
+    """
+    last_id = 0
+    while True:
+        batch = query.filter(id__gt=last_id).order_by('id').limit(batch_size)
+        batch = await (fetch(batch) if fetch else batch)
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        last_id = last['id'] if isinstance(last, dict) else last.id
+
+
+def stream_query(request, query, serializer, key, fmt, fetch=None):
+    """
+    将查询结果以流的形式写出
+
+    fmt 为 "ndjson" 时每条记录一行；为 "json" 时输出与非流式接口相同结构的
+    {key: [...]}（不含 next_cursor）。每批序列化后立即写出，首字节时间与表大小无关。
+    fetch 同 iter_batches。
+    """
+    batch_size = request.app.config.get('STREAM_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    async def streaming_fn(response):
+        if fmt == "ndjson":
+            async for batch in iter_batches(query, batch_size, fetch):
+                await response.write(b"".join(dumps(serializer(row)) + b"\n" for row in batch))
+            return
+
+        await response.write(b'{"' + key.encode('utf-8') + b'":[')
+        first = True
+        async for batch in iter_batches(query, batch_size, fetch):
+            chunk = b",".join(dumps(serializer(row)) for row in batch)
+            await response.write(chunk if first else b"," + chunk)
+            first = False
+        await response.write(b"]}")
+
+    return ResponseStream(
+        streaming_fn,
+        content_type=NDJSON if fmt == "ndjson" else "application/json"
+    )
@@ -0,0 +1,148 @@
+"""
+标签倒排索引：标签 id → 升序排列的帖子 id 数组（array('I')，每个 id 4 字节）
+
+启动时从 posts_tags 全量加载，写操作后由视图增量维护。各 worker 各自持有一份索引，
+其他 worker 的写入在 TAG_INDEX_REFRESH 秒内通过后台重建同步；查询结果回表后还会按实际标签复核，
+因此索引滞后只会漏掉最新的关联，不会返回不匹配的帖子。
+"""
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+
+from models.post import Post
+from utils.db import read_connection
+
+DEFAULT_REFRESH = 60
+
+
+class TagIndex:
+    def __init__(self):
+        self._postings = {}
+        self.loaded_at = None
+        self.refresh = DEFAULT_REFRESH
+        self.rebuilds = 0
+        self._loading = None
+        # 重建期间发生的增量变更，新索引生效后重放（操作均为幂等）
+        self._journal = None
+
+    async def load(self):
+        """从 posts_tags 全量重建索引（按 tag_id, posts_id 顺序读取，逐个追加即为有序）"""
+        field = Post._meta.fields_map['tags']
+        self._journal = []
+        try:
+            rows = await read_connection(Post).execute_query_dict(
+                f'SELECT "{field.forward_key}" AS "tag_id", "{field.backward_key}" AS "post_id" '
+                f'FROM "{field.through}" ORDER BY 1, 2'
+            )
+            postings = {}
+            for row in rows:
+                ids = postings.get(row["tag_id"])
+                if ids is None:
+                    ids = postings[row["tag_id"]] = array('I')
+                ids.append(row["post_id"])
+        finally:
+            journal, self._journal = self._journal, None
+
+        self._postings = postings
+        for op, args in journal:
+            op(*args)
+        self.loaded_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _reload_in_background(self):
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.ensure_future(self.load())
+
+    async def ready(self):
+        """首次使用时加载；超过 refresh 秒后在后台重建，本次仍使用当前索引"""
+        if self.loaded_at is None:
+            await self.load()
+        elif self.refresh and time.monotonic() - self.loaded_at > self.refresh:
+            self._reload_in_background()
+
+    # 增量维护：视图在写事务提交后调用
+
+    def _record(self, op, *args):
+        if self._journal is not None:
+            self._journal.append((op, args))
+
+    def add(self, post_id, tag_ids):
+        self._record(self.add, post_id, tag_ids)
+        for tag_id in tag_ids:
+            ids = self._postings.setdefault(tag_id, array('I'))
+            # 新帖子 id 递增，绝大多数情况下直接追加
+            if not ids or ids[-1] < post_id:
+                ids.append(post_id)
+                continue
+            pos = bisect_left(ids, post_id)
+            if pos == len(ids) or ids[pos] != post_id:
+                ids.insert(pos, post_id)
+
+    def remove(self, post_id, tag_ids):
+        self._record(self.remove, post_id, tag_ids)
+        for tag_id in tag_ids:
+            ids = self._postings.get(tag_id)
+            if not ids:
+                continue
+            pos = bisect_left(ids, post_id)
+            if pos < len(ids) and ids[pos] == post_id:
+                del ids[pos]
+
+    def drop_tag(self, tag_id):
+        self._record(self.drop_tag, tag_id)
+        self._postings.pop(tag_id, None)
+
+    def invalidate(self):
+        """无法增量维护的变更（如级联删除）后在后台全量重建"""
+        self._reload_in_background()
+
+    # 查询
+
+    def match(self, tag_ids, match_all=True):
+        """返回匹配的帖子 id（升序 array）"""
+        postings = [self._postings.get(tag_id, array('I')) for tag_id in tag_ids]
+        if not postings:
+            return array('I')
+        if not match_all:
+            return array('I', sorted(set().union(*postings)))
+
+        # 从最短的数组出发，在其余数组中二分查找，开销与最短数组长度成正比
+        postings.sort(key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            if not result:
+                break
+            n = len(other)
+            result = array('I', (
+                post_id for post_id in result
+                if (pos := bisect_left(other, post_id)) < n and other[pos] == post_id
+            ))
+        return result
+
+    def stats(self):
+        return {
+            "tags": len(self._postings),
+            "postings": sum(len(ids) for ids in self._postings.values()),
+            "bytes": sum(ids.buffer_info()[1] * ids.itemsize for ids in self._postings.values()),
+            "age": None if self.loaded_at is None else round(time.monotonic() - self.loaded_at, 1),
+            "rebuilds": self.rebuilds
+        }
+
+
+index = TagIndex()
+
+
+def configure(app_config):
+    index.refresh = app_config.get('TAG_INDEX_REFRESH', DEFAULT_REFRESH)
+
+
+def page(post_ids, before_id, limit):
+    """
+    按 id 降序取一页：返回 (本页 id 列表, 是否还有下一页)
+
+    post_ids 为升序数组，before_id 为上一页最后一个 id（不含）。
+    """
+    end = bisect_left(post_ids, before_id) if before_id is not None else len(post_ids)
+    start = max(0, end - limit)
+    return list(reversed(post_ids[start:end])), start > 0
@@ -0,0 +1,185 @@
+"""
+非关键写操作的后台合并写入（write-behind）
+
+请求中只把更新放入队列（如登录时间），不等待写库。同一行的多次更新在队列中合并（后写覆盖先写），
+后台任务每 WRITE_BEHIND_INTERVAL 秒或待写行数达到 WRITE_BEHIND_BATCH_SIZE 时刷新：
+按 (模型, 更新的列) 分组，在一个事务中用 executemany 批量 UPDATE。
+
+写入失败的行重新放回队列（不覆盖期间更新的值），下次刷新时重试；队列达到 WRITE_BEHIND_MAX_PENDING
+行时丢弃新的行并计数。服务停止前（before_server_stop）写完队列中剩余的更新。
+队列在各 worker 进程内独立维护；只适合丢失或延迟几秒也无妨的数据，不用于刷新令牌等需要立即生效的记录。
+"""
+import asyncio
+
+from sanic.log import logger
+from tortoise.transactions import in_transaction
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_PENDING = 10000
+
+
+class WriteBehindQueue:
+    def __init__(self, interval=DEFAULT_INTERVAL, batch_size=DEFAULT_BATCH_SIZE, max_pending=DEFAULT_MAX_PENDING):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        # (模型, 主键) → {字段: 值}
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self._flushing = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def update(self, model, pk, **values):
+        """排队更新一行的若干字段，同一行尚未写入的更新合并为一次"""
+        key = (model, pk)
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.update(values)
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        else:
+            self._pending[key] = dict(values)
+        self.enqueued += 1
+
+        if self._task is None:
+            # 未启动后台任务（脚本或测试中），直接安排一次刷新
+            asyncio.ensure_future(self.flush())
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """停止后台任务，并写完队列中剩余的更新"""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """把当前队列写入数据库，返回写入的行数（同一时间只有一次刷新在执行）"""
+        while self._flushing is not None:
+            await self._flushing
+        if not self._pending:
+            return 0
+
+        batch, self._pending = self._pending, {}
+        self._flushing = asyncio.get_running_loop().create_future()
+        try:
+            await self._write(batch)
+        except asyncio.CancelledError:
+            self._requeue(batch)
+            raise
+        except Exception:
+            self.failures += 1
+            self._requeue(batch)
+            logger.exception("后台写入失败，%d 行将在下次刷新时重试", len(batch))
+            return 0
+        finally:
+            self._flushing.set_result(None)
+            self._flushing = None
+
+        self.flushes += 1
+        self.written += len(batch)
+        return len(batch)
+
+    def _requeue(self, batch):
+        for key, values in batch.items():
+            newer = self._pending.get(key)
+            self._pending[key] = {**values, **newer} if newer else values
+
+    @staticmethod
+    def _statements(batch):
+        # 按 (模型, 更新的列) 分组，每组一条 UPDATE 语句配多组参数
+        groups = {}
+        for (model, pk), values in batch.items():
+            names = tuple(sorted(values))
+            meta = model._meta
+            params = [meta.fields_map[name].to_db_value(values[name], model) for name in names]
+            params.append(pk)
+            groups.setdefault((model, names), []).append(params)
+
+        for (model, names), rows in groups.items():
+            meta = model._meta
+            assignments = ", ".join(f'"{meta.fields_db_projection[name]}" = ?' for name in names)
+            sql = f'UPDATE "{meta.db_table}" SET {assignments} WHERE "{meta.db_pk_column}" = ?'
+            yield model, sql, rows
+
+    async def _write(self, batch):
+        statements = list(self._statements(batch))
+        connection_name = statements[0][0]._meta.default_connection
+        async with in_transaction(connection_name) as conn:
+            for _, sql, rows in statements:
+                await conn.execute_many(sql, rows)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped
+        }
+
+    def metrics(self):
+        """Prometheus 文本格式的指标行（由 /metrics 输出）"""
+        lines = [
+            "# HELP sanic_write_behind_pending 后台写入队列中待写入的行数",
+            "# TYPE sanic_write_behind_pending gauge",
+            f"sanic_write_behind_pending {len(self._pending)}",
+        ]
+        for name, help_text, value in (
+            ("enqueued", "排队的更新数", self.enqueued),
+            ("coalesced", "与未写入的更新合并的更新数", self.coalesced),
+            ("written", "写入数据库的行数", self.written),
+            ("flushes", "成功的刷新次数", self.flushes),
+            ("failures", "失败的刷新次数", self.failures),
+            ("dropped", "队列已满时丢弃的更新数", self.dropped),
+        ):
+            lines.append(f"# HELP sanic_write_behind_{name}_total {help_text}")
+            lines.append(f"# TYPE sanic_write_behind_{name}_total counter")
+            lines.append(f"sanic_write_behind_{name}_total {value}")
+        return lines
+
+
+queue = WriteBehindQueue()
+
+
+def configure(app_config):
+    queue.interval = app_config.get('WRITE_BEHIND_INTERVAL', DEFAULT_INTERVAL)
+    queue.batch_size = app_config.get('WRITE_BEHIND_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    queue.max_pending = app_config.get('WRITE_BEHIND_MAX_PENDING', DEFAULT_MAX_PENDING)
+
+
+def update(model, pk, **values):
+    """排队更新（见 WriteBehindQueue.update）"""
+    queue.update(model, pk, **values)